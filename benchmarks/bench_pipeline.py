@@ -0,0 +1,192 @@
+# Third-party
+import markdown as md
+# First-party
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+# Local
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from vault_generator import VaultSpec, generate_vault, add_spec_arguments, spec_from_arguments
+from convert import replace_comments, smart_insert_spacing, smart_single_newlines, replace_math, replace_highlight, replace_strikethrough, replace_code, replace_callouts, replace_embeds, replace_wikilinks, replace_tags, mark_link_types
+from pipeline import MARKDOWN_EXTENSIONS
+from scanner import ObsidianScanner
+from util import build_file_index
+from main import convert_directory
+
+DEFAULT_BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+##########
+# STAGES #
+##########
+
+# The `convert.py` stages in the order `pipeline.ConverterEngine._convert_stages` runs them, as (name, fn(text, file_index, root))
+CONVERT_STAGES = [
+    ("replace_comments",        lambda text, index, root: replace_comments(text)),
+    ("smart_insert_spacing",    lambda text, index, root: smart_insert_spacing(text)),
+    ("smart_single_newlines",   lambda text, index, root: smart_single_newlines(text, verbose=False)),
+    ("replace_math",            lambda text, index, root: replace_math(text)),
+    ("replace_highlight",       lambda text, index, root: replace_highlight(text)),
+    ("replace_strikethrough",   lambda text, index, root: replace_strikethrough(text)),
+    ("replace_code",            lambda text, index, root: replace_code(text)),
+    ("replace_callouts",        lambda text, index, root: replace_callouts(text)),
+    ("replace_embeds",          lambda text, index, root: replace_embeds(text, index, root)),
+    ("replace_wikilinks",       lambda text, index, root: replace_wikilinks(text, index, root)),
+    ("replace_tags",            lambda text, index, root: replace_tags(text)),
+]
+
+def run_stages(
+        notes       :list,
+        file_index,
+        measure_memory :bool,
+) -> dict:
+    """
+    Runs every stage over every note, feeding each stage the previous stage's output like the pipeline does.
+    \nReturns {stage name: (seconds, peak bytes or None)}, summed over notes (peaks are the maximum over notes).
+    """
+    scanner = ObsidianScanner()
+    stages = CONVERT_STAGES + [
+        ("scanner (single pass)",   lambda text, index, root: scanner.scan(text, index, root)),
+        ("md.markdown",             lambda text, index, root: md.markdown(text, extensions=MARKDOWN_EXTENSIONS)),
+        ("mark_link_types",         lambda text, index, root: mark_link_types(text)),
+    ]
+    results = {name: [0.0, None] for name, _ in stages}
+    for note_path, text_md in notes:
+        root = os.path.dirname(note_path)
+        staged = text_md
+        for name, stage in stages:
+            # The scanner replaces the regex stages, so it starts again from the note's source
+            stage_input = text_md if name == "scanner (single pass)" else staged
+            seconds, peak, output = _measure(lambda: stage(stage_input, file_index, root), measure_memory)
+            results[name][0] += seconds
+            if peak is not None:
+                results[name][1] = max(results[name][1] or 0, peak)
+            staged = output
+    return {name: tuple(values) for name, values in results.items()}
+
+def _measure(
+        fn,
+        measure_memory  :bool,
+) -> tuple:
+    """Returns (seconds, peak bytes allocated during the call or None, result) of one call."""
+    if measure_memory:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - before if measure_memory else None
+    return seconds, peak, result
+
+def run_end_to_end(
+        vault_dir       :str,
+        jobs            :int,
+        measure_memory  :bool,
+) -> tuple:
+    """Full (non-incremental) `convert_directory` run, with its per-note output silenced. Returns (seconds, peak bytes or None)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds, peak, failures = _measure(lambda: convert_directory(vault_dir, False, False, False, incremental=False, jobs=jobs), measure_memory)
+    if failures:
+        raise RuntimeError(f"{len(failures)} notes failed to convert, e.g. {failures[0]}")
+    return seconds, peak
+
+#############
+# REPORTING #
+#############
+
+def best_of(
+        repeat  :int,
+        run,
+) -> dict:
+    """Runs `run()` `repeat` times and keeps the fastest time of each entry."""
+    best = {}
+    for _ in range(repeat):
+        for name, (seconds, peak) in run().items():
+            if name not in best or seconds < best[name][0]:
+                best[name] = (seconds, peak)
+    return best
+
+def print_report(
+        results     :dict,
+        note_count  :int,
+        size_mb     :float,
+        baseline    :dict | None,
+        tolerance   :float,
+) -> list:
+    """Prints one row per entry and returns the names of entries slower than the baseline by more than `tolerance`."""
+    regressions = []
+    print(f"{'stage':<26}{'seconds':>10}{'notes/s':>12}{'MB/s':>10}{'peak MB':>10}{'vs baseline':>14}")
+    for name, (seconds, peak) in results.items():
+        peak_text = f"{peak / 1e6:10.2f}" if peak is not None else f"{'-':>10}"
+        compare = ""
+        reference = (baseline or {}).get(name)
+        if reference:
+            change = seconds / reference["seconds"] - 1
+            compare = f"{change * 100:+.1f}%"
+            if change > tolerance:
+                compare += " SLOWER"
+                regressions.append(name)
+        print(f"{name:<26}{seconds:10.4f}{note_count / seconds:12.1f}{size_mb / seconds:10.2f}{peak_text}{compare:>14}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each conversion stage and whole directory builds on a synthetic vault.")
+    add_spec_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest is reported (default: 3)")
+    parser.add_argument("--jobs", type=int, default=1, help="Worker processes for the end-to-end build (default: 1)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_FILE, help="Baseline file to compare against or save to (default: benchmarks/baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown against the baseline before failing, as a fraction (default: 0.25)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the (slower) traced peak memory measurement")
+    args = parser.parse_args()
+    spec = spec_from_arguments(args)
+    measure_memory = not args.no_memory
+
+    with tempfile.TemporaryDirectory() as vault_dir:
+        note_paths = generate_vault(vault_dir, spec)
+        notes = []
+        for note_path in note_paths:
+            with open(note_path, encoding="utf-8") as f:
+                notes.append((note_path, f.read()))
+        size_mb = sum(len(text.encode("utf-8")) for _, text in notes) / 1e6
+        file_index = build_file_index(vault_dir)
+        print(f"Vault: {len(notes)} notes, {size_mb:.2f} MB, best of {args.repeat} runs")
+
+        results = best_of(args.repeat, lambda: run_stages(notes, file_index, measure_memory=False))
+        results["convert_directory"] = best_of(args.repeat, lambda: {"convert_directory": run_end_to_end(vault_dir, args.jobs, measure_memory=False)})["convert_directory"]
+        if measure_memory:
+            tracemalloc.start()
+            for name, (_seconds, peak) in run_stages(notes, file_index, measure_memory=True).items():
+                results[name] = (results[name][0], peak)
+            results["convert_directory"] = (results["convert_directory"][0], run_end_to_end(vault_dir, args.jobs, measure_memory=True)[1])
+            tracemalloc.stop()
+
+    baseline = None
+    if not args.save_baseline and os.path.isfile(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            stored = json.load(f)
+        if stored.get("spec") != spec.as_dict() or stored.get("jobs") != args.jobs:
+            print(f"Baseline {args.baseline} was recorded with different vault parameters or jobs; not comparing.")
+        else:
+            baseline = stored["results"]
+    regressions = print_report(results, len(notes), size_mb, baseline, args.tolerance)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "spec"      : spec.as_dict(),
+                "jobs"      : args.jobs,
+                "results"   : {name: {"seconds": seconds, "peak_bytes": peak} for name, (seconds, peak) in results.items()},
+            }, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    elif regressions:
+        print(f"Slower than baseline by more than {args.tolerance * 100:.0f}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
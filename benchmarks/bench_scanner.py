@@ -0,0 +1,86 @@
+# First-party
+import argparse
+import os
+import sys
+import tempfile
+import time
+# Local
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline import ConverterEngine
+from util import build_file_index
+
+#############
+# BENCHMARK #
+#############
+
+# One block of typical Obsidian syntax, repeated to build a large note
+NOTE_BLOCK = (
+    "## Section heading\n"
+    "Some plain prose with a [[linked-note]] link, a #tag/nested tag and ==highlighted== text plus $x^2$ math.\n"
+    "Another line of prose which runs on for a while without any special syntax in it at all, like most notes.\n"
+    "- first item with ~~struck~~ text\n"
+    "- second item with `inline code`\n"
+    "%% a comment %%\n"
+    "\n"
+    "> [!note] Callout title\n"
+    "> Callout body with a [[linked-note|alias]]\n"
+    "\n"
+    "```python\n"
+    "x = 1 # not a tag\n"
+    "print([[not_a_link]])\n"
+    "```\n"
+    "\n"
+    "$$\n"
+    "a^2 + b^2 = c^2\n"
+    "$$\n"
+    "\n"
+)
+
+def build_vault(
+        vault_dir   :str,
+) -> None:
+    """Creates the notes the benchmark note links to."""
+    with open(os.path.join(vault_dir, "linked-note.md"), "w", encoding="utf-8") as f:
+        f.write("# Linked note\n")
+
+def time_stage(
+        stage,
+        repeat  :int,
+) -> float:
+    """Best wall time of `repeat` calls to `stage`, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stage()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the single-pass Obsidian scanner against the original regex stages.")
+    parser.add_argument("--blocks", type=int, default=2000, help="Number of syntax blocks in the benchmark note (default: 2000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per variant; the best time is reported (default: 5)")
+    args = parser.parse_args()
+
+    text_md = NOTE_BLOCK * args.blocks
+    size_mb = len(text_md.encode("utf-8")) / 1e6
+
+    with tempfile.TemporaryDirectory() as vault_dir:
+        build_vault(vault_dir)
+        file_index = build_file_index(vault_dir)
+        # Markdown embeds stay links, so both variants measure the scan alone
+        legacy  = ConverterEngine(single_pass=False, transclude=False)
+        scanner = ConverterEngine(transclude=False)
+
+        variants = [
+            ("regex stages", lambda: legacy._convert_stages(text_md, file_index, vault_dir)),
+            ("single pass",  lambda: scanner.scanner.scan(text_md, file_index, vault_dir)),
+        ]
+        print(f"Note size: {size_mb:.2f} MB ({args.blocks} blocks), best of {args.repeat} runs")
+        timings = {}
+        for name, stage in variants:
+            timings[name] = time_stage(stage, args.repeat)
+            print(f"  {name:<14}{timings[name] * 1000:9.1f} ms {size_mb / timings[name]:8.2f} MB/s")
+        print(f"Speedup: {timings['regex stages'] / timings['single pass']:.2f}x")
+
+if __name__ == "__main__":
+    main()
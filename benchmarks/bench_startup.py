@@ -0,0 +1,97 @@
+# First-party
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_SCRIPT = os.path.join(REPO_DIR, "main.py")
+
+# Modules which only a conversion needs; none of them may be imported by `import main`
+LAZY_MODULES = ["markdown", "pymdownx", "pipeline", "convert", "scanner", "transclude", "streaming", "writer", "mirror", "concurrent.futures", "multiprocessing"]
+
+###########
+# STARTUP #
+###########
+
+def child_env(cache_dir :str) -> dict:
+    env = dict(os.environ)
+    # Measure with bytecode cached, as an installed CLI runs
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    # Keep `--clean` from touching the user's directory listing cache
+    env["XDG_CACHE_HOME"] = cache_dir
+    return env
+
+def import_time(env :dict) -> tuple:
+    """Returns (cumulative microseconds of `import main` per `-X importtime`, [modules it imported])."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    cumulative = None
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self, total, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not total.isdigit():
+            continue
+        modules.append(name)
+        if name == "main":
+            cumulative = int(total)
+    return cumulative, modules
+
+def wall_time(
+        args    :list,
+        env     :dict,
+        cwd     :str,
+) -> float:
+    """Seconds for one `python main.py <args>` run, including interpreter startup."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, MAIN_SCRIPT, *args], cwd=cwd, env=env, stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+def wall_time_interpreter(env :dict) -> float:
+    """Seconds for a bare interpreter start, the floor for any CLI run."""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CLI startup: the import time of main.py and wall time of `--help` and `--clean`.")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per measurement; the fastest is reported (default: 10)")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="Allowed cumulative import time of main.py in milliseconds (default: 50)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = child_env(os.path.join(work_dir, "cache"))
+        vault_dir = os.path.join(work_dir, "vault")
+        os.makedirs(vault_dir)
+        # Warm-up run, which also writes the bytecode
+        import_time(env)
+        runs = [import_time(env) for _ in range(args.repeat)]
+        import_us = min(cumulative for cumulative, _modules in runs)
+        eager = sorted(set(runs[-1][1]) & set(LAZY_MODULES))
+        help_s = min(wall_time(["--help"], env, vault_dir) for _ in range(args.repeat))
+        clean_s = min(wall_time(["--clean", "--force"], env, vault_dir) for _ in range(args.repeat))
+        baseline_s = min(wall_time_interpreter(env) for _ in range(args.repeat))
+
+    print(f"Best of {args.repeat} runs")
+    print(f"{'import main':<26}{import_us / 1000:10.2f} ms  (budget {args.budget_ms:.0f} ms)")
+    print(f"{'python -c pass':<26}{baseline_s * 1000:10.2f} ms")
+    print(f"{'main.py --help':<26}{help_s * 1000:10.2f} ms")
+    print(f"{'main.py --clean --force':<26}{clean_s * 1000:10.2f} ms")
+    failed = False
+    if eager:
+        print(f"Imported at startup although only conversions need them: {', '.join(eager)}")
+        failed = True
+    if import_us / 1000 > args.budget_ms:
+        print(f"Importing main.py took longer than the {args.budget_ms:.0f} ms budget.")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
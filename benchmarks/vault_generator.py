@@ -0,0 +1,158 @@
+# First-party
+import argparse
+import os
+import random
+
+###################
+# VAULT GENERATOR #
+###################
+
+WORDS = (
+    "the of and to in is was for on that with as by at from this it be are an or which have not had but were "
+    "note vault link idea graph method result value system model design review draft index summary context"
+).split()
+
+CALLOUT_TYPES = ["note", "tip", "warning", "info", "example"]
+CODE_LANGS = ["python", "bash", "js", ""]
+
+class VaultSpec:
+    """
+    Parameters of a synthetic vault. Rates are per paragraph unless stated otherwise.
+    """
+    def __init__(
+            self,
+            notes               :int = 200,
+            note_size           :int = 4000,
+            link_density        :float = 0.5,
+            duplicate_ratio     :float = 0.1,
+            embed_rate          :float = 0.1,
+            callout_rate        :float = 0.1,
+            math_rate           :float = 0.1,
+            code_rate           :float = 0.1,
+            tag_rate            :float = 0.3,
+            folders             :int = 8,
+            seed                :int = 0,
+    ):
+        self.notes              = notes             # Number of markdown notes
+        self.note_size          = note_size         # Approximate characters per note
+        self.link_density       = link_density      # Wikilinks per paragraph
+        self.duplicate_ratio    = duplicate_ratio   # Share of notes whose basename also exists in another folder
+        self.embed_rate         = embed_rate
+        self.callout_rate       = callout_rate
+        self.math_rate          = math_rate
+        self.code_rate          = code_rate
+        self.tag_rate           = tag_rate
+        self.folders            = folders
+        self.seed               = seed
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+def generate_vault(
+        vault_dir   :str,
+        spec        :VaultSpec,
+) -> list:
+    """
+    Writes a synthetic vault into `vault_dir` (created if needed) and returns the paths of its notes.
+    \nThe same spec and seed always produce the same vault.
+    """
+    rng = random.Random(spec.seed)
+    folders = [""] + [os.path.join(f"folder_{i}", f"sub_{i % 3}") for i in range(spec.folders)]
+    for folder in folders:
+        os.makedirs(os.path.join(vault_dir, folder), exist_ok=True)
+    # Note names, some of which are reused in another folder to make ambiguous links
+    names = [f"note {i}" for i in range(spec.notes)]
+    duplicates = int(spec.notes * spec.duplicate_ratio)
+    for i in rng.sample(range(1, spec.notes), min(duplicates, max(spec.notes - 1, 0))):
+        names[i] = names[rng.randrange(0, i)]
+    note_paths = []
+    used = set()
+    for i, name in enumerate(names):
+        free = [folder for folder in folders if (folder, name) not in used]
+        if not free:
+            # Every folder already holds this name
+            name = names[i] = f"{name} {i}"
+            free = folders
+        folder = rng.choice(free)
+        used.add((folder, name))
+        note_paths.append(os.path.join(vault_dir, folder, f"{name}.md"))
+    # Attachments for embeds
+    attachments = ["image.png", "diagram.webp", "clip.mp4", "sound.ogg", "paper.pdf"]
+    for attachment in attachments:
+        with open(os.path.join(vault_dir, attachment), "wb") as f:
+            f.write(b"\0")
+    for note_path in note_paths:
+        with open(note_path, "w", encoding="utf-8") as f:
+            f.write(_generate_note(rng, spec, names, attachments))
+    return note_paths
+
+def _generate_note(
+        rng         :random.Random,
+        spec        :VaultSpec,
+        names       :list,
+        attachments :list,
+) -> str:
+    out = [f"# {' '.join(rng.choices(WORDS, k=4)).title()}\n\n"]
+    size = len(out[0])
+    while size < spec.note_size:
+        block = _generate_block(rng, spec, names, attachments)
+        out.append(block)
+        size += len(block)
+    return "".join(out)
+
+def _chance(rng :random.Random, rate :float) -> int:
+    """Number of occurrences for a per-paragraph rate, which may exceed 1."""
+    count = int(rate)
+    return count + (rng.random() < rate - count)
+
+def _generate_block(
+        rng         :random.Random,
+        spec        :VaultSpec,
+        names       :list,
+        attachments :list,
+) -> str:
+    words = rng.choices(WORDS, k=rng.randint(30, 80))
+    for _ in range(_chance(rng, spec.link_density)):
+        target = rng.choice(names)
+        link = f"[[{target}]]" if rng.random() < 0.7 else f"[[{target}#Section|alias]]"
+        words.insert(rng.randrange(len(words)), link)
+    for _ in range(_chance(rng, spec.tag_rate)):
+        words.insert(rng.randrange(len(words)), f"#{rng.choice(WORDS)}/{rng.choice(WORDS)}")
+    for _ in range(_chance(rng, spec.math_rate)):
+        words.insert(rng.randrange(len(words)), "$a^2 + b^2 = c^2$")
+    # Break the paragraph into lines, as notes usually have single newlines
+    lines = [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+    block = "\n".join(lines) + "\n\n"
+    if rng.random() < 0.3:
+        block += "".join(f"- {' '.join(rng.choices(WORDS, k=6))}\n" for _ in range(rng.randint(2, 5))) + "\n"
+    for _ in range(_chance(rng, spec.embed_rate)):
+        block += f"![[{rng.choice(attachments)}]]\n\n"
+    for _ in range(_chance(rng, spec.callout_rate)):
+        block += f"> [!{rng.choice(CALLOUT_TYPES)}] {' '.join(rng.choices(WORDS, k=3))}\n"
+        block += "".join(f"> {' '.join(rng.choices(WORDS, k=8))}\n" for _ in range(rng.randint(1, 3))) + "\n"
+    for _ in range(_chance(rng, spec.math_rate / 2)):
+        block += "$$\n\\int_0^1 x^2 dx = \\frac{1}{3}\n$$\n\n"
+    for _ in range(_chance(rng, spec.code_rate)):
+        code = "\n".join(f"value_{i} = compute({i}) # [[not a link]] #not-a-tag" for i in range(rng.randint(2, 8)))
+        block += f"```{rng.choice(CODE_LANGS)}\n{code}\n```\n\n"
+    return block
+
+def add_spec_arguments(parser :argparse.ArgumentParser) -> None:
+    """Adds a command line option for every `VaultSpec` parameter."""
+    defaults = VaultSpec()
+    for name, value in defaults.as_dict().items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value, help=f"(default: {value})")
+
+def spec_from_arguments(args :argparse.Namespace) -> VaultSpec:
+    return VaultSpec(**{name: getattr(args, name) for name in VaultSpec().as_dict()})
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic Obsidian vault for benchmarking.")
+    parser.add_argument("vault_dir", help="Directory to write the vault into")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    note_paths = generate_vault(args.vault_dir, spec_from_arguments(args))
+    print(f"Generated {len(note_paths)} notes in {args.vault_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,41 @@ BUILT_HTML_EXTENSION        = ".md.html"
 DEFAULT_TEMPLATE_FILE       = "template.html"
 DEFAULT_GLOBAL_CSS_FILE     = "global.css"
 DEFAULT_GLOBAL_JS_FILE      = "global.js"
+BUILD_MANIFEST_FILE         = ".convertmanifest.json"
+BUILD_MANIFEST_VERSION      = 5
+BUILD_CHECKPOINT_INTERVAL   = 30.0#seconds between manifest saves during a build
+WATCH_POLL_INTERVAL         = 1.0#seconds
+RESOLVE_MEMO_SIZE           = 4096#(link, directory) pairs
+FILE_INDEX_CACHE_DIR        = "obsidian-md-html"#under the user cache directory
+FILE_INDEX_CACHE_VERSION    = 1
+FILE_INDEX_RACY_WINDOW      = 2.0#seconds
+PROFILE_SLOWEST_NOTES       = 20#notes
+WRITER_THREADS              = 4#threads
+WRITER_MAX_PENDING          = 64#queued output files
+CLEAN_THREADS               = 8#threads removing built files
+MIRROR_THREADS              = 8#threads mirroring assets into the output directory
+TRANSCLUDE_MAX_DEPTH        = 8#nested embeds
+TRANSCLUDE_CACHE_SIZE       = 256#rendered fragments
+STREAM_MIN_SIZE             = 4_000_000#bytes; larger notes are converted chunk by chunk
+STREAM_CHUNK_SIZE           = 256_000#characters per chunk
+SERVE_HOST                  = "127.0.0.1"
+SERVE_PORT                  = 8000
+SERVE_CACHE_SIZE            = 128#rendered pages
+SERVE_RESCAN_INTERVAL       = 1.0#seconds
+
+# Tag pages (`--taglinks`), relative to the vault root
+TAG_PAGES_DIR               = "tags"
+TAG_INDEX_FILE              = "tags.json"
+
+# Search index (`--search`), relative to the vault root
+SEARCH_DIR                  = "search"
+SEARCH_INDEX_FILE           = "index.json"
+SEARCH_PREFIX_LENGTH        = 2#characters of a term naming its shard
+SEARCH_MIN_TERM_LENGTH      = 2#characters
+SEARCH_MAX_TERM_LENGTH      = 40#characters
+SEARCH_TITLE_WEIGHT         = 10#per title word
+SEARCH_HEADING_WEIGHT       = 4#per heading word
+SEARCH_TAG_WEIGHT           = 5#per tag word
 
 # Classes
 EMBED_MARKDOWN_CLASS        = "embed-markdown"
@@ -21,6 +56,9 @@ NOREF_WIKILINK_CLASS        = "link-wikilink-noref"
 NOREF_WIKILINK_HREF         = "#"
 TAGS_CLASS                  = "obsi-tag"
 TAGS_DATA                   = "data-tag"
+TAG_PAGE_NOTES_CLASS        = "tag-page-notes"
+TAG_PAGE_CHILDREN_CLASS     = "tag-page-children"
+BACKLINKS_CLASS             = "backlinks"
 CODE_LANG_CLASS_PREFIX      = "language-"
 CODE_BLOCK_CLASS            = "code-block"
 CODE_INLINE_CLASS           = "code-inline"
@@ -20,29 +20,35 @@ NON_MD_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp",
                      ".mp3", ".wav", ".ogg", ".flac", ".m4a", ".aac", ".opus",
                      ".mp4", ".webm", ".ogv", ".mov", ".mkv", ".cpp", ".txt", ".js", ".css", ".html"}
 
+WIKILINK_PATTERN = re.compile(r"\[\[([^\[\]]+)\]\]")
+SLUG_STRIP_PATTERN = re.compile(r'[^\w\s-]')
+SLUG_SPACE_PATTERN = re.compile(r'\s+')
+
 def replace_wikilinks(text_md: str, file_index: defaultdict, root: str, verbose: bool = False) -> str:
-    def i_replace(match):
-        inner = match.group(1)
-        target, display = _parse_obsidian_link(inner)
-        base, anchor, block = _split_anchor_and_block(target)
-
-        ext = path.splitext(base)[1].lower()
-        if ext and ext != ".md" and ext in NON_MD_EXTENSIONS:
-            resolved = resolve_obsidian_path(base, file_index, root)
-            href = quote(resolved, safe="/")
-            link_class = WIKILINK_LINK_CLASS
-            target_attr = 'target="_blank"'
-        else:
-            href = _convert_md_href_to_html(target, file_index, root)
-            link_class = WIKILINK_LINK_CLASS if NOREF_WIKILINK_HREF != href else NOREF_WIKILINK_CLASS
-            target_attr = ''
+    return WIKILINK_PATTERN.sub(lambda m: render_wikilink(m.group(1), file_index, root, verbose=verbose), text_md)
 
-        html_out = f'<a href="{href}" class="{link_class}"{target_attr}>{display}</a>'
-        if verbose:
-            print(f'Converted wikilink "[[{inner}]]" to "{html_out}"')
-        return html_out
+def render_wikilink(inner: str, file_index: defaultdict, root: str, verbose: bool = False) -> str:
+    """
+    Renders the inside of a single `[[inner]]` wikilink.
+    """
+    target, display = _parse_obsidian_link(inner)
+    base, anchor, block = _split_anchor_and_block(target)
+
+    ext = path.splitext(base)[1].lower()
+    if ext and ext != ".md" and ext in NON_MD_EXTENSIONS:
+        resolved = resolve_obsidian_path(base, file_index, root)
+        href = quote(resolved, safe="/")
+        link_class = WIKILINK_LINK_CLASS
+        target_attr = 'target="_blank"'
+    else:
+        href = _convert_md_href_to_html(target, file_index, root)
+        link_class = WIKILINK_LINK_CLASS if NOREF_WIKILINK_HREF != href else NOREF_WIKILINK_CLASS
+        target_attr = ''
 
-    return re.sub(r"\[\[([^\[\]]+)\]\]", i_replace, text_md)
+    html_out = f'<a href="{href}" class="{link_class}"{target_attr}>{display}</a>'
+    if verbose:
+        print(f'Converted wikilink "[[{inner}]]" to "{html_out}"')
+    return html_out
 
 
 def _parse_obsidian_link(inner :str):
@@ -73,8 +79,8 @@ def _split_anchor_and_block(target: str
 def _slugify_heading(text :str):
     """Matches Python-Markdown TOC/Obsidian style: lowercase, dashes for spaces, strip most punctuation."""
     text = text.strip().lower()
-    text = re.sub(r'[^\w\s-]', '', text)
-    text = re.sub(r'\s+', '-', text)
+    text = SLUG_STRIP_PATTERN.sub('', text)
+    text = SLUG_SPACE_PATTERN.sub('-', text)
     text = text.strip('-')
     return text
 
@@ -83,12 +89,19 @@ def _markdown_file_exists(
         file_index  :defaultdict,
         current_dir :str
 ) -> bool:
+    return bool(_resolve_markdown_file(base, file_index, current_dir))
+
+def _resolve_markdown_file(
+        base        :str,
+        file_index  :defaultdict,
+        current_dir :str
+) -> str | None:
+    """Relative path to the markdown file `base` links to, or None if it does not exist."""
     if base.endswith(".md") or "." not in base:
         try:
-            resolved = resolve_obsidian_path(base, file_index, current_dir)
+            return resolve_obsidian_path(base, file_index, current_dir)
         except FileNotFoundError:
-            return False
-        return bool(resolved)
+            return None
     raise ValueError(f"Parameter 'base' is not markdown: '{base}'")
 
 def _convert_md_href_to_html(
@@ -103,9 +116,17 @@ def _convert_md_href_to_html(
     """
     base, anchor, block = _split_anchor_and_block(target)
     # A wikilink can reference a non-existent markdown file in Obsidian
-    if not _markdown_file_exists(base, file_index, current_dir):
+    rel_path = _resolve_markdown_file(base, file_index, current_dir)
+    return _markdown_href(rel_path, anchor, block)
+
+def _markdown_href(
+        rel_path    :str | None,
+        anchor      :str | None,
+        block       :str | None,
+) -> str:
+    """Href of the page built for the markdown file at the resolved `rel_path` (None if it does not exist), pointing at its `block` or `anchor` heading."""
+    if not rel_path:
         return NOREF_WIKILINK_HREF  # `quote()` return neglected to avoid unnecessary encoding and make direct checks against the constant reliable
-    rel_path = resolve_obsidian_path(base, file_index, current_dir)
     if rel_path.lower().endswith(".md"):
         rel_path = rel_path[:-3]
     # Unique case for "index.html" to ensure it matches naming convention
@@ -140,18 +161,20 @@ def _replace_block_reference(
 ## Smart Adjustments ##
 #######################
 
+LIST_SPACING_PATTERN = re.compile(
+    r"([^\n])\n(\s*(?:\d+\.\s+|\-\s+|\*\s+|\-\s*\[.\]\s+|\*\s*\[.\]\s+))"
+)
+HEADING_SPACING_PATTERN = re.compile(r"([^\n])\n(\s*#{1,6}\s+)")
+CODE_FENCE_SPACING_PATTERN = re.compile(r'([^\n])\n([ \t]*(?:```|~~~))')
+SINGLE_NEWLINE_PATTERN = re.compile(r'([^\n])\n(?!\n)(?![ \t]*(?:```|~~~))')
+
 def smart_insert_spacing(
         text_md :str
 ) -> str:
     """Obsidian is smarter with markdown styling than traditional markdown displayers. For example, a list in markdown traditionally requires a space prior to note that it's a list. But Obsidian is smart enough to know it's a list and will display it as such."""
-    list_pattern = re.compile(
-        r"([^\n])\n(\s*(?:\d+\.\s+|\-\s+|\*\s+|\-\s*\[.\]\s+|\*\s*\[.\]\s+))"
-    )
-    text_md = list_pattern.sub(r"\1\n\n\2", text_md)
-    heading_pattern = re.compile(r"([^\n])\n(\s*#{1,6}\s+)")
-    text_md = heading_pattern.sub(r"\1\n\n\2", text_md)
-    code_fence_pattern = re.compile(r'([^\n])\n([ \t]*(?:```|~~~))')
-    text_md = code_fence_pattern.sub(r"\1\n\n\2", text_md)
+    text_md = LIST_SPACING_PATTERN.sub(r"\1\n\n\2", text_md)
+    text_md = HEADING_SPACING_PATTERN.sub(r"\1\n\n\2", text_md)
+    text_md = CODE_FENCE_SPACING_PATTERN.sub(r"\1\n\n\2", text_md)
     return text_md
 
 def smart_single_newlines(
@@ -159,8 +182,7 @@ def smart_single_newlines(
         verbose :bool
 ) -> str:
     """Obsidian is smarter with markdown styling than traditional markdown displayers. In typical markdown viewers, a series of text on newlines will not be respected. Instead, text will be snapped onto one line. In Obsidian, single newlines are respected. This is such a core part of Obsidian notes that it should be built into the converter."""
-    pattern = re.compile(r'([^\n])\n(?!\n)(?![ \t]*(?:```|~~~))')
-    result = pattern.sub(r'\1  \n', text_md)
+    result = SINGLE_NEWLINE_PATTERN.sub(r'\1  \n', text_md)
     if verbose:
         print("After single-newline preservation (code-fence lines skipped):\n", result)
     return result
@@ -169,90 +191,155 @@ def smart_single_newlines(
 ## Callouts/Notes ##
 ####################
 
+CALLOUT_PATTERN = re.compile(
+    r'(^> \[!(\w+)\](?:[ \t]+(.+))?\n'      # first line: type + optional title
+    r'((?:^>.*\n?)*)'                       # following quote lines (may be empty)
+    r')', re.MULTILINE)
+
 def replace_callouts(text_md: str, verbose: bool = False) -> str:
     """
     Converts Obsidian callouts into a single <p class="{CALLOUT_CONTENT_CLASS}">...</p>
     with <br> between content lines, matching blockquote behavior (default markdown conversion for blockquotes).
     """
-    callout_pat = re.compile(
-        r'(^> \[!(\w+)\](?:[ \t]+(.+))?\n'      # first line: type + optional title
-        r'((?:^>.*\n?)*)'                       # following quote lines (may be empty)
-        r')', re.MULTILINE)
     def repl(m):
-        ctype = m.group(2).lower()
-        title = (m.group(3) or '').strip()
-        raw   = m.group(4)
-        # Gather all lines (may be empty)
-        lines = raw.splitlines()
-        content_lines = []
-        for ln in lines:
-            if ln.startswith('>'):
+        title_html = html.escape((m.group(3) or '').strip())
+        content_lines = [html.escape(ln) for ln in callout_content_lines(m.group(4))]
+        return render_callout(m.group(2), title_html, content_lines, verbose=verbose)
+    return CALLOUT_PATTERN.sub(repl, text_md)
+
+def callout_content_lines(raw :str) -> list:
+    """
+    Splits the quoted lines following a callout header into content lines, without their leading "> ".
+    """
+    # Gather all lines (may be empty)
+    lines = raw.splitlines()
+    content_lines = []
+    for ln in lines:
+        if ln.startswith('>'):
+            ln = ln[1:]
+            if ln.startswith(' '):
                 ln = ln[1:]
-                if ln.startswith(' '):
-                    ln = ln[1:]
-            # Include all lines
-            content_lines.append(html.escape(ln))
-        # Remove any leading blank content line (from single-line callout)
-        while content_lines and not content_lines[0].strip():
-            content_lines = content_lines[1:]
-        # Remove any trailing blank lines (not needed for rendering)
-        while content_lines and not content_lines[-1].strip():
-            content_lines = content_lines[:-1]
-        # Join content with <br>
-        body_html = ('<p class="{CALLOUT_CONTENT_CLASS}">'
-                     + '<br>\n'.join(content_lines) +
-                     '</p>') if content_lines else '<p class="{CALLOUT_CONTENT_CLASS}"></p>'
-        title_html = (f'<p class="{CALLOUT_TITLE_CLASS}">{html.escape(title)}</p>'
-                      if title else '')
-        html_block = (
-            f'<blockquote class="{CALLOUT_CLASS} {CALLOUT_TYPE_CLASS_PREFIX}{ctype}" '
-            f'{CALLOUT_TYPE_DATA}="{ctype}">\n'
-            f'{title_html}\n{body_html}\n'
-            f'</blockquote>'
-        )
-        if verbose:
-            print(f'Converted {ctype} call-out, title="{title}", '
-                  f'lines={len(content_lines)}')
-        return html_block
-    return callout_pat.sub(repl, text_md)
+        # Include all lines
+        content_lines.append(ln)
+    return content_lines
+
+def render_callout(
+        ctype           :str,
+        title_html      :str,
+        content_lines   :list,
+        verbose         :bool = False
+) -> str:
+    """
+    Renders a callout from its type, its title and content lines (both already escaped/rendered; the title may be empty).
+    """
+    ctype = ctype.lower()
+    # Remove any leading blank content line (from single-line callout)
+    while content_lines and not content_lines[0].strip():
+        content_lines = content_lines[1:]
+    # Remove any trailing blank lines (not needed for rendering)
+    while content_lines and not content_lines[-1].strip():
+        content_lines = content_lines[:-1]
+    # Join content with <br>
+    body_html = ('<p class="{CALLOUT_CONTENT_CLASS}">'
+                 + '<br>\n'.join(content_lines) +
+                 '</p>') if content_lines else '<p class="{CALLOUT_CONTENT_CLASS}"></p>'
+    title_html = (f'<p class="{CALLOUT_TITLE_CLASS}">{title_html}</p>'
+                  if title_html else '')
+    html_block = (
+        f'<blockquote class="{CALLOUT_CLASS} {CALLOUT_TYPE_CLASS_PREFIX}{ctype}" '
+        f'{CALLOUT_TYPE_DATA}="{ctype}">\n'
+        f'{title_html}\n{body_html}\n'
+        f'</blockquote>'
+    )
+    if verbose:
+        print(f'Converted {ctype} call-out, title="{title_html}", '
+              f'lines={len(content_lines)}')
+    return html_block
 
 ############
 ## Embeds ##
 ############
 
+EMBED_IMAGE_PATTERN = re.compile(r'!\[\[([^\[\]|]+\.(?:png|jpe?g|gif|svg|webp)(?:\|[^\[\]]*)*)\]\]', re.IGNORECASE)
+EMBED_AUDIO_PATTERN = re.compile(r'!\[\[([^\[\]|]+\.(?:mp3|wav|ogg|flac|m4a|aac|opus))\]\]', re.IGNORECASE)
+EMBED_VIDEO_PATTERN = re.compile(r'!\[\[([^\[\]|]+\.(?:mp4|webm|ogv|mov|mkv))\]\]', re.IGNORECASE)
+EMBED_PDF_PATTERN = re.compile(r'!\[\[([^\[\]|]+\.pdf)\]\]', re.IGNORECASE)
+EMBED_MISC_PATTERN = re.compile(r'!\[\[([^\[\]|]+\.(?!md$)[^\[\]|]+)\]\]', re.IGNORECASE)
+EMBED_MD_PATTERN = re.compile(r'!\[\[([^\[\]|]+(?:(?:\.md))?(?:#[^\[\]|]+)?(?:\|[^\[\]]*)?)\]\]', re.IGNORECASE)
+
 def replace_embeds(
         text_md     :str,
         file_index  :defaultdict,
         root        :str,
-        verbose     :bool = False
+        verbose     :bool = False,
+        transclude  =None,
 ) -> str:
     text_md = _replace_embedded_images(text_md, file_index, root, verbose=verbose)
     text_md = _replace_embedded_audio(text_md, file_index, root, verbose=verbose)
     text_md = _replace_embedded_video(text_md, file_index, root, verbose=verbose)
     text_md = _replace_embedded_pdf(text_md, file_index, root, verbose=verbose)
     _catch_embedded_misc(text_md, verbose=verbose)
-    text_md = _replace_embedded_md(text_md, file_index, root, verbose=verbose)    # NOTE: Always run last, as it will treat any input file type as markdown
+    text_md = _replace_embedded_md(text_md, file_index, root, verbose=verbose, transclude=transclude)    # NOTE: Always run last, as it will treat any input file type as markdown
     return text_md
 
+def render_embed(
+        inner       :str,
+        file_index  :defaultdict,
+        root        :str,
+        verbose     :bool = False,
+        transclude  =None,
+) -> str:
+    """
+    Renders a single `![[inner]]` embed, classifying it with the same patterns (in the same order) as `replace_embeds`.
+    \nMarkdown embeds are handed to `transclude` (see `transclude.Transcluder.embed`) when given, and otherwise link to the note.
+    """
+    token = f"![[{inner}]]"
+    if EMBED_IMAGE_PATTERN.fullmatch(token):
+        return _render_embedded_image(inner, file_index, root, verbose=verbose)
+    if EMBED_AUDIO_PATTERN.fullmatch(token):
+        return _render_embedded_audio(inner, file_index, root, verbose=verbose)
+    if EMBED_VIDEO_PATTERN.fullmatch(token):
+        return _render_embedded_video(inner, file_index, root, verbose=verbose)
+    if EMBED_PDF_PATTERN.fullmatch(token):
+        return _render_embedded_pdf(inner, file_index, root, verbose=verbose)
+    if EMBED_MISC_PATTERN.fullmatch(token):
+        _raise_embedded_misc(inner, verbose=verbose)
+    if EMBED_MD_PATTERN.fullmatch(token):
+        return _render_embedded_md(inner, file_index, root, verbose=verbose, transclude=transclude)
+    # Not an embed; `replace_wikilinks` would still convert the bracketed part
+    return "!" + render_wikilink(inner, file_index, root, verbose=verbose)
+
 ### Embed Markdown ###
 
-# NOTE: Does not embed markdown. Links to corresponding markdown HTML file.
+# NOTE: Without `transclude`, does not embed markdown. Links to corresponding markdown HTML file.
 def _replace_embedded_md(
         text_md     :str,
         file_index  :defaultdict,
         root        :str,
-        verbose     :bool = False
+        verbose     :bool = False,
+        transclude  =None,
 ) -> str:
-    def i_replace(match):
-        inner = match.group(1)
-        target, display = _parse_obsidian_link(inner)
-        href = _convert_md_href_to_html(target, file_index, root)
-        html = f'<div class="{EMBED_MARKDOWN_CLASS}"><a href="{href}">{display}</a></div>'
-        if verbose:
-            print(f'Converted embed markdown "![[{inner}]]" to "{html}"')
-        return html
-    md_pattern = r'!\[\[([^\[\]|]+(?:(?:\.md))?(?:#[^\[\]|]+)?(?:\|[^\[\]]*)?)\]\]'
-    return re.sub(md_pattern, i_replace, text_md, flags=re.IGNORECASE)
+    return EMBED_MD_PATTERN.sub(lambda m: _render_embedded_md(m.group(1), file_index, root, verbose=verbose, transclude=transclude), text_md)
+
+def _render_embedded_md(
+        inner       :str,
+        file_index  :defaultdict,
+        root        :str,
+        verbose     :bool = False,
+        transclude  =None,
+) -> str:
+    target, display = _parse_obsidian_link(inner)
+    base, anchor, block = _split_anchor_and_block(target)
+    # Resolved once for both the link and the transclusion, so the embed is looked up (and recorded) once
+    rel_path = _resolve_markdown_file(base, file_index, root)
+    href = _markdown_href(rel_path, anchor, block)
+    html = f'<div class="{EMBED_MARKDOWN_CLASS}"><a href="{href}">{display}</a></div>'
+    if transclude is not None and rel_path and not block:
+        # Block references can't be cut out of the note, so they stay links
+        html = transclude(path.join(root, rel_path), anchor, html)
+    if verbose:
+        print(f'Converted embed markdown "![[{inner}]]" to "{html}"')
+    return html
 
 ### Embed Images ###
 
@@ -262,26 +349,30 @@ def _replace_embedded_images(
         root        :str,
         verbose     :bool = False
 ) -> str:
-    def i_replace(match):
-        inner = match.group(1)
-        if "|" in inner:
-            src, *opts = [s.strip() for s in inner.split("|")]
-            options = "|".join(opts)
-            alt, width = _parse_obsidian_image_options(options)
-        else:
-            src = inner.strip()
-            alt = src
-            width = None
-        src = resolve_obsidian_path(src, file_index, root)
-        html = f'<img src="{src}" class="{EMBED_IMAGE_CLASS}" alt="{alt}"'
-        if width:
-            html += f' {EMBED_IMAGE_DATA_WIDTH}="{width}"'
-        html += ">"
-        if verbose:
-            print(f'Converted embed image "![[{inner}]]" to "{html}"')
-        return html
-    image_pattern = r'!\[\[([^\[\]|]+\.(?:png|jpe?g|gif|svg|webp)(?:\|[^\[\]]*)*)\]\]'
-    return re.sub(image_pattern, i_replace, text_md, flags=re.IGNORECASE)
+    return EMBED_IMAGE_PATTERN.sub(lambda m: _render_embedded_image(m.group(1), file_index, root, verbose=verbose), text_md)
+
+def _render_embedded_image(
+        inner       :str,
+        file_index  :defaultdict,
+        root        :str,
+        verbose     :bool = False
+) -> str:
+    if "|" in inner:
+        src, *opts = [s.strip() for s in inner.split("|")]
+        options = "|".join(opts)
+        alt, width = _parse_obsidian_image_options(options)
+    else:
+        src = inner.strip()
+        alt = src
+        width = None
+    src = resolve_obsidian_path(src, file_index, root)
+    html = f'<img src="{src}" class="{EMBED_IMAGE_CLASS}" alt="{alt}"'
+    if width:
+        html += f' {EMBED_IMAGE_DATA_WIDTH}="{width}"'
+    html += ">"
+    if verbose:
+        print(f'Converted embed image "![[{inner}]]" to "{html}"')
+    return html
 
 def _parse_obsidian_image_options(options: str):
     """
@@ -309,16 +400,20 @@ def _replace_embedded_audio(
         root        :str,
         verbose     :bool = False
 ) -> str:
-    def i_replace(match):
-        inner = match.group(1)
-        src = inner.strip()
-        src = resolve_obsidian_path(src, file_index, root)
-        html = f'<audio controls class="{EMBED_AUDIO_CLASS}"><source src="{src}"></audio>'
-        if verbose:
-            print(f'Converted embed audio "![[{inner}]]" to "{html}"')
-        return html
-    audio_pattern = r'!\[\[([^\[\]|]+\.(?:mp3|wav|ogg|flac|m4a|aac|opus))\]\]'
-    return re.sub(audio_pattern, i_replace, text_md, flags=re.IGNORECASE)
+    return EMBED_AUDIO_PATTERN.sub(lambda m: _render_embedded_audio(m.group(1), file_index, root, verbose=verbose), text_md)
+
+def _render_embedded_audio(
+        inner       :str,
+        file_index  :defaultdict,
+        root        :str,
+        verbose     :bool = False
+) -> str:
+    src = inner.strip()
+    src = resolve_obsidian_path(src, file_index, root)
+    html = f'<audio controls class="{EMBED_AUDIO_CLASS}"><source src="{src}"></audio>'
+    if verbose:
+        print(f'Converted embed audio "![[{inner}]]" to "{html}"')
+    return html
 
 ### Embed Video ###
 
@@ -328,16 +423,20 @@ def _replace_embedded_video(
         root        :str,
         verbose     :bool = False
 ) -> str:
-    def i_replace(match):
-        inner = match.group(1)
-        src = inner.strip()
-        src = resolve_obsidian_path(src, file_index, root)
-        html = f'<video controls class="{EMBED_VIDEO_CLASS}"><source src="{src}"></video>'
-        if verbose:
-            print(f'Converted embed video "![[{inner}]]" to "{html}"')
-        return html
-    video_pattern = r'!\[\[([^\[\]|]+\.(?:mp4|webm|ogv|mov|mkv))\]\]'
-    return re.sub(video_pattern, i_replace, text_md, flags=re.IGNORECASE)
+    return EMBED_VIDEO_PATTERN.sub(lambda m: _render_embedded_video(m.group(1), file_index, root, verbose=verbose), text_md)
+
+def _render_embedded_video(
+        inner       :str,
+        file_index  :defaultdict,
+        root        :str,
+        verbose     :bool = False
+) -> str:
+    src = inner.strip()
+    src = resolve_obsidian_path(src, file_index, root)
+    html = f'<video controls class="{EMBED_VIDEO_CLASS}"><source src="{src}"></video>'
+    if verbose:
+        print(f'Converted embed video "![[{inner}]]" to "{html}"')
+    return html
 
 ### Embed PDF ###
 
@@ -347,16 +446,20 @@ def _replace_embedded_pdf(
         root        :str,
         verbose     :bool = False
 ) -> str:
-    def i_replace(match):
-        inner = match.group(1)
-        src = inner.strip()
-        src = resolve_obsidian_path(src, file_index, root)
-        html = f'<embed src="{src}" type="application/pdf" class="{EMBED_PDF_CLASS}">'
-        if verbose:
-            print(f'Converted embed PDF "![[{inner}]]" to "{html}"')
-        return html
-    pdf_pattern = r'!\[\[([^\[\]|]+\.pdf)\]\]'
-    return re.sub(pdf_pattern, i_replace, text_md, flags=re.IGNORECASE)
+    return EMBED_PDF_PATTERN.sub(lambda m: _render_embedded_pdf(m.group(1), file_index, root, verbose=verbose), text_md)
+
+def _render_embedded_pdf(
+        inner       :str,
+        file_index  :defaultdict,
+        root        :str,
+        verbose     :bool = False
+) -> str:
+    src = inner.strip()
+    src = resolve_obsidian_path(src, file_index, root)
+    html = f'<embed src="{src}" type="application/pdf" class="{EMBED_PDF_CLASS}">'
+    if verbose:
+        print(f'Converted embed PDF "![[{inner}]]" to "{html}"')
+    return html
 
 ### Embed Misc ###
 
@@ -364,62 +467,93 @@ def _catch_embedded_misc(
         text_md :str,
         verbose :bool = False
 ) -> str:
-    misc_pattern = r'!\[\[([^\[\]|]+\.(?!md$)[^\[\]|]+)\]\]'
-    def i_replace(match):
-        inner = match.group(1)
-        message = f'Unhandled Obsidian embed: \"![[{inner}]]\"'
-        if verbose:
-            print(f'ERROR: {message}')
-        raise ValueError(message)
-    return re.sub(misc_pattern, i_replace, text_md, flags=re.IGNORECASE)
+    return EMBED_MISC_PATTERN.sub(lambda m: _raise_embedded_misc(m.group(1), verbose=verbose), text_md)
+
+def _raise_embedded_misc(
+        inner   :str,
+        verbose :bool = False
+):
+    message = f'Unhandled Obsidian embed: \"![[{inner}]]\"'
+    if verbose:
+        print(f'ERROR: {message}')
+    raise ValueError(message)
 
 ##########
 ## Tags ##
 ##########
 
+TAG_PATTERN = re.compile(r'(?<![\w\[\(\{])#([\w/-]+)')
+
 def replace_tags(
         text_md     :str,
         use_links   :bool = False,
-        verbose     :bool = False
+        verbose     :bool = False,
+        href_prefix :str = f"{TAG_PAGES_DIR}/",
+        found       :list | None = None,
 ) -> str:
+    """
+    Replaces #tags, appending each tag name to `found` (if given) for the tag index.
+    """
     if use_links:
-        return _replace_tags_with_links(text_md, verbose)
+        return _replace_tags_with_links(text_md, verbose, href_prefix, found)
     else:
-        return _replace_tags_without_links(text_md, verbose)
+        return _replace_tags_without_links(text_md, verbose, found)
 
-def _replace_tags_with_links(text_md: str, verbose: bool = False) -> str:
+def _replace_tags_with_links(text_md: str, verbose: bool = False, href_prefix: str = f"{TAG_PAGES_DIR}/", found: list | None = None) -> str:
     """
     Replace #tags with clickable <a> elements.
     """
-    def tag_replacer(match):
-        tag = match.group(0)
-        tag_name = match.group(1)
-        tag_href = f"tags/{tag_name}.html"
-        html = f'<a class="{TAGS_CLASS}" {TAGS_DATA}="{tag_name}" href="{tag_href}">{tag}</a>'
-        if verbose:
-            print(f'Converted tag "{tag}" to "{html}"')
-        return html
-    tag_pattern = re.compile(r'(?<![\w\[\(\{])#([\w/-]+)')
-    return tag_pattern.sub(tag_replacer, text_md)
+    return TAG_PATTERN.sub(_tag_replacer(found, use_links=True, verbose=verbose, href_prefix=href_prefix), text_md)
 
-def _replace_tags_without_links(text_md: str, verbose: bool = False) -> str:
+def _replace_tags_without_links(text_md: str, verbose: bool = False, found: list | None = None) -> str:
     """
     Replace #tags with <button> elements for JS-based/dynamic sites.
     """
-    def tag_replacer(match):
-        tag = match.group(0)
-        tag_name = match.group(1)
+    return TAG_PATTERN.sub(_tag_replacer(found, use_links=False, verbose=verbose), text_md)
+
+def _tag_replacer(
+        found       :list | None,
+        use_links   :bool,
+        verbose     :bool = False,
+        href_prefix :str = f"{TAG_PAGES_DIR}/",
+):
+    """`TAG_PATTERN.sub` replacement which appends each tag name to `found` (if given), then renders the tag."""
+    def replace(m :re.Match) -> str:
+        if found is not None:
+            found.append(m.group(1))
+        return render_tag(m.group(0), m.group(1), use_links=use_links, verbose=verbose, href_prefix=href_prefix)
+    return replace
+
+def render_tag(
+        tag         :str,
+        tag_name    :str,
+        use_links   :bool = False,
+        verbose     :bool = False,
+        href_prefix :str = f"{TAG_PAGES_DIR}/",
+) -> str:
+    """
+    Renders a single tag (`tag` is the full "#name" text) as a link or a button.
+    \nLinks point to `{href_prefix}{tag_name}.html`, `href_prefix` being the tag pages folder relative to the note.
+    """
+    if use_links:
+        tag_href = f"{href_prefix}{tag_name}.html"
+        html = f'<a class="{TAGS_CLASS}" {TAGS_DATA}="{tag_name}" href="{tag_href}">{tag}</a>'
+    else:
         html = f'<button class="{TAGS_CLASS}" {TAGS_DATA}="{tag_name}">{tag}</button>'
-        if verbose:
-            print(f'Converted tag "{tag}" to "{html}"')
-        return html
-    tag_pattern = re.compile(r'(?<![\w\[\(\{])#([\w/-]+)')
-    return tag_pattern.sub(tag_replacer, text_md)
+    if verbose:
+        print(f'Converted tag "{tag}" to "{html}"')
+    return html
 
 ##########
 ## Code ##
 ##########
 
+CODE_INLINE_PATTERN = re.compile(r'(?<!`)\`([^\n`]+?)\`(?!`)', re.DOTALL)
+CODE_BLOCK_PATTERN = re.compile(
+    r'(?:^|\n)(```|~~~)[ \t]*([\w+-]*)[ \t]*\n(.*?)(?:\n\1[ \t]*\n?)',
+    re.DOTALL
+)
+
 def replace_code(
         text_md :str,
         verbose :bool = False
@@ -435,15 +569,17 @@ def _replace_code_inline(
     """
     Replace inline code surrounded by single backticks (`)
     """
-    def replacer(match):
-        code = match.group(1)
-        code_escaped = html.escape(code)
-        html_code = f'<code class="{CODE_INLINE_CLASS}">{code_escaped}</code>'
-        if verbose:
-            print(f"Converted inline code: `{code}` -> {html_code}")
-        return html_code
-    pattern = re.compile(r'(?<!`)\`([^\n`]+?)\`(?!`)', re.DOTALL)
-    return pattern.sub(replacer, text_md)
+    return CODE_INLINE_PATTERN.sub(lambda m: render_code_inline(m.group(1), verbose=verbose), text_md)
+
+def render_code_inline(
+        code    :str,
+        verbose :bool = False
+) -> str:
+    code_escaped = html.escape(code)
+    html_code = f'<code class="{CODE_INLINE_CLASS}">{code_escaped}</code>'
+    if verbose:
+        print(f"Converted inline code: `{code}` -> {html_code}")
+    return html_code
 
 def _replace_code_blocks(
         text_md :str,
@@ -452,21 +588,20 @@ def _replace_code_blocks(
     """
     Convert fenced code blocks (```lang or ~~~lang)
     """
-    def code_replacer(match):
-        fence = match.group(1)
-        lang = (match.group(2) or "").strip()
-        code = match.group(3)
-        code_escaped = html.escape(code)
-        class_attr = f' class="{CODE_LANG_CLASS_PREFIX}{lang} {CODE_BLOCK_CLASS}"' if lang else f"class={CODE_BLOCK_CLASS}"
-        html_block = f'<pre><code{class_attr}>{code_escaped}</code></pre>'
-        if verbose:
-            print(f"Converted code block ({lang!r}):\n{code}\n---")
-        return html_block
-    pattern = re.compile(
-        r'(?:^|\n)(```|~~~)[ \t]*([\w+-]*)[ \t]*\n(.*?)(?:\n\1[ \t]*\n?)',
-        re.DOTALL
-    )
-    return pattern.sub(code_replacer, text_md)
+    return CODE_BLOCK_PATTERN.sub(lambda m: render_code_block(m.group(2), m.group(3), verbose=verbose), text_md)
+
+def render_code_block(
+        lang    :str | None,
+        code    :str,
+        verbose :bool = False
+) -> str:
+    lang = (lang or "").strip()
+    code_escaped = html.escape(code)
+    class_attr = f' class="{CODE_LANG_CLASS_PREFIX}{lang} {CODE_BLOCK_CLASS}"' if lang else f"class={CODE_BLOCK_CLASS}"
+    html_block = f'<pre><code{class_attr}>{code_escaped}</code></pre>'
+    if verbose:
+        print(f"Converted code block ({lang!r}):\n{code}\n---")
+    return html_block
 
 ##########
 ## YAML ##
@@ -483,6 +618,10 @@ def _replace_YAML(
 ## Math ##
 ##########
 
+MATH_BLOCK_PATTERN = re.compile(r"\$\$([\s\S]+?)\$\$")
+MATH_INLINE_PATTERN = re.compile(r"\$([^\$\n]+?)\$")
+MATH_ANY_PATTERN = re.compile(r'\$\$[\s\S]+?\$\$|\$[^\$\n]+?\$')
+
 def replace_math(
         text_md                 :str,
         verbose                 :bool = False
@@ -491,21 +630,19 @@ def replace_math(
     Wraps math in HTML containers but leaves $ and $$ delimiters for MathJax/KaTeX.
     """
     # Block math: $$ ... $$
-    text_md = re.sub(
-        r"\$\$([\s\S]+?)\$\$",
-        lambda m: f'<div class="{MATH_BLOCK_CLASS}">$$\n{m.group(1).strip()}\n$$</div>',
-        text_md
-    )
+    text_md = MATH_BLOCK_PATTERN.sub(lambda m: render_math_block(m.group(1)), text_md)
     # Inline math: $...$
-    text_md = re.sub(
-        r"\$([^\$\n]+?)\$",
-        lambda m: f'<span class="{MATH_INLINE_CLASS}">${m.group(1).strip()}$</span>',
-        text_md
-    )
+    text_md = MATH_INLINE_PATTERN.sub(lambda m: render_math_inline(m.group(1)), text_md)
     if verbose:
         print("Math blocks and inline math replaced with wrappers (delimiters kept).")
     return text_md
 
+def render_math_block(math :str) -> str:
+    return f'<div class="{MATH_BLOCK_CLASS}">$$\n{math.strip()}\n$$</div>'
+
+def render_math_inline(math :str) -> str:
+    return f'<span class="{MATH_INLINE_CLASS}">${math.strip()}$</span>'
+
 def embed_MathJax_scripting() -> str:
     """Returns the MathJax script block for HTML output."""
     return """
@@ -525,14 +662,16 @@ options: {
 
 def is_mathjax_necessary(text_md: str) -> bool:
     """Returns True if math blocks or inline math are present."""
-    return bool(re.search(r'\$\$[\s\S]+?\$\$|\$[^\$\n]+?\$', text_md))
+    return bool(MATH_ANY_PATTERN.search(text_md))
 
 ###############
 ## Highlight ##
 ###############
 
+HIGHLIGHT_PATTERN = re.compile(r'==(.+?)==')
+
 def replace_highlight(text_md: str, verbose: bool = False) -> str:
-    text_md = re.sub(r'==(.+?)==', r'<mark>\1</mark>', text_md)
+    text_md = HIGHLIGHT_PATTERN.sub(r'<mark>\1</mark>', text_md)
     if verbose:
         print("Highlight replaced.")
     return text_md
@@ -541,6 +680,8 @@ def replace_highlight(text_md: str, verbose: bool = False) -> str:
 ## Strikethrough ##
 ###################
 
+STRIKETHROUGH_PATTERN = re.compile(r'~~(.*?)~~')
+
 def replace_strikethrough(
         text_md :str,
         verbose :bool = False
@@ -549,7 +690,7 @@ def replace_strikethrough(
     Converts ~~strikethrough~~ to <del>strikethrough</del>.
     """
     # Replace any non-greedy sequence between double tildes with <del>
-    result = re.sub(r'~~(.*?)~~', r'<del>\1</del>', text_md)
+    result = STRIKETHROUGH_PATTERN.sub(r'<del>\1</del>', text_md)
     if verbose:
         print("Strikethrough replaced.")
     return result
@@ -558,9 +699,11 @@ def replace_strikethrough(
 ## Comments ##
 ##############
 
+COMMENT_PATTERN = re.compile(r'%%[\s\S]*?%%')
+
 def replace_comments(text_md: str, verbose: bool = False) -> str:
     # Remove block comments: %% ... %%
-    text_md = re.sub(r'%%[\s\S]*?%%', '', text_md)
+    text_md = COMMENT_PATTERN.sub('', text_md)
     if verbose:
         print("Obsidian comments removed.")
     return text_md
@@ -572,15 +715,17 @@ def replace_comments(text_md: str, verbose: bool = False) -> str:
 import re
 from constants import EXTERNAL_LINK_CLASS, INTERNAL_LINK_CLASS
 
+# Regex to capture full <a ...> tag, the attribute list, and the href value.
+A_TAG_PATTERN = re.compile(
+    r'<a\b([^>]*?\bhref\s*=\s*["\'])([^"\']+)(["\'][^>]*)>',
+    flags=re.IGNORECASE | re.DOTALL,
+)
+CLASS_ATTR_PATTERN = re.compile(r'\bclass\s*=\s*["\']([^"\']*)', flags=re.IGNORECASE)
+
 def mark_link_types(text_html: str, verbose: bool = False) -> str:
     """
     Add EXTERNAL_LINK_CLASS or INTERNAL_LINK_CLASS to <a> tags
     """
-    # Regex to capture full <a ...> tag, the attribute list, and the href value.
-    a_tag_re = re.compile(
-        r'<a\b([^>]*?\bhref\s*=\s*["\'])([^"\']+)(["\'][^>]*)>',
-        flags=re.IGNORECASE | re.DOTALL,
-    )
     def _add_class(tag_attrs: str, href: str, tail: str, tag_full: str) -> str:
         add_cls = None
         if href.startswith(("http://", "https://", "mailto:")):
@@ -590,7 +735,7 @@ def mark_link_types(text_html: str, verbose: bool = False) -> str:
         if not add_cls:
             return tag_full
         # Does the tag already have a class attribute?
-        class_match = re.search(r'\bclass\s*=\s*["\']([^"\']*)', tag_attrs, flags=re.IGNORECASE)
+        class_match = CLASS_ATTR_PATTERN.search(tag_attrs)
         if class_match:
             classes = class_match.group(1).split()
             if add_cls not in classes:
@@ -608,7 +753,7 @@ def mark_link_types(text_html: str, verbose: bool = False) -> str:
         return f"<a{tag_attrs}{href}{tail}>"
     result_parts = []
     pos = 0
-    for m in a_tag_re.finditer(text_html):
+    for m in A_TAG_PATTERN.finditer(text_html):
         start, end = m.span()
         attrs_prefix, href_val, attrs_suffix = m.groups()
         result_parts.append(text_html[pos:start])
@@ -0,0 +1,118 @@
+# First-party
+import html
+import json
+import os
+from urllib.parse import quote
+# Local
+from constants import BACKLINKS_CLASS, INTERNAL_LINK_CLASS
+
+##############
+# LINK GRAPH #
+##############
+
+class LinkGraph:
+    """
+    Note-to-note links of a vault, as resolved while converting (see `util.RecordingIndex.links`).
+    \nNotes are interned once; edges are kept as lists of node ids, so building the graph and its backlinks is O(total links).
+    Links which resolved to no note are kept as "unresolved" nodes, like Obsidian's graph view shows them.
+    """
+    def __init__(self):
+        self.nodes      = []    # Note paths relative to the vault root, or the link text of unresolved links
+        self.outputs    = []    # Output path of each note relative to the vault root, None for unresolved nodes
+        self.edges      = []    # Target node ids of each node
+        self._ids       = {}    # (is unresolved, name) -> node id
+
+    @classmethod
+    def from_manifest(cls, manifest) -> "LinkGraph":
+        """The graph of every note recorded in a `manifest.BuildManifest`."""
+        graph = cls()
+        for rel_path, entry in manifest.notes.items():
+            graph.add_note(rel_path, entry["output"], entry.get("links", ()), entry.get("unresolved", ()))
+        return graph
+
+    def _node(
+            self,
+            name        :str,
+            unresolved  :bool = False,
+    ) -> int:
+        key = (unresolved, name)
+        node = self._ids.get(key)
+        if node is None:
+            node = self._ids[key] = len(self.nodes)
+            self.nodes.append(name)
+            self.outputs.append(None)
+            self.edges.append([])
+        return node
+
+    def add_note(
+            self,
+            rel_path    :str,
+            output      :str,
+            links       :list,
+            unresolved  :list = (),
+    ) -> None:
+        source = self._node(rel_path)
+        self.outputs[source] = output
+        targets = self.edges[source]
+        targets.extend(self._node(target) for target in links)
+        targets.extend(self._node(text, unresolved=True) for text in unresolved)
+
+    def backlinks(self) -> dict:
+        """{note: sorted (source note, source output) pairs of the notes linking to it}, leaving out links of a note to itself."""
+        incoming = {}
+        for source, targets in enumerate(self.edges):
+            for target in targets:
+                if target != source:
+                    incoming.setdefault(target, []).append(source)
+        return {
+            self.nodes[target]: sorted((self.nodes[source], self.outputs[source]) for source in sources)
+            for target, sources in incoming.items()
+            if self.outputs[target] is not None
+        }
+
+    def to_json(self) -> dict:
+        """
+        {"nodes": [{"id", "title", "output"} or {"id", "title", "unresolved": true}], "links": [[source index, target index]]}.
+        \nIndices point into "nodes"; paths are relative to the vault root.
+        """
+        nodes = []
+        for name, output in zip(self.nodes, self.outputs):
+            node = {"id": name, "title": _note_title(name)}
+            if output is None:
+                node["unresolved"] = True
+            else:
+                node["output"] = output
+            nodes.append(node)
+        links = [[source, target] for source, targets in enumerate(self.edges) for target in targets]
+        return {"nodes": nodes, "links": links}
+
+    def write(self, path :str) -> None:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f, separators=(",", ":"), ensure_ascii=False)
+
+#############
+# BACKLINKS #
+#############
+
+def render_backlinks(
+        sources     :list,
+        site_root   :str,
+        root        :str,
+) -> str:
+    """
+    The `{backlinks}` section of a page in output directory `root`: a list linking to each of the (note, output) `sources`, or "" when there are none.
+    \nPaths in `sources` are relative to the vault root `site_root`.
+    """
+    if not sources:
+        return ""
+    lines = [f'<ul class="{BACKLINKS_CLASS}">']
+    for rel_path, output in sources:
+        href = quote(os.path.relpath(os.path.join(site_root, output), root).replace("\\", "/"), safe="/")
+        lines.append(f'<li><a class="{INTERNAL_LINK_CLASS}" href="{href}">{html.escape(_note_title(rel_path))}</a></li>')
+    lines.append("</ul>")
+    return "\n".join(lines)
+
+def _note_title(rel_path :str) -> str:
+    return os.path.splitext(os.path.basename(rel_path))[0]
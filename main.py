@@ -1,18 +1,34 @@
 # First-party
 from collections import defaultdict
+from string import Formatter
+import itertools
 import sys
 import os
 import html
+import json
+import time
 # Local
-from pipeline import convert_markdown_to_html
-from util import parse_ignore_file, should_ignore_files
+# NOTE: `pipeline` (and with it Markdown and its extensions), `writer` and `concurrent.futures` are imported where a conversion needs them,
+# so `--help` and `--clean` start without loading them. `benchmarks/bench_startup.py` keeps them out of the startup imports.
+from util import RecordingIndex, VaultScanner, LazyFileIndex
+from manifest import BuildManifest, BuildCheckpoint, build_fingerprint, hash_bytes
+from profiling import StageProfiler, notify, run_stage, print_summary
+from tags import TagPages, note_tags
+from search import SearchIndex, manifest_terms
+from graph import LinkGraph, render_backlinks
 from constants import (
     CONVERT_IGNORE_LIST_FILE,
+    BUILD_MANIFEST_FILE,
     BUILT_HTML_EXTENSION,
     DEFAULT_TEMPLATE_FILE,
     DEFAULT_GLOBAL_CSS_FILE,
-    DEFAULT_GLOBAL_JS_FILE)
-from util import build_file_index
+    DEFAULT_GLOBAL_JS_FILE,
+    PROFILE_SLOWEST_NOTES,
+    STREAM_MIN_SIZE,
+    SERVE_PORT,
+    CLEAN_THREADS,
+    TAG_PAGES_DIR,
+    SEARCH_DIR)
 
 ############
 # TEMPLATE #
@@ -35,48 +51,174 @@ def apply_template(
         css_path        =None,
         js_path         =None
 ):
-    template = load_template(template_path)
+    template = CompiledTemplate.load(template_path)
     if template is None:
         return content
-    if "{global_css}" in template:
-        if css_path:
-            css_tag = f'<link rel="stylesheet" href="{css_path}">'
-        else:
-            raise ValueError(f"Could not get css path \"{css_path}\"")
-        template = template.replace("{global_css}", css_tag)
-    if "{global_js_module}" in template:
-        if js_path:
-            js_tag = f'<script type="module" src="{js_path}"></script>'
-        else:
-            raise ValueError(f"Could not get js path \"{js_path}\"")
-        template = template.replace("{global_js_module}", js_tag)
-    elif "{global_js}" in template:
-        if js_path:
-            js_tag = f'<script src="{js_path}"></script>'
-        else:
-            raise ValueError(f"Could not get js path \"{js_path}\"")
-        template = template.replace("{global_js}", js_tag)
-    return template.format(
-        title=html.escape(title),
-        content=content
-    )
+    return template.render(content, title=title, css_path=css_path, js_path=js_path)
 
-##############
-# CONVERSION #
-##############
+class CompiledTemplate:
+    """
+    HTML template split at its placeholders once, so rendering a note is a single join.
+    \nSupports the same placeholders as `str.format` on the template did: `{title}`, `{content}`, `{global_css}` and `{global_js_module}` (or else `{global_js}`), with `{{`/`}}` escapes.
+    `{backlinks}` is replaced with the list of notes linking to the page (see `graph.render_backlinks`).
+    """
+    _formatter = Formatter()
+
+    def __init__(self, source :str):
+        allowed = {"title", "content", "backlinks", "global_css", "global_js_module" if "{global_js_module}" in source else "global_js"}
+        # Alternating literal text and (field_name, conversion, format_spec) tuples
+        self.parts = []
+        for literal, field_name, format_spec, conversion in self._formatter.parse(source):
+            if literal:
+                self.parts.append(literal)
+            if field_name is None:
+                continue
+            if self._field_root(field_name) not in allowed:
+                raise KeyError(self._field_root(field_name))
+            self.parts.append((field_name, conversion, format_spec))
+        self.fields = {self._field_root(part[0]) for part in self.parts if isinstance(part, tuple)}
+
+    @classmethod
+    def load(cls, path=None) -> "CompiledTemplate | None":
+        source = load_template(path)
+        return None if source is None else cls(source)
+
+    @staticmethod
+    def _field_root(field_name :str) -> str:
+        """The placeholder name of a field such as `title` or `title.upper`."""
+        return field_name.partition(".")[0].partition("[")[0]
+
+    def render(
+            self,
+            content     :str,
+            title       :str = "",
+            css_path    :str | None = None,
+            js_path     :str | None = None,
+            backlinks   :str = "",
+    ) -> str:
+        values = {"title": html.escape(title), "content": content, "backlinks": backlinks}
+        if "global_css" in self.fields:
+            if not css_path:
+                raise ValueError(f"Could not get css path \"{css_path}\"")
+            values["global_css"] = f'<link rel="stylesheet" href="{css_path}">'
+        if "global_js_module" in self.fields:
+            if not js_path:
+                raise ValueError(f"Could not get js path \"{js_path}\"")
+            values["global_js_module"] = f'<script type="module" src="{js_path}"></script>'
+        elif "global_js" in self.fields:
+            if not js_path:
+                raise ValueError(f"Could not get js path \"{js_path}\"")
+            values["global_js"] = f'<script src="{js_path}"></script>'
+        out = []
+        for part in self.parts:
+            if isinstance(part, str):
+                out.append(part)
+            elif part[0] in values and not part[1] and not part[2]:
+                out.append(values[part[0]])
+            else:
+                field_name, conversion, format_spec = part
+                value, _ = self._formatter.get_field(field_name, (), values)
+                out.append(format(self._formatter.convert_field(value, conversion), format_spec))
+        return "".join(out)
+
+class PageTemplate:
+    """
+    The compiled template of a run plus the relative `global.css`/`global.js` paths of each output directory.
+    \nThe template is read once and the asset files are checked once, instead of once per note.
+    """
+    def __init__(
+            self,
+            template_path   :str | None,
+            site_root       :str,
+    ):
+        self.template   = CompiledTemplate.load(template_path)
+        self.site_root  = site_root
+        self.css_file   = _existing_asset(DEFAULT_GLOBAL_CSS_FILE, site_root)
+        self.js_file    = _existing_asset(DEFAULT_GLOBAL_JS_FILE, site_root)
+        self.uses_backlinks = self.template is not None and "backlinks" in self.template.fields
+        self._asset_paths = {}
+
+    def asset_paths(self, root :str) -> tuple:
+        """Returns the (css, js) paths relative to the output directory `root`, None for missing files."""
+        paths = self._asset_paths.get(root)
+        if paths is None:
+            paths = self._asset_paths[root] = (
+                os.path.relpath(self.css_file, root).replace("\\", "/") if self.css_file else None,
+                os.path.relpath(self.js_file, root).replace("\\", "/") if self.js_file else None,
+            )
+        return paths
+
+    def linked_files(self) -> list:
+        """The global CSS/JS files the rendered pages link to."""
+        if self.template is None:
+            return []
+        fields = self.template.fields
+        files = [self.css_file] if self.css_file and "global_css" in fields else []
+        if self.js_file and ("global_js" in fields or "global_js_module" in fields):
+            files.append(self.js_file)
+        return files
 
-def _build_relative_path(
+    def render(
+            self,
+            content     :str,
+            title       :str,
+            root        :str,
+            backlinks   :list | None = None,
+    ) -> str:
+        """Renders a page in output directory `root`; `backlinks` are the (note, output) pairs linking to it, for `{backlinks}`."""
+        if self.template is None:
+            return content
+        css_rel, js_rel = self.asset_paths(root)
+        backlinks_html = render_backlinks(backlinks, self.site_root, root) if backlinks and self.uses_backlinks else ""
+        return self.template.render(content, title=title, css_path=css_rel, js_path=js_rel, backlinks=backlinks_html)
+
+    def render_around(
+            self,
+            title       :str,
+            root        :str,
+            backlinks   :list | None = None,
+    ) -> tuple | None:
+        """
+        The (head, tail) of the page `render` would produce around its content, for writing the content in pieces.
+        \nReturns None when the template doesn't insert `{content}` exactly once and unformatted.
+        """
+        if self.template is None:
+            return "", ""
+        content_parts = [part for part in self.template.parts if isinstance(part, tuple) and CompiledTemplate._field_root(part[0]) == "content"]
+        if len(content_parts) != 1 or content_parts[0] != ("content", None, ""):
+            return None
+        head, _, tail = self.render(_CONTENT_SENTINEL, title=title, root=root, backlinks=backlinks).partition(_CONTENT_SENTINEL)
+        return head, tail
+
+    def extract_content(
+            self,
+            page_html   :str,
+            title       :str,
+            root        :str,
+            backlinks   :list | None = None,
+    ) -> str | None:
+        """The content `page_html` was rendered around by `render` with these arguments, or None if it isn't such a page."""
+        around = self.render_around(title=title, root=root, backlinks=backlinks)
+        if around is None:
+            return None
+        head, tail = around
+        if len(page_html) < len(head) + len(tail) or not page_html.startswith(head) or not page_html.endswith(tail):
+            return None
+        return page_html[len(head):len(page_html) - len(tail)]
+
+# Stands in for the content when splitting a rendered page around it
+_CONTENT_SENTINEL = "\x00content\x00"
+
+def _existing_asset(
         path        :str,
-        *,
-        root        :str,
         site_root   :str,
 ) -> str | None:
     absolute = os.path.join(site_root, path)
-    return (
-        os.path.relpath(absolute, root).replace("\\", "/")
-        if os.path.isfile(absolute)
-        else None
-    )
+    return absolute if os.path.isfile(absolute) else None
+
+##############
+# CONVERSION #
+##############
 
 def convert_file(
         input_path  :str,
@@ -87,27 +229,81 @@ def convert_file(
         site_root   :str,
         verbose     :bool = False,
         template_path :str = DEFAULT_TEMPLATE_FILE,
+        engine      :"ConverterEngine | None" = None,
+        page        :PageTemplate | None = None,
+        writer      :"OutputWriter | None" = None,
 ) -> None:
-    output_path = _convert_filename(input_path)
-    with open(input_path, "r", encoding="utf-8") as f:
-        text_md = f.read()
-    html = convert_markdown_to_html(
-        text_md,
-        file_index              =file_index,
-        root                    =root,
-        tags_use_links          =use_links,
-        embed_mathjax_scripting =use_mathjax,
-        verbose                 =verbose,
-    )
-    title = os.path.splitext(os.path.basename(input_path))[0]
-    css_rel = _build_relative_path(DEFAULT_GLOBAL_CSS_FILE, root=root, site_root=site_root)
-    js_rel = _build_relative_path(DEFAULT_GLOBAL_JS_FILE, root=root, site_root=site_root)
-    final_html = apply_template(html, title=title, template_path=template_path, css_path=css_rel, js_path=js_rel)
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(final_html)
+    if engine is None:
+        from pipeline import ConverterEngine
+        engine = ConverterEngine(use_links, use_mathjax, verbose)
+    if page is None:
+        page = PageTemplate(template_path, site_root)
+    if writer is None:
+        from writer import OutputWriter
+        writer = OutputWriter(threads=0)
+    output_path, _source = _write_converted_file(input_path, file_index, root, engine, page, writer)
     print(f"Converted {input_path} -> {output_path}")
     return
 
+def _write_converted_file(
+        input_path  :str,
+        file_index  :defaultdict,
+        root        :str,
+        engine      :"ConverterEngine",
+        page        :PageTemplate,
+        writer      :"OutputWriter",
+        backlinks   :list | None = None,
+) -> tuple:
+    """
+    Converts the note at `input_path` and writes its page.
+    \nReturns (output_path, (content hash, mtime_ns, size) of the note as converted), for `BuildManifest.record`.
+    """
+    hooks = engine.hooks
+    output_path = _convert_filename(input_path)
+    # Taken before reading, so an edit made while converting changes the stat the manifest keeps
+    st = os.stat(input_path)
+    if st.st_size >= STREAM_MIN_SIZE:
+        title = os.path.splitext(os.path.basename(input_path))[0]
+        around = page.render_around(title=title, root=root, backlinks=backlinks)
+        if around is not None:
+            digest = _stream_converted_file(input_path, output_path, file_index, root, engine, writer, around)
+            return output_path, (digest, st.st_mtime_ns, st.st_size)
+    start = time.perf_counter()
+    with open(input_path, "rb") as f:
+        data = f.read()
+    # Decoded as text mode would, translating "\r\n" and "\r" newlines
+    text_md = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+    if hooks:
+        notify(hooks, input_path, "read", time.perf_counter() - start, 0, len(text_md))
+    html = engine.convert(text_md, file_index=file_index, root=root, note=input_path)
+    title = os.path.splitext(os.path.basename(input_path))[0]
+    final_html = run_stage(hooks, input_path, "template", lambda text: page.render(text, title=title, root=root, backlinks=backlinks), html)
+    start = time.perf_counter()
+    writer.write(output_path, final_html)
+    if hooks:
+        notify(hooks, input_path, "write", time.perf_counter() - start, len(final_html), 0)
+    return output_path, (hash_bytes(data), st.st_mtime_ns, st.st_size)
+
+def _stream_converted_file(
+        input_path  :str,
+        output_path :str,
+        file_index  :defaultdict,
+        root        :str,
+        engine      :"ConverterEngine",
+        writer      :"OutputWriter",
+        around      :tuple,
+) -> str:
+    """
+    Converts and writes a note too large to hold whole, chunk by chunk (see `streaming.NoteChunker`), between the `around` (head, tail) of its page.
+    \nOnly the engine's own stages are reported to hooks, once per chunk. Returns the content hash of the note as read.
+    """
+    from streaming import NoteChunker
+    head, tail = around
+    chunks = NoteChunker(input_path)
+    pieces = engine.convert_stream(chunks, file_index=file_index, root=root, note=input_path)
+    writer.write_stream(output_path, itertools.chain((head,), pieces, (tail,)))
+    return chunks.digest
+
 def _convert_filename(input_path    :str):
     base = os.path.splitext(input_path)[0]
     filename = os.path.basename(base)
@@ -121,32 +317,461 @@ def convert_directory(
         use_links   :bool,
         use_mathjax :bool,
         verbose     :bool,
-        template_path :str = DEFAULT_TEMPLATE_FILE
+        template_path :str = DEFAULT_TEMPLATE_FILE,
+        incremental :bool = True,
+        jobs        :int = 1,
+        profiler    :StageProfiler | None = None,
+        graph_path  :str | None = None,
+        use_search  :bool = False,
+        keep_going  :bool = False,
+        error_report :str | None = None,
+        out_dir     :str | None = None,
+) -> list:
+    """
+    Converts every (non-ignored) markdown file under `input_dir`.
+    \nWith `jobs` > 1 or `keep_going`, failures are reported per note instead of aborting the build; otherwise the first failure aborts it.
+    \nWith a `profiler`, the stage timings of every converted note are recorded into it.
+    \nWith `use_links`, the tag pages and tag index are brought up to date as well.
+    \nThe notes each note links to are recorded in the manifest. When the template has a `{backlinks}` placeholder,
+    notes are first rendered with the backlinks of the previous build; the pages of those whose backlinks changed are then rendered again
+    around the content already written (see `_relink_pages`), so each note is converted once.
+    With `graph_path`, the link graph is written there as JSON (see `graph.LinkGraph.to_json`).
+    \nDirectory listings come from the persisted listing cache (see `util.DirectoryCache`) unless `incremental` is False.
+    \nWith `use_search`, the sharded search index (see `search.SearchIndex`) is brought up to date as well.
+    \nThe manifest is checkpointed while converting (see `manifest.BuildCheckpoint`) and saved even when the build is aborted,
+    so the next incremental build resumes with the notes not converted yet. With `error_report`, a JSON report of the build and its failures is written there.
+    \nWith `out_dir`, the pages, tag pages and search index are written into that directory in the vault's layout instead of into the vault,
+    and the files they reference are mirrored next to them (see `mirror.AssetMirror`). The manifest stays in the vault and records `out_dir`;
+    building into another directory than the last build starts a new manifest, leaving the pages in the old one alone.
+    \nReturns a list of (input_path, error message) for notes which failed to convert.
+    """
+    vault = VaultScanner(input_dir, cache=incremental).scan()
+    file_index = vault.file_index
+    manifest_path = os.path.join(input_dir, BUILD_MANIFEST_FILE)
+    manifest = BuildManifest.load(manifest_path)
+    out_dir = os.path.abspath(out_dir) if out_dir is not None else None
+    if manifest.out_dir != out_dir:
+        if manifest.notes:
+            print(f"The last build wrote to {manifest.out_dir or input_dir}; its pages there are left alone.")
+        manifest = BuildManifest(manifest_path, out_dir=out_dir)
+    options = (use_links, use_mathjax, input_dir, verbose, template_path, use_search)
+    page = _build_page(options)
+    # Best guess until this build's links are known; kept even when the manifest is reset
+    backlinks = LinkGraph.from_manifest(manifest).backlinks() if page.uses_backlinks else None
+    fingerprint = build_fingerprint(template_path, input_dir, use_links, use_mathjax, use_search)
+    full_build = not incremental or manifest.fingerprint != fingerprint
+    if full_build:
+        manifest.reset(fingerprint)
+    elif not manifest.complete:
+        print("Resuming the previous build, which stopped early.")
+    # The tag pages and search index of a build which stopped early never caught up with its notes
+    full_pages = full_build or not manifest.complete
+    previous_tags = note_tags(manifest)
+    previous_terms = manifest_terms(manifest)
+    from writer import OutputWriter
+    writer = OutputWriter(site_root=input_dir, out_dir=out_dir)
+    seen = set()
+    skipped = 0
+    worklist = []
+    for input_path, root, rel_path in vault.notes:
+        seen.add(rel_path)
+        if not manifest.is_stale(input_path, writer.target(_convert_filename(input_path)), file_index):
+            skipped += 1
+            continue
+        worklist.append((input_path, root))
+    failures = []
+    checkpoint = BuildCheckpoint(manifest, writer.flush)
+    manifest.complete = False
+    aborted = None
+    try:
+        _convert_worklist(worklist, file_index, options, jobs, writer, manifest, failures, checkpoint, profiler, backlinks, keep_going)
+        removed = _remove_outputs(manifest.prune(seen), out_dir or input_dir)
+        if removed:
+            print(f"Removed the pages of {removed} notes which are gone.")
+        graph = LinkGraph.from_manifest(manifest)
+        if backlinks is not None:
+            backlinks = graph.backlinks()
+            relinked = _stale_backlinks(vault.notes, manifest, backlinks)
+            if relinked:
+                print(f"Updating the backlinks of {len(relinked)} notes.")
+                reconvert = _relink_pages(relinked, manifest, page, writer, backlinks)
+                _convert_worklist(reconvert, file_index, options, jobs, writer, manifest, failures, checkpoint, profiler, backlinks, keep_going)
+                worklist += relinked
+        if graph_path:
+            graph.write(graph_path)
+            print(f"Wrote link graph of {len(graph.nodes)} notes to {graph_path}")
+        if use_links:
+            tag_pages = TagPages(input_dir, page, writer).update(manifest, previous_tags, full=full_pages)
+            if tag_pages:
+                print(f"Updated {tag_pages} tag pages.")
+        if use_search:
+            shards = SearchIndex(input_dir, writer).update(manifest, previous_terms, full=full_pages)
+            if shards:
+                print(f"Updated {shards} search index shards.")
+        if out_dir is not None:
+            from mirror import AssetMirror
+            mirror = AssetMirror(input_dir, out_dir)
+            if mirror.update(manifest, page.linked_files()):
+                print(mirror.summary())
+        manifest.complete = True
+    except BaseException as e:
+        aborted = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        try:
+            # Outputs must be on disk before the manifest vouches for them
+            writer.close()
+            manifest.save()
+        finally:
+            if error_report:
+                _write_error_report(error_report, manifest, failures, len(checkpoint.converted), skipped, aborted)
+    if worklist:
+        print(writer.summary())
+    if skipped:
+        print(f"Skipped {skipped} unchanged notes (use --full to force a rebuild).")
+    if failures:
+        print(f"Failed to convert {len(failures)} notes.")
+    return failures
+
+def _convert_worklist(
+        worklist    :list,
+        file_index  :defaultdict,
+        options     :tuple,
+        jobs        :int,
+        writer      :"OutputWriter",
+        manifest    :BuildManifest,
+        failures    :list,
+        checkpoint  :BuildCheckpoint | None = None,
+        profiler    :StageProfiler | None = None,
+        backlinks   :dict | None = None,
+        keep_going  :bool = False,
 ) -> None:
-    ignore_path = os.path.join(input_dir, CONVERT_IGNORE_LIST_FILE)
-    ignore_patterns = parse_ignore_file(ignore_path)
-    file_index = build_file_index(input_dir)
-    for root, dirs, files in os.walk(input_dir):
-        rel_dir = os.path.relpath(root, input_dir)
-        dirs[:] = [d for d in dirs if not should_ignore_files(os.path.normpath(os.path.join(rel_dir, d)), ignore_patterns, is_dir=True)]
-        for filename in files:
-            rel_path = os.path.normpath(os.path.join(rel_dir, filename))
-            if should_ignore_files(rel_path, ignore_patterns):
-                continue
-            if filename.lower().endswith(".md"):
-                input_path = os.path.join(root, filename)
-                out_dir = os.path.join(input_dir, os.path.dirname(rel_path))
-                os.makedirs(out_dir, exist_ok=True)
-                convert_file(
-                    input_path      = input_path,
-                    use_links       = use_links,
-                    use_mathjax     = use_mathjax,
-                    file_index      = file_index,
-                    root            = root,
-                    site_root       = input_dir,
-                    verbose         = verbose,
-                    template_path   = template_path)
-    return
+    """Converts the (input_path, root) notes of `worklist` and records them in `manifest`, appending failures to `failures`."""
+    if jobs > 1 and len(worklist) > 1:
+        results = _convert_parallel(worklist, file_index, options, jobs, writer, profiler, backlinks)
+    else:
+        results = _convert_serial(worklist, file_index, options, writer, profiler, backlinks, keep_going)
+    for input_path, output_path, facts, error in results:
+        if error is not None:
+            print(f"Failed {input_path}: {error}")
+            failures.append((input_path, error))
+            continue
+        for warning in facts.pop("warnings"):
+            print(warning)
+        print(f"Converted {input_path} -> {writer.target(output_path)}")
+        manifest.record(input_path, output_path, **facts)
+        if checkpoint is not None:
+            checkpoint.recorded(input_path)
+
+def _remove_outputs(
+        outputs     :list,
+        site_root   :str,
+) -> int:
+    """Removes the `outputs` (relative to `site_root`) of notes which are gone. Returns the number of files removed."""
+    removed = 0
+    for output in outputs:
+        try:
+            os.remove(os.path.join(site_root, output))
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+def _write_error_report(
+        path        :str,
+        manifest    :BuildManifest,
+        failures    :list,
+        converted   :int,
+        skipped     :int,
+        aborted     :str | None = None,
+) -> None:
+    """
+    Writes the outcome of a directory build as JSON: whether it completed (else the error which aborted it), how many notes were converted
+    and skipped, and every failed note (relative to the vault root) with its error.
+    """
+    report = {
+        "complete"  : aborted is None,
+        "aborted"   : aborted,
+        "converted" : converted,
+        "skipped"   : skipped,
+        "failed"    : [{"note": manifest.rel_path(input_path), "error": error} for input_path, error in failures],
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+def _stale_backlinks(
+        notes       :list,
+        manifest    :BuildManifest,
+        backlinks   :dict,
+) -> list:
+    """The (input_path, root) of every recorded note whose page was rendered with other backlinks than `backlinks` holds."""
+    stale = []
+    for input_path, root, rel_path in notes:
+        entry = manifest.notes.get(rel_path)
+        if entry is not None and entry["backlinks"] != [source for source, _output in backlinks.get(rel_path, ())]:
+            stale.append((input_path, root))
+    return stale
+
+def _relink_pages(
+        notes       :list,
+        manifest    :BuildManifest,
+        page        :PageTemplate,
+        writer      :"OutputWriter",
+        backlinks   :dict,
+) -> list:
+    """
+    Renders the pages of the (input_path, root) `notes` again with their entry of `backlinks`, around the content of the page already written,
+    so only the template runs again and not the conversion. The content is cut out of the page as rendered with the backlinks its manifest entry records.
+    \nReturns the notes whose page couldn't be reused this way (a template which formats `{content}`, a page too large to hold whole,
+    or one changed since), which must be converted again.
+    """
+    writer.flush()
+    reconvert = []
+    for input_path, root in notes:
+        rel_path = manifest.rel_path(input_path)
+        entry = manifest.notes[rel_path]
+        output_path = _convert_filename(input_path)
+        page_path = writer.target(output_path)
+        title = os.path.splitext(os.path.basename(input_path))[0]
+        # Outputs only depend on the note path, so the pairs the page was rendered with follow from the recorded sources
+        previous = [(source, manifest.rel_path(_convert_filename(os.path.join(manifest.site_root, source)))) for source in entry["backlinks"]]
+        content = None
+        try:
+            if os.path.getsize(page_path) < STREAM_MIN_SIZE:
+                with open(page_path, "r", encoding="utf-8", newline="") as f:
+                    page_html = f.read()
+                if os.linesep != "\n":
+                    page_html = page_html.replace(os.linesep, "\n")
+                content = page.extract_content(page_html, title=title, root=root, backlinks=previous)
+        except OSError:
+            pass
+        if content is None:
+            reconvert.append((input_path, root))
+            continue
+        sources = backlinks.get(rel_path, [])
+        writer.write(output_path, page.render(content, title=title, root=root, backlinks=sources))
+        entry["backlinks"] = [source for source, _output in sources]
+    return reconvert
+
+def _convert_serial(
+        worklist    :list,
+        file_index  :defaultdict,
+        options     :tuple,
+        writer      :"OutputWriter",
+        profiler    :StageProfiler | None = None,
+        backlinks   :dict | None = None,
+        keep_going  :bool = False,
+):
+    engine = _build_engine(options, profiler)
+    page = _build_page(options)
+    for input_path, root in worklist:
+        try:
+            result = _convert_job(input_path, root, file_index, engine, page, writer, backlinks)
+        except Exception as e:
+            # Serial builds keep failing fast, as they always have, unless asked to keep going
+            if not keep_going:
+                raise
+            result = input_path, None, None, f"{type(e).__name__}: {e}"
+        yield result
+
+def _build_engine(
+        options     :tuple,
+        profiler    :StageProfiler | None = None,
+) -> "ConverterEngine":
+    from pipeline import ConverterEngine
+    use_links, use_mathjax, site_root, verbose, _template_path, use_search = options
+    return ConverterEngine(use_links, use_mathjax, verbose, hooks=[profiler] if profiler is not None else None, site_root=site_root, index_terms=use_search)
+
+def _build_page(options :tuple) -> PageTemplate:
+    _use_links, _use_mathjax, site_root, _verbose, template_path, _use_search = options
+    return PageTemplate(template_path, site_root)
+
+############
+# PARALLEL #
+############
+
+# Per-process state, set once by `_init_worker` when the pool starts
+_worker_state = {}
+
+def _init_worker(
+        file_index  :defaultdict,
+        options     :tuple,
+        profile     :bool,
+        backlinks   :dict | None,
+        out_dir     :str | None = None,
+):
+    _worker_state["file_index"]     = file_index
+    _worker_state["backlinks"]      = backlinks
+    _worker_state["profiler"]       = StageProfiler() if profile else None
+    _worker_state["engine"]         = _build_engine(options, _worker_state["profiler"])
+    _worker_state["page"]           = _build_page(options)
+    from writer import OutputWriter
+    # Workers already overlap conversion with disk I/O, so they write synchronously
+    _worker_state["writer"]         = OutputWriter(threads=0, site_root=options[2], out_dir=out_dir)
+
+def _run_worker_job(job :tuple):
+    """
+    Returns the job result, whether the output was left unchanged and, when profiling, the note's stage records for the main process.
+    """
+    input_path, root = job
+    writer = _worker_state["writer"]
+    unchanged = writer.unchanged
+    try:
+        result = _convert_job(input_path, root, _worker_state["file_index"], _worker_state["engine"], _worker_state["page"], writer, _worker_state["backlinks"])
+    except Exception as e:
+        result = input_path, None, None, f"{type(e).__name__}: {e}"
+    profiler = _worker_state["profiler"]
+    return result, writer.unchanged > unchanged, profiler.pop_note(input_path) if profiler is not None else None
+
+def _convert_parallel(
+        worklist    :list,
+        file_index  :defaultdict,
+        options     :tuple,
+        jobs        :int,
+        writer      :"OutputWriter",
+        profiler    :StageProfiler | None = None,
+        backlinks   :dict | None = None,
+):
+    """Yields job results in worklist order, so output and manifest match the serial run."""
+    from concurrent.futures import ProcessPoolExecutor
+    chunksize = max(1, len(worklist) // (jobs * 8))
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(file_index, options, profiler is not None, backlinks, writer.out_dir)) as pool:
+        for result, unchanged, records in pool.map(_run_worker_job, worklist, chunksize=chunksize):
+            if result[3] is None:
+                writer.count(written=not unchanged)
+            if records:
+                profiler.add_note(result[0], records)
+            yield result
+
+def _convert_job(
+        input_path      :str,
+        root            :str,
+        file_index      :defaultdict,
+        engine          :"ConverterEngine",
+        page            :PageTemplate,
+        writer          :"OutputWriter",
+        backlinks       :dict | None = None,
+) -> tuple:
+    """
+    Converts one note of a directory build, rendering it with its entry of the {note: (source, output) pairs} `backlinks`.
+    \nReturns (input_path, output_path, facts for `BuildManifest.record`, None). The "warnings" fact is for the caller to report, not to record.
+    """
+    os.makedirs(root, exist_ok=True)
+    recording_index = RecordingIndex(file_index)
+    sources = None
+    if page.uses_backlinks:
+        rel_path = os.path.relpath(os.path.abspath(input_path), os.path.abspath(page.site_root)).replace("\\", "/")
+        sources = (backlinks or {}).get(rel_path, [])
+    output_path, source = _write_converted_file(input_path, recording_index, root, engine, page, writer, sources)
+    facts = {
+        "source"    : source,
+        "lookups"   : recording_index.lookups,
+        "tags"      : list(engine.tags),
+        "links"     : recording_index.links,
+        "unresolved": recording_index.unresolved,
+        "backlinks" : [source for source, _output in sources] if sources is not None else None,
+        "embeds"    : dict(engine.embeds),
+        "terms"     : engine.terms,
+        "assets"    : recording_index.assets,
+        "warnings"  : list(engine.warnings),
+    }
+    return input_path, output_path, facts, None
+
+###############
+# LIBRARY API #
+###############
+
+class NoteResult:
+    """
+    One converted note, as yielded by `iter_convert`.
+    \n`output` is the path the CLI would write the page to and `html` the whole page. `links` are the absolute paths of the notes its links resolved to,
+    `unresolved` the text of its links to missing notes and `embeds` maps each note it transcluded to that note's content hash.
+    `assets` are the absolute paths of the other files its embeds and links resolved to. `terms` holds its weighted search terms (see `search.note_terms`) when converting with `use_search`.
+    `warnings` holds the messages about its embeds left as links (recursive, nested too deep or of a missing heading).
+    \n`timings` maps each stage the note went through (see `profiling.StageHook`), from "read" to "template", to its seconds.
+    """
+    def __init__(
+            self,
+            source      :str,
+            output      :str,
+            html        :str,
+            tags        :list,
+            links       :list,
+            unresolved  :list,
+            embeds      :dict,
+            assets      :list,
+            terms       :dict | None,
+            timings     :dict,
+            warnings    :list,
+    ):
+        self.source     = source
+        self.output     = output
+        self.html       = html
+        self.tags       = tags
+        self.links      = links
+        self.unresolved = unresolved
+        self.embeds     = embeds
+        self.assets     = assets
+        self.terms      = terms
+        self.timings    = timings
+        self.warnings   = warnings
+
+    def __repr__(self) -> str:
+        return f"NoteResult({self.source!r} -> {self.output!r}, {len(self.html)} characters)"
+
+def iter_convert(
+        vault           :str,
+        use_links       :bool = False,
+        use_mathjax     :bool = False,
+        template_path   :str = DEFAULT_TEMPLATE_FILE,
+        verbose         :bool = False,
+        use_search      :bool = False,
+):
+    """
+    Converts every (non-ignored) note of the directory `vault`, or the single note `vault`, yielding a `NoteResult` per note as soon as it is converted.
+    \nNothing is printed and nothing is written: neither pages nor a build manifest, tag pages or a search index. Every note is converted, as with `--full`.
+    Options are those of the CLI flags. When the template has a `{backlinks}` placeholder, backlinks come from the last directory build, if any.
+    \nConversion errors are raised from the generator, like a serial CLI build stops at the first failing note.
+    """
+    from writer import MemoryWriter
+    if os.path.isdir(vault):
+        scanned = VaultScanner(vault, cache=True).scan()
+        file_index, notes, site_root = scanned.file_index, scanned.notes, vault
+    else:
+        site_root = os.path.dirname(os.path.abspath(vault))
+        file_index = LazyFileIndex(site_root)
+        notes = [(vault, site_root, os.path.basename(vault))]
+    options = (use_links, use_mathjax, site_root, verbose, template_path, use_search)
+    profiler = StageProfiler()
+    engine = _build_engine(options, profiler)
+    page = _build_page(options)
+    backlinks = None
+    if page.uses_backlinks:
+        backlinks = LinkGraph.from_manifest(BuildManifest.load(os.path.join(site_root, BUILD_MANIFEST_FILE))).backlinks()
+    writer = MemoryWriter()
+    for input_path, root, _rel_path in notes:
+        _, output_path, facts, _ = _convert_job(input_path, root, file_index, engine, page, writer, backlinks)
+        timings = {}
+        for stage, seconds, _size_in, _size_out in profiler.pop_note(input_path):
+            if stage != "write":
+                timings[stage] = timings.get(stage, 0.0) + seconds
+        yield NoteResult(
+            source      = input_path,
+            output      = output_path,
+            html        = writer.pop(output_path),
+            tags        = facts["tags"],
+            links       = facts["links"],
+            unresolved  = facts["unresolved"],
+            embeds      = facts["embeds"],
+            assets      = facts["assets"],
+            terms       = facts["terms"] if use_search else None,
+            timings     = timings,
+            warnings    = facts["warnings"],
+        )
+    if isinstance(file_index, LazyFileIndex):
+        file_index.save()
 
 ###########
 # CLEANUP #
@@ -155,30 +780,91 @@ def convert_directory(
 def clean_md_html_files(
         root            :str    =".",
         remove_index    :bool   =False,
-        force           :bool   =False
+        force           :bool   =False,
+        dry_run         :bool   =False,
 ):
-    files_to_remove = []
-    for dirpath, _, filenames in os.walk(root):
-        for fname in filenames:
-            if (fname.endswith(BUILT_HTML_EXTENSION)
-                or (remove_index and fname.endswith("index.html"))):
-                fpath = os.path.join(dirpath, fname)
-                files_to_remove.append(fpath)
-    if not files_to_remove:
-        print(f"No {BUILT_HTML_EXTENSION} files found. If this is unexpected, it may be due to modification of `constants.BUILT_HTML_EXTENSION`.")
+    """
+    Removes the files built in the vault at `root`.
+    \nWhen the vault has a build manifest, exactly the files it records are removed, without walking the vault: every note's page, the tag pages and tag index,
+    the search index and the manifest itself. Otherwise every `BUILT_HTML_EXTENSION` file found by walking the vault is.
+    When the build wrote to an output directory (`--out`), the files are removed from there, along with the mirrored assets and the directories left empty.
+    "index.html" files are only removed with `remove_index`.
+    \nAsks once before removing anything unless `force`; with `dry_run`, only lists the files. Files are removed on `CLEAN_THREADS` threads.
+    """
+    manifest_path = os.path.join(root, BUILD_MANIFEST_FILE)
+    manifest = BuildManifest.load(manifest_path) if os.path.isfile(manifest_path) else None
+    site_dir = root
+    if manifest is not None and manifest.fingerprint:
+        site_dir = manifest.out_dir or root
+        files_to_remove = [fpath for fpath in _built_files(manifest, site_dir) if remove_index or os.path.basename(fpath) != "index.html"]
+        files_to_remove.append(manifest_path)
+        source = f"recorded in {manifest_path}"
+    else:
+        files_to_remove = [
+            fpath for fpath in VaultScanner(root, cache=True).scan().outputs
+            if fpath.endswith(BUILT_HTML_EXTENSION) or remove_index
+        ]
+        source = f"under {root}"
+        if not files_to_remove:
+            print(f"No {BUILT_HTML_EXTENSION} files found. If this is unexpected, it may be due to modification of `constants.BUILT_HTML_EXTENSION`.")
+            return
+    if dry_run:
+        for fpath in files_to_remove:
+            print(f"Would delete {fpath}")
+        print(f"{len(files_to_remove)} built files {source} would be deleted.")
         return
-    print(f"Found {len(files_to_remove)} {BUILT_HTML_EXTENSION} files to delete.")
-    for fpath in files_to_remove:
-        if not force:
-            resp = input(f"Delete {fpath}? [y/N] ").strip().lower()
-            if resp != "y":
-                print("Skipped.")
-                continue
+    print(f"Found {len(files_to_remove)} built files {source} to delete.")
+    if not force:
+        resp = input(f"Delete all {len(files_to_remove)} files? [y/N] ").strip().lower()
+        if resp != "y":
+            print("Skipped.")
+            return
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=CLEAN_THREADS) as pool:
+        errors = [error for error in pool.map(_remove_file, files_to_remove) if error is not None]
+    for directory in (os.path.join(site_dir, TAG_PAGES_DIR), os.path.join(site_dir, SEARCH_DIR)) if site_dir == root else (site_dir,):
+        _remove_empty_tree(directory)
+    for error in errors:
+        print(error)
+    print(f"Deleted {len(files_to_remove) - len(errors)} files.")
+
+def _built_files(
+        manifest    :BuildManifest,
+        root        :str,
+) -> list:
+    """Every file the build recorded in `manifest` wrote under `root`: the pages of its notes, its tag pages, its search index and its mirrored assets."""
+    files = [os.path.join(root, entry["output"]) for entry in manifest.notes.values()]
+    files += [os.path.join(root, output) for output in manifest.dropped_outputs.values()]
+    if manifest.tag_pages:
+        tag_pages = TagPages(root, None, None)
+        files += [tag_pages.page_path(name) for name in manifest.tag_pages]
+        files.append(tag_pages.index_path)
+    if manifest.search_shards:
+        search = SearchIndex(root, None)
+        files += [search.shard_path(key) for key in manifest.search_shards]
+        files.append(search.index_path)
+    files += [os.path.join(root, rel_path) for rel_path in manifest.mirrored]
+    return files
+
+def _remove_file(fpath :str) -> str | None:
+    """Removes `fpath`, returning the error message if that failed. Files which are already gone count as removed."""
+    try:
+        os.remove(fpath)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        return f"Could not delete {fpath}: {e}"
+    return None
+
+def _remove_empty_tree(directory :str) -> None:
+    """Removes `directory` and the directories below it if no file is left in them."""
+    if not os.path.isdir(directory):
+        return
+    for dir_path, _dirs, _files in os.walk(directory, topdown=False):
         try:
-            os.remove(fpath)
-            print(f"Deleted {fpath}")
-        except Exception as e:
-            print(f"Could not delete {fpath}: {e}")
+            os.rmdir(dir_path)
+        except OSError:
+            pass
 
 ##############
 # PRINT HELP #
@@ -189,8 +875,8 @@ def print_help():
 obsidian-md-html
 
 Usage:
-    obsidian-md-html [<input.md|input_dir>] [--taglinks] [--mathjax] [--template <template.html>] [--verbose] [--help]
-    obsidian-md-html --clean [--force] [--index]
+    obsidian-md-html [<input.md|input_dir>] [--taglinks] [--mathjax] [--template <template.html>] [--full] [--jobs N] [--keep-going] [--error-report <report.json>] [--out <dir>] [--watch] [--serve [--port N]] [--graph <graph.json>] [--search] [--profile <report.json> [--profile-top N]] [--verbose] [--help]
+    obsidian-md-html [<input_dir>] --clean [--force] [--index] [--dry-run]
 
 Arguments:
     <input.md>       Input markdown file to convert (outputs <input>{BUILT_HTML_EXTENSION}).
@@ -198,18 +884,39 @@ Arguments:
                      Outputs <file{BUILT_HTML_EXTENSION}> adjacent to each source file.
 Options:
     --taglinks                  Convert tags to clickable <a> elements (for static HTML sites).
+                                Directory builds also write a page per tag to tags/ and an index to tags/tags.json.
     --mathjax                   Add MathJax script for math rendering if math blocks/inlines are detected.
     --template <template.html>  Use a custom HTML template file (default: template.html).
+    --full                      Reconvert every note, ignoring the build manifest and the cached directory listings of the previous run.
+    --jobs N, -j N              Convert notes on N worker processes (directory builds only; default: 1).
+    --keep-going, -k            Report notes which fail to convert and carry on with the rest (always the case with --jobs).
+    --error-report <report.json>
+                                Write the outcome of a directory build and every failed note with its error as JSON.
+    --out <dir>                 Write the pages of a directory build into <dir> (outside the directory) instead of next to the notes,
+                                and mirror the files they embed or link to into it, hardlinked where possible.
+    --watch                     After converting a directory, keep polling it and reconvert changed notes and the notes linking to them.
+    --serve                     Preview a directory over HTTP, converting each requested page on demand (nothing is written to disk).
+    --port N                    Port for --serve (default: {SERVE_PORT}).
+    --graph <graph.json>        Write the vault's link graph (notes, links between them and unresolved links) as JSON, e.g. for a graph view.
+    --search                    Write a search index of the converted notes to search/, sharded by term prefix (directory builds only).
+    --profile <report.json>     Time every conversion stage of every converted note and write a JSON report of per-stage totals and the slowest notes.
+    --profile-top N             Number of slowest notes listed in the profile report (default: {PROFILE_SLOWEST_NOTES}).
     --verbose                   Print debug output.
     --help, -h                  Show this help message and exit.
-    --clean                     Remove all built files (use "--force" or "-f" to bypass checks; use "--index" or "-i" to remove "index.html")
+    --clean                     Remove the built files of the directory (use "--force" or "-f" to bypass checks; use "--index" or "-i" to remove "index.html")
+                                Only the files recorded in its {BUILD_MANIFEST_FILE} are removed; without one, the directory is searched for them.
     --force, -f                 Neglect user double-checking during "--clean"
     --index, -i                 Remove "index.html" during "--clean"
+    --dry-run                   List the files "--clean" would remove without removing them
 
 Notes:
     - If no input is provided, the current directory is converted.
     - If a {CONVERT_IGNORE_LIST_FILE}(default:".convertignore") file is present in the input directory, listed files/directories are ignored.
-    - All embedded assets are referenced, not copied.
+    - All embedded assets are referenced, not copied, unless building with --out.
+    - Directory builds record a {BUILD_MANIFEST_FILE} manifest in the input directory; later builds only reconvert notes whose source, link targets, template or options changed.
+    - The manifest is also saved while converting and when a build stops early, so running the build again resumes where it stopped.
+    - Directory listings are cached in the user cache directory and only directories whose mtime changed are listed again.
+    - A {{backlinks}} placeholder in the template is replaced with links to the notes linking to the page.
     - Output HTML files always use the <input>{BUILT_HTML_EXTENSION}(default:".md.html") naming convention for safe cleanup.
 
 Examples:
@@ -218,13 +925,32 @@ Examples:
     obsidian-md-html README.md                      # Convert single file (outputs README{BUILT_HTML_EXTENSION})
     obsidian-md-html --taglinks --mathjax           # Convert all .md in current directory with tag links and math
     obsidian-md-html --template mytemplate.html     # Use custom template
+    obsidian-md-html notes --jobs 8                 # Convert 'notes' on 8 worker processes
+    obsidian-md-html notes -k --error-report e.json # Convert 'notes' past failing notes and list them in e.json
+    obsidian-md-html notes --watch                  # Convert 'notes', then reconvert notes as they are edited
+    obsidian-md-html notes --serve                  # Preview 'notes' at http://127.0.0.1:{SERVE_PORT}/
+    obsidian-md-html notes --search                 # Convert 'notes' and build its search index
+    obsidian-md-html notes --out site               # Convert 'notes' into 'site', with only the assets its pages use
+    obsidian-md-html notes --full --profile p.json  # Rebuild 'notes' and report where the conversion time goes
     obsidian-md-html --clean -f -i                  # Remove all built files immediatly, including "index.html"
+    obsidian-md-html notes --clean --dry-run        # List the files built in 'notes' without removing them
 """)
 
 ########
 # MAIN #
 ########
 
+def _write_profile(
+        profiler        :StageProfiler | None,
+        profile_path    :str | None,
+        profile_top     :int,
+) -> None:
+    if profiler is None:
+        return
+    report = profiler.write(profile_path, profile_top)
+    print_summary(report)
+    print(f"Wrote profile report to {profile_path}")
+
 def main():
     args = sys.argv[1:]
     if '--help' in args or '-h' in args:
@@ -233,11 +959,22 @@ def main():
     if '--clean' in args:
         force = '--force' in args or '-f' in args
         remove_index = '--index' in args or '-i' in args
-        clean_md_html_files(force=force, remove_index=remove_index)
+        dry_run = '--dry-run' in args
+        paths = [arg for arg in args if not arg.startswith('-')]
+        root = paths[0] if paths else "."
+        if not os.path.isdir(root):
+            print("Error: --clean requires a directory.")
+            sys.exit(1)
+        clean_md_html_files(root=root, force=force, remove_index=remove_index, dry_run=dry_run)
         sys.exit(0)
     use_links = '--taglinks' in args
     use_mathjax = '--mathjax' in args
     verbose = '--verbose' in args
+    incremental = '--full' not in args
+    watch = '--watch' in args
+    serve = '--serve' in args
+    use_search = '--search' in args
+    keep_going = '--keep-going' in args or '-k' in args
     template_path = DEFAULT_TEMPLATE_FILE
     if '--template' in args:
         t_idx = args.index('--template')
@@ -247,17 +984,117 @@ def main():
         else:
             print("Error: --template flag requires a path to the template HTML file.")
             sys.exit(1)
-    args = [arg for arg in args if not arg.startswith('--')]
+    profile_path = None
+    if '--profile' in args:
+        p_idx = args.index('--profile')
+        if p_idx < len(args) - 1 and not args[p_idx + 1].startswith('-'):
+            profile_path = args[p_idx + 1]
+            del args[p_idx:p_idx+2]
+        else:
+            print("Error: --profile flag requires a path for the JSON report.")
+            sys.exit(1)
+    graph_path = None
+    if '--graph' in args:
+        g_idx = args.index('--graph')
+        if g_idx < len(args) - 1 and not args[g_idx + 1].startswith('-'):
+            graph_path = args[g_idx + 1]
+            del args[g_idx:g_idx+2]
+        else:
+            print("Error: --graph flag requires a path for the JSON graph.")
+            sys.exit(1)
+    error_report = None
+    if '--error-report' in args:
+        e_idx = args.index('--error-report')
+        if e_idx < len(args) - 1 and not args[e_idx + 1].startswith('-'):
+            error_report = args[e_idx + 1]
+            del args[e_idx:e_idx+2]
+        else:
+            print("Error: --error-report flag requires a path for the JSON report.")
+            sys.exit(1)
+    out_dir = None
+    if '--out' in args:
+        o_idx = args.index('--out')
+        if o_idx < len(args) - 1 and not args[o_idx + 1].startswith('-'):
+            out_dir = args[o_idx + 1]
+            del args[o_idx:o_idx+2]
+        else:
+            print("Error: --out flag requires an output directory.")
+            sys.exit(1)
+    profile_top = PROFILE_SLOWEST_NOTES
+    if '--profile-top' in args:
+        t_idx = args.index('--profile-top')
+        if t_idx < len(args) - 1 and args[t_idx + 1].isdigit():
+            profile_top = int(args[t_idx + 1])
+            del args[t_idx:t_idx+2]
+        else:
+            print("Error: --profile-top flag requires a number of notes.")
+            sys.exit(1)
+    if profile_path and watch:
+        print("Error: --profile cannot be combined with --watch.")
+        sys.exit(1)
+    if serve and (watch or profile_path or out_dir):
+        print("Error: --serve cannot be combined with --watch, --profile or --out.")
+        sys.exit(1)
+    port = SERVE_PORT
+    if '--port' in args:
+        p_idx = args.index('--port')
+        if p_idx < len(args) - 1 and args[p_idx + 1].isdigit() and int(args[p_idx + 1]) < 65536:
+            port = int(args[p_idx + 1])
+            del args[p_idx:p_idx+2]
+        else:
+            print("Error: --port flag requires a port number.")
+            sys.exit(1)
+    profiler = StageProfiler() if profile_path else None
+    jobs = 1
+    for flag in ('--jobs', '-j'):
+        if flag in args:
+            j_idx = args.index(flag)
+            if j_idx < len(args) - 1 and args[j_idx + 1].isdigit() and int(args[j_idx + 1]) > 0:
+                jobs = int(args[j_idx + 1])
+                del args[j_idx:j_idx+2]
+            else:
+                print(f"Error: {flag} flag requires a positive number of worker processes.")
+                sys.exit(1)
+    args = [arg for arg in args if not arg.startswith('--') and arg != '-k']
     input_path = args[0] if len(args) > 0 else "."
-    if os.path.isdir(input_path):
-        convert_directory(input_path, use_links, use_mathjax, verbose, template_path)
+    if out_dir is not None:
+        if not os.path.isdir(input_path):
+            print("Error: --out requires an input directory.")
+            sys.exit(1)
+        vault_dir, out_abs = os.path.abspath(input_path), os.path.abspath(out_dir)
+        if os.path.commonpath([vault_dir, out_abs]) in (vault_dir, out_abs):
+            print("Error: --out must be a directory outside the input directory, and not one containing it.")
+            sys.exit(1)
+    if serve:
+        if not os.path.isdir(input_path):
+            print("Error: --serve requires a directory.")
+            sys.exit(1)
+        from serve import serve_directory
+        serve_directory(input_path, use_links, use_mathjax, verbose, template_path, port=port)
+    elif os.path.isdir(input_path) and watch:
+        from watch import watch_directory
+        watch_directory(input_path, use_links, use_mathjax, verbose, template_path, incremental=incremental, jobs=jobs, graph_path=graph_path, use_search=use_search, out_dir=out_dir)
+    elif os.path.isdir(input_path):
+        failures = convert_directory(input_path, use_links, use_mathjax, verbose, template_path, incremental=incremental, jobs=jobs, profiler=profiler, graph_path=graph_path, use_search=use_search, keep_going=keep_going, error_report=error_report, out_dir=out_dir)
+        _write_profile(profiler, profile_path, profile_top)
+        if failures:
+            sys.exit(1)
     else:
         if not input_path.lower().endswith('.md'):
             print("Error: Input file must be a markdown (.md) file.")
             sys.exit(1)
+        from pipeline import ConverterEngine
+        from writer import OutputWriter
         file_dir    = os.path.dirname(os.path.abspath(input_path))
-        file_index  = build_file_index(file_dir)
+        # Lists only as much of the note's directory tree as its links need
+        file_index  = LazyFileIndex(file_dir)
         root        = file_dir
-        convert_file(input_path=input_path, use_links=use_links, use_mathjax=use_mathjax, file_index=file_index, root=root, site_root=root, verbose=verbose, template_path=template_path)
+        engine      = ConverterEngine(use_links, use_mathjax, verbose, hooks=[profiler] if profiler is not None else None)
+        writer      = OutputWriter(threads=0)
+        convert_file(input_path=input_path, use_links=use_links, use_mathjax=use_mathjax, file_index=file_index, root=root, site_root=root, verbose=verbose, template_path=template_path, engine=engine, writer=writer)
+        file_index.save()
+        if writer.unchanged:
+            print("Output unchanged, left as is.")
+        _write_profile(profiler, profile_path, profile_top)
 if __name__ == "__main__":
     main()
\ No newline at end of file
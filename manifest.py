@@ -0,0 +1,255 @@
+# First-party
+import hashlib
+import json
+import os
+import time
+# Local
+from constants import BUILD_MANIFEST_VERSION, BUILD_CHECKPOINT_INTERVAL, DEFAULT_GLOBAL_CSS_FILE, DEFAULT_GLOBAL_JS_FILE
+
+# Modules whose source affects the generated HTML; editing any of them (e.g. `constants.py`) invalidates the whole manifest.
+_CONVERTER_MODULES = ("constants.py", "convert.py", "graph.py", "pipeline.py", "scanner.py", "search.py", "streaming.py", "tags.py", "util.py", "transclude.py", "main.py")
+
+###########
+# HASHING #
+###########
+
+def new_hasher():
+    """Incremental form of `hash_bytes`, for content read piece by piece."""
+    return hashlib.blake2b(digest_size=16)
+
+def hash_bytes(data :bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def hash_file(path :str) -> str | None:
+    try:
+        with open(path, "rb") as f:
+            return hash_bytes(f.read())
+    except OSError:
+        return None
+
+def build_fingerprint(
+        template_path   :str | None,
+        site_root       :str,
+        use_links       :bool,
+        use_mathjax     :bool,
+        use_search      :bool = False,
+) -> str:
+    """
+    Hash of everything besides the note itself which shapes a note's output: the template, the global CSS/JS files, the conversion options and the converter's own source.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    here = os.path.dirname(os.path.abspath(__file__))
+    for module in _CONVERTER_MODULES:
+        h.update(str(hash_file(os.path.join(here, module))).encode())
+    h.update(str(hash_file(template_path) if template_path and os.path.isfile(template_path) else hash_file("template.html")).encode())
+    for asset in (DEFAULT_GLOBAL_CSS_FILE, DEFAULT_GLOBAL_JS_FILE):
+        h.update(str(hash_file(os.path.join(site_root, asset))).encode())
+    h.update(f"{BUILD_MANIFEST_VERSION}|{use_links}|{use_mathjax}|{use_search}".encode())
+    return h.hexdigest()
+
+############
+# MANIFEST #
+############
+
+class BuildManifest:
+    """
+    Persisted record of the last directory build, keyed by note path relative to the vault root.
+    \nEach note entry holds its source stat/hash, its output path and the file index lookups its links resolved through, so that a rebuild only reconverts notes whose source changed or whose link targets were added, removed or became ambiguous.
+    Entries also keep the note's tags, from which the tag pages (`tag_pages` lists the tags which have one) are maintained,
+    and the notes its links resolved to (plus unresolved link texts), from which the link graph and backlinks are built.
+    `backlinks` is the list of linking notes the page was rendered with, or None when the template has no `{backlinks}`.
+    `embeds` holds the content hash of every note transcluded into the page, which must still match for the page to be clean.
+    With `--search`, `terms` holds the note's weighted search terms, from which the search index is maintained (`search_docs` lists the note of each
+    document id and `search_shards` the shards written).
+    `assets` lists the other vault files the note's embeds and links resolved to.
+    \nWith `out_dir`, the build wrote its pages into that directory instead of the vault (`--out`); outputs are still recorded relative to the site root,
+    which `out_dir` mirrors. `mirrored` then holds the stat of every asset mirrored into it (see `mirror.AssetMirror`).
+    \n`dropped_outputs` keeps the output of every note forgotten by `reset` until `prune` hands the ones of notes which are gone out for removal,
+    so every page a build wrote stays on record (see `main.clean_md_html_files`).
+    \n`complete` is False while a build is under way (see `BuildCheckpoint`) and stays so when it stopped early: its notes are then up to date,
+    but the tag pages and search index were not brought in line with them yet.
+    """
+    def __init__(
+            self,
+            path        :str,
+            fingerprint :str = "",
+            notes       :dict | None = None,
+            tag_pages   :list | None = None,
+            search_docs :list | None = None,
+            search_shards :list | None = None,
+            complete    :bool = True,
+            dropped_outputs :dict | None = None,
+            out_dir     :str | None = None,
+            mirrored    :dict | None = None,
+    ):
+        self.path           = path
+        self.site_root      = os.path.dirname(os.path.abspath(path))
+        self.fingerprint    = fingerprint
+        self.notes          = notes if notes is not None else {}
+        self.tag_pages      = tag_pages if tag_pages is not None else []
+        self.search_docs    = search_docs if search_docs is not None else []
+        self.search_shards  = search_shards if search_shards is not None else []
+        self.complete       = complete
+        self.dropped_outputs = dropped_outputs if dropped_outputs is not None else {}
+        self.out_dir        = out_dir
+        self.mirrored       = mirrored if mirrored is not None else {}
+        self._embed_hashes  = {}    # Content hash of embedded notes, read once per build
+
+    @classmethod
+    def load(cls, path :str) -> "BuildManifest":
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != BUILD_MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, fingerprint=data.get("fingerprint", ""), notes=data.get("notes", {}), tag_pages=data.get("tag_pages", []),
+                   search_docs=data.get("search_docs", []), search_shards=data.get("search_shards", []), complete=data.get("complete", True),
+                   dropped_outputs=data.get("dropped_outputs", {}), out_dir=data.get("out_dir"), mirrored=data.get("mirrored", {}))
+
+    def save(self) -> None:
+        data = {
+            "version"       : BUILD_MANIFEST_VERSION,
+            "fingerprint"   : self.fingerprint,
+            "notes"         : self.notes,
+            "tag_pages"     : self.tag_pages,
+            "search_docs"   : self.search_docs,
+            "search_shards" : self.search_shards,
+            "complete"      : self.complete,
+            "dropped_outputs" : self.dropped_outputs,
+            "out_dir"       : self.out_dir,
+            "mirrored"      : self.mirrored,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def reset(self, fingerprint :str) -> None:
+        """
+        Forgets every note; `tag_pages`, `search_shards` and `mirrored` are kept so pages of tags, search shards and assets which no longer exist can still be removed,
+        and the notes' outputs are kept in `dropped_outputs` for the same reason.
+        """
+        self.fingerprint    = fingerprint
+        for rel_path, entry in self.notes.items():
+            self.dropped_outputs[rel_path] = entry["output"]
+        self.notes          = {}
+
+    def rel_path(self, path :str) -> str:
+        """Path of `path` relative to the vault root, as used for manifest keys."""
+        return os.path.relpath(os.path.abspath(path), self.site_root).replace("\\", "/")
+
+    def _rel_candidates(self, candidates) -> list:
+        return [self.rel_path(c) for c in candidates] if candidates else []
+
+    def is_stale(
+            self,
+            input_path  :str,
+            output_path :str,
+            file_index,
+    ) -> bool:
+        """
+        Returns True if the note at `input_path` must be reconverted.
+        \nA note is clean when its output exists, its source is unchanged (by stat, falling back to content hash), every index lookup it made still yields the same candidates
+        and every note it transcluded still has the same content.
+        """
+        entry = self.notes.get(self.rel_path(input_path))
+        if entry is None or not os.path.isfile(output_path):
+            return True
+        st = os.stat(input_path)
+        if (st.st_mtime_ns, st.st_size) != (entry["mtime_ns"], entry["size"]):
+            if hash_file(input_path) != entry["hash"]:
+                return True
+            entry["mtime_ns"], entry["size"] = st.st_mtime_ns, st.st_size
+        for name, candidates in entry["lookups"].items():
+            if self._rel_candidates(file_index.get(name)) != candidates:
+                return True
+        for rel_path, digest in entry["embeds"].items():
+            if rel_path not in self._embed_hashes:
+                self._embed_hashes[rel_path] = hash_file(os.path.join(self.site_root, rel_path))
+            if self._embed_hashes[rel_path] != digest:
+                return True
+        return False
+
+    def record(
+            self,
+            input_path  :str,
+            output_path :str,
+            source      :tuple,
+            lookups     :dict,
+            tags        :list = (),
+            links       :list = (),
+            unresolved  :list = (),
+            backlinks   :list | None = None,
+            embeds      :dict | None = None,
+            terms       :dict | None = None,
+            assets      :list = (),
+    ) -> None:
+        """
+        Records the conversion of the note at `input_path`.
+        \n`source` is (content hash, mtime_ns, size) of the note as it was converted: the hash of the bytes read and the stat taken before reading them,
+        so an edit made while the note was converted is never taken for converted.
+        """
+        content_hash, mtime_ns, size = source
+        self.notes[self.rel_path(input_path)] = {
+            "hash"      : content_hash,
+            "mtime_ns"  : mtime_ns,
+            "size"      : size,
+            "output"    : self.rel_path(output_path),
+            "lookups"   : {name: self._rel_candidates(cands) for name, cands in lookups.items()},
+            "tags"      : sorted(set(tags)),
+            "links"     : sorted({self.rel_path(link) for link in links}),
+            "unresolved": sorted(set(unresolved)),
+            "backlinks" : backlinks,
+            "embeds"    : {self.rel_path(path): digest for path, digest in (embeds or {}).items()},
+            "terms"     : terms or {},
+            "assets"    : sorted({self.rel_path(asset) for asset in assets}),
+        }
+
+    def prune(self, seen :set) -> list:
+        """
+        Drops entries for notes which were not part of this build (deleted or newly ignored).
+        \nReturns the outputs (relative to the vault root) of those notes, which the caller removes.
+        """
+        orphans = []
+        for rel_path in [p for p in self.notes if p not in seen]:
+            orphans.append(self.notes.pop(rel_path)["output"])
+        for rel_path, output in self.dropped_outputs.items():
+            if rel_path not in seen:
+                orphans.append(output)
+        # Notes which failed to convert again still have their old output
+        self.dropped_outputs = {rel_path: output for rel_path, output in self.dropped_outputs.items() if rel_path in seen and rel_path not in self.notes}
+        return orphans
+
+##############
+# CHECKPOINT #
+##############
+
+class BuildCheckpoint:
+    """
+    Saves a build's manifest at most every `interval` seconds while its notes are converted, so a build which is stopped or crashes
+    resumes where it left off: the next build finds the notes recorded so far clean and skips them.
+    \n`flush` (e.g. `writer.OutputWriter.flush`) is called before each save, so the manifest never vouches for pages still queued for writing.
+    `converted` holds every note recorded during the build.
+    """
+    def __init__(
+            self,
+            manifest    :BuildManifest,
+            flush,
+            interval    :float = BUILD_CHECKPOINT_INTERVAL,
+    ):
+        self.manifest   = manifest
+        self.flush      = flush
+        self.interval   = interval
+        self.converted  = set()
+        self._saved_at  = time.monotonic()
+
+    def recorded(self, input_path :str) -> None:
+        """Counts a note recorded in the manifest, saving the manifest if `interval` passed since the last save."""
+        self.converted.add(input_path)
+        now = time.monotonic()
+        if now - self._saved_at >= self.interval:
+            self.flush()
+            self.manifest.save()
+            self._saved_at = now
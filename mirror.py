@@ -0,0 +1,157 @@
+# First-party
+import errno
+import os
+import shutil
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+# Local
+from constants import MIRROR_THREADS
+
+##########
+# MIRROR #
+##########
+
+# Linux ioctl which makes a file share the extents of another on filesystems with reflinks (Btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+# Errors meaning the filesystem (or the pair of them) can't do a link at all, so it isn't tried for the other files either
+UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EPERM, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTTY, errno.EINVAL, errno.ENOSYS}
+
+class AssetMirror:
+    """
+    Mirrors the vault files the pages of an out-of-tree build (`--out`) reference into the same place under `out_dir`, so their relative links keep working:
+    the targets of embeds and of links to files other than notes (`assets` of each manifest entry) and the global CSS/JS the template links.
+    \nEach file is hardlinked if the filesystem allows it, else reflinked, else copied; files are mirrored on `threads` threads.
+    The stat of every mirrored file is kept in the manifest (`mirrored`), so a file is only mirrored again once it changed,
+    and mirrored files which are no longer referenced are removed.
+    """
+    def __init__(
+            self,
+            site_root   :str,
+            out_dir     :str,
+            threads     :int = MIRROR_THREADS,
+    ):
+        self.site_root  = os.path.abspath(site_root)
+        self.out_dir    = os.path.abspath(out_dir)
+        self.threads    = threads
+        self.counts     = {"linked": 0, "reflinked": 0, "copied": 0}
+        self._can_link      = True
+        self._can_reflink   = fcntl is not None
+
+    def update(
+            self,
+            manifest,
+            extra       :list = (),
+    ) -> int:
+        """
+        Brings the mirror in line with the files the notes of `manifest` reference, plus the `extra` files (absolute paths).
+        \nReturns the number of files mirrored; unchanged files are left alone.
+        """
+        self.counts = dict.fromkeys(self.counts, 0)
+        referenced = {rel_path for entry in manifest.notes.values() for rel_path in entry["assets"]}
+        referenced.update(manifest.rel_path(path) for path in extra)
+        # Never put a vault file where the build writes a page, nor remove a page there
+        outputs = {entry["output"] for entry in manifest.notes.values()}
+        referenced -= outputs
+        previous = manifest.mirrored
+        mirrored = {rel_path: previous[rel_path] for rel_path in referenced if rel_path in previous}
+        for rel_path in previous.keys() - referenced - outputs:
+            self._remove(rel_path)
+        work = []
+        for rel_path in sorted(referenced):
+            stat = _stat(os.path.join(self.site_root, rel_path))
+            if stat is None:
+                # Gone since the note referencing it was converted
+                mirrored.pop(rel_path, None)
+                self._remove(rel_path)
+                continue
+            if mirrored.get(rel_path) != stat or not os.path.isfile(self._target(rel_path)):
+                work.append((rel_path, stat))
+        try:
+            if work:
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="mirror") as pool:
+                    for (rel_path, stat), (method, error) in zip(work, pool.map(self._mirror, [rel_path for rel_path, _stat in work])):
+                        if error is not None:
+                            print(error)
+                            # Tried again on the next build, and still removed by `--clean` if an old copy is left
+                            mirrored[rel_path] = None
+                            continue
+                        self.counts[method] += 1
+                        mirrored[rel_path] = stat
+        finally:
+            manifest.mirrored = mirrored
+        return len(work)
+
+    def summary(self) -> str:
+        return f"Mirrored {sum(self.counts.values())} assets ({self.counts['linked']} hardlinked, {self.counts['reflinked']} reflinked, {self.counts['copied']} copied)."
+
+    def _target(self, rel_path :str) -> str:
+        return os.path.join(self.out_dir, *rel_path.split("/"))
+
+    def _mirror(self, rel_path :str) -> tuple:
+        """Mirrors one file, replacing what is there. Returns (how: "linked", "reflinked" or "copied", None) or (None, error message)."""
+        source = os.path.join(self.site_root, *rel_path.split("/"))
+        target = self._target(rel_path)
+        tmp_path = f"{target}.{os.getpid()}.tmp"
+        try:
+            if os.path.isfile(target) and os.path.samefile(source, target):
+                # Already a hardlink of the source; renaming another link of it over the target would do nothing
+                return "linked", None
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            method = self._place(source, tmp_path)
+            os.replace(tmp_path, target)
+        except OSError as e:
+            if os.path.lexists(tmp_path):
+                os.remove(tmp_path)
+            return None, f"Could not mirror {source}: {e}"
+        return method, None
+
+    def _place(
+            self,
+            source      :str,
+            tmp_path    :str,
+    ) -> str:
+        if self._can_link:
+            try:
+                os.link(source, tmp_path)
+                return "linked"
+            except OSError as e:
+                if e.errno in UNSUPPORTED_ERRNOS:
+                    self._can_link = False
+        if self._can_reflink:
+            try:
+                with open(source, "rb") as src, open(tmp_path, "wb") as dst:
+                    fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                shutil.copystat(source, tmp_path)
+                return "reflinked"
+            except OSError as e:
+                if e.errno in UNSUPPORTED_ERRNOS:
+                    self._can_reflink = False
+        shutil.copy2(source, tmp_path)
+        return "copied"
+
+    def _remove(self, rel_path :str) -> None:
+        """Removes the mirrored file of `rel_path` and the directories it leaves empty, up to `out_dir`."""
+        target = self._target(rel_path)
+        try:
+            os.remove(target)
+        except OSError:
+            return
+        directory = os.path.dirname(target)
+        while os.path.normpath(directory) != self.out_dir:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+
+def _stat(path :str) -> list | None:
+    """[mtime_ns, size] of the file at `path`, as kept in the manifest, or None if there is none."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
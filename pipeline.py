@@ -1,11 +1,268 @@
 # Third-party
 import markdown as md
+from markdown.treeprocessors import Treeprocessor
+import xml.etree.ElementTree as etree
 # First-party
 from collections import defaultdict
+import os
+import time
 # Local
-from constants import PREVIEW_LENGTH
+from constants import PREVIEW_LENGTH, TAG_PAGES_DIR
+from scanner import ObsidianScanner, HEADING_START_PATTERN
+from transclude import Transcluder
+from profiling import run_stage, notify
+from search import note_terms
 from convert import replace_comments, smart_insert_spacing, smart_single_newlines, replace_math, replace_highlight, replace_strikethrough, replace_code, replace_callouts, replace_embeds, replace_wikilinks, replace_tags, mark_link_types, is_mathjax_necessary, embed_MathJax_scripting
 
+MARKDOWN_EXTENSIONS = ["toc", "pymdownx.tasklist", "tables", "footnotes"]
+# Block ending every chunk but the last, so the HTML between a chunk's last block and the next chunk comes out as in the whole note.
+# It is a heading before chunks starting with a heading, as the spacing after a block depends on whether a heading follows
+CHUNK_END_MARK = "obsidianmdhtmlchunkend"
+# Element holding the ids of earlier chunks while `toc` assigns heading ids (see `ConverterEngine.convert_stream`)
+CARRIED_IDS_TAG = "carried-ids"
+
+class ConverterEngine:
+    """
+    Reusable Obsidian markdown to HTML converter.
+    \nBuilds the Markdown instance (and its extensions) once and resets it between documents, so converting many notes only pays the per-note cost.
+    \nObsidian syntax is handled by a single-pass `scanner.ObsidianScanner`; `single_pass=False` runs the original sequence of `convert.py` stages instead.
+    \nEvery stage is reported to `hooks` (see `profiling.StageHook`), if any are given.
+    \nAfter each conversion, `tags` lists the tags found in the note. With a `site_root`, tag links point to the tag pages under the vault root rather than a `tags/` folder next to each note.
+    \nWith `transclude`, `![[note]]` embeds are replaced by the embedded note (see `transclude.Transcluder`) and `embeds` maps each transcluded note to its content hash;
+    `warnings` holds the messages about embeds left as links, for the caller to report.
+    \n`convert_stream` converts a note chunk by chunk (see `streaming.NoteChunker`) for notes too large to hold whole.
+    \nWith `index_terms`, `terms` holds the weighted search terms of the converted note (see `search.note_terms`), reported to hooks as the "search_terms" stage.
+    """
+    def __init__(
+            self,
+            tags_use_links          :bool = False,
+            embed_mathjax_scripting :bool = False,
+            verbose                 :bool = False,
+            single_pass             :bool = True,
+            hooks                   :list | None = None,
+            site_root               :str | None = None,
+            transclude              :bool = True,
+            index_terms             :bool = False,
+    ):
+        self.tags_use_links             = tags_use_links
+        self.embed_mathjax_scripting    = embed_mathjax_scripting
+        self.verbose                    = verbose
+        self.markdown                   = md.Markdown(extensions=MARKDOWN_EXTENSIONS)
+        self.scanner                    = ObsidianScanner(tags_use_links, verbose) if single_pass else None
+        self.hooks                      = hooks if hooks is not None else []
+        self.site_root                  = site_root
+        self.tags                       = []
+        self.embeds                     = {}
+        self.warnings                   = []
+        self.index_terms                = index_terms
+        self.terms                      = {}
+        self.transcluder                = Transcluder(self) if transclude else None
+        self._tag_href_prefixes         = {}
+        self._note                      = ""
+        self._carried_ids               = None  # Ids of earlier chunks, while streaming
+        self.markdown.treeprocessors.register(_CarryIdsIn(self), "carry_ids_in", 6)
+        self.markdown.treeprocessors.register(_CarryIdsOut(self), "carry_ids_out", 4)
+        if self.scanner is not None and self.transcluder is not None:
+            self.scanner.transclude = self.transcluder.embed
+
+    def convert(
+            self,
+            text_md     :str,
+            file_index  :defaultdict,
+            root        :str,
+            note        :str = "",
+    ) -> str:
+        """Converts one note's markdown. `note` names the note for hooks, and is the note's path for detecting recursive embeds."""
+        verbose = self.verbose
+        self._note = note
+        transcluder = self.transcluder
+        if transcluder is not None:
+            transcluder.reset()
+            transcluder.begin(note or None)
+        text_html, has_math, self.tags = self._render(text_md, file_index, root)
+        if transcluder is not None:
+            text_html, fragment_math = transcluder.finish(text_html, file_index, root)
+            has_math = has_math or fragment_math
+            self.embeds, self.warnings = transcluder.embeds, transcluder.warnings
+        if self.index_terms:
+            start = time.perf_counter()
+            title = os.path.splitext(os.path.basename(note))[0] if note else ""
+            self.terms = note_terms(title, text_html, self.tags)
+            if self.hooks:
+                notify(self.hooks, note, "search_terms", time.perf_counter() - start, len(text_html), len(self.terms))
+        if self.embed_mathjax_scripting and has_math:
+            text_html += embed_MathJax_scripting()
+        if verbose:
+            print(f"------TO HTML------\n{text_html[:min(len(text_html), PREVIEW_LENGTH)]}{"..." if len(text_html) > PREVIEW_LENGTH else ""}\n-----END OF HTML-----")
+        return text_html
+
+    def convert_stream(
+            self,
+            chunks,
+            file_index  :defaultdict,
+            root        :str,
+            note        :str = "",
+    ):
+        """
+        Converts a note given as consecutive chunks split between top-level blocks, yielding the HTML of each chunk; joined, they equal what `convert` returns.
+        \nEvery chunk but the last must end with a blank line, as those of `streaming.NoteChunker` do.
+        \nHeading ids are kept unique across chunks. Once every chunk was converted, `tags`, `embeds`, `terms` and `warnings` describe the whole note, as after `convert`.
+        """
+        self._note = note
+        self._carried_ids = set()
+        transcluder = self.transcluder
+        tags, embeds, terms, warnings = [], {}, {}, []
+        has_math = False
+        separator = None
+        chunks = iter(chunks)
+        chunk = next(chunks, None)
+        try:
+            while chunk is not None:
+                next_chunk = next(chunks, None)
+                if transcluder is not None:
+                    transcluder.reset()
+                    transcluder.begin(note or None)
+                if next_chunk is None:
+                    text_html, chunk_math, chunk_tags = self._render(chunk, file_index, root)
+                    trailing = ""
+                else:
+                    mark = f"# {CHUNK_END_MARK}" if HEADING_START_PATTERN.match(next_chunk) else CHUNK_END_MARK
+                    text_html, chunk_math, chunk_tags = self._render(f"{chunk}{mark}\n", file_index, root)
+                    text_html = text_html[:text_html.rfind("<", 0, text_html.rfind(CHUNK_END_MARK))]
+                    self._carried_ids.discard(CHUNK_END_MARK)
+                    trailing = text_html[len(text_html.rstrip()):]
+                    text_html = text_html.rstrip()
+                chunk = next_chunk
+                if transcluder is not None:
+                    text_html, fragment_math = transcluder.finish(text_html, file_index, root)
+                    chunk_math = chunk_math or fragment_math
+                    embeds.update(transcluder.embeds)
+                    warnings.extend(transcluder.warnings)
+                has_math = has_math or chunk_math
+                tags.extend(chunk_tags)
+                if self.index_terms:
+                    for term, weight in note_terms("", text_html).items():
+                        terms[term] = terms.get(term, 0) + weight
+                if not text_html:
+                    continue
+                yield text_html if separator is None else separator + text_html
+                separator = trailing
+        finally:
+            self._carried_ids = None
+        self.tags, self.embeds, self.warnings = tags, embeds, warnings
+        if self.index_terms:
+            title = os.path.splitext(os.path.basename(note))[0] if note else ""
+            for term, weight in note_terms(title, "", tags).items():
+                terms[term] = terms.get(term, 0) + weight
+            self.terms = terms
+        if self.embed_mathjax_scripting and has_math:
+            yield embed_MathJax_scripting()
+
+    def render_fragment(
+            self,
+            text_md     :str,
+            file_index  :defaultdict,
+            root        :str,
+    ) -> tuple:
+        """
+        Converts an embedded note (for `transclude.Transcluder`), returning (html, whether it has math).
+        \nIts stages are reported to the hooks as part of the note being converted; its tags are not the note's.
+        """
+        text_html, has_math, _tags = self._render(text_md, file_index, root)
+        return text_html, has_math
+
+    def _render(
+            self,
+            text_md     :str,
+            file_index  :defaultdict,
+            root        :str,
+    ) -> tuple:
+        """Returns (html, has_math, tags) of `text_md`, leaving embeds requested from the transcluder as placeholders."""
+        verbose = self.verbose
+        hooks = self.hooks
+        note = self._note
+        if self.scanner is not None:
+            self.scanner.tag_href_prefix = self._tag_href_prefix(root)
+            text_md = run_stage(hooks, note, "scan", lambda text: self.scanner.scan(text, file_index, root), text_md)
+            has_math = self.scanner.has_math
+            tags = self.scanner.tags
+        else:
+            tags = []
+            text_md = self._convert_stages(text_md, file_index, root, note, tags)
+            has_math = is_mathjax_necessary(text_md)
+        text_html = run_stage(hooks, note, "markdown", lambda text: self.markdown.reset().convert(text), text_md)
+        text_html = run_stage(hooks, note, "mark_link_types", lambda text: mark_link_types(text, verbose=verbose), text_html)
+        return text_html, has_math, tags
+
+    def _convert_stages(
+            self,
+            text_md     :str,
+            file_index  :defaultdict,
+            root        :str,
+            note        :str = "",
+            tags        :list | None = None,
+    ) -> str:
+        verbose = self.verbose
+        transclude = self.transcluder.embed if self.transcluder is not None else None
+        href_prefix = self._tag_href_prefix(root)
+        stages = [
+            ("replace_comments",        lambda text: replace_comments(text, verbose=verbose)),
+            ("smart_insert_spacing",    lambda text: smart_insert_spacing(text)),
+            ("smart_single_newlines",   lambda text: smart_single_newlines(text, verbose=verbose)),
+            ("replace_math",            lambda text: replace_math(text, verbose=verbose)),
+            ("replace_highlight",       lambda text: replace_highlight(text, verbose=verbose)),
+            ("replace_strikethrough",   lambda text: replace_strikethrough(text, verbose=verbose)),
+            ("replace_code",            lambda text: replace_code(text, verbose=verbose)),
+            ("replace_callouts",        lambda text: replace_callouts(text, verbose=verbose)),
+            ("replace_embeds",          lambda text: replace_embeds(text, file_index, root, verbose=verbose, transclude=transclude)),
+            ("replace_wikilinks",       lambda text: replace_wikilinks(text, file_index, root, verbose=verbose)),
+            ("replace_tags",            lambda text: replace_tags(text, use_links=self.tags_use_links, verbose=verbose, href_prefix=href_prefix, found=tags)),
+        ]
+        for stage, fn in stages:
+            text_md = run_stage(self.hooks, note, stage, fn, text_md)
+        return text_md
+
+    def _tag_href_prefix(self, root :str) -> str:
+        """Path from the note folder `root` to the tag pages folder, with a trailing "/"."""
+        if self.site_root is None:
+            return f"{TAG_PAGES_DIR}/"
+        prefix = self._tag_href_prefixes.get(root)
+        if prefix is None:
+            tags_dir = os.path.join(os.path.abspath(self.site_root), TAG_PAGES_DIR)
+            prefix = self._tag_href_prefixes[root] = os.path.relpath(tags_dir, os.path.abspath(root)).replace("\\", "/") + "/"
+        return prefix
+
+class _CarryIdsIn(Treeprocessor):
+    """Before `toc` assigns heading ids, adds the ids of earlier chunks to the document, so `toc` treats them as taken."""
+    def __init__(self, engine :ConverterEngine):
+        super().__init__(engine.markdown)
+        self.engine = engine
+
+    def run(self, root :etree.Element) -> None:
+        carried = self.engine._carried_ids
+        if carried:
+            holder = etree.SubElement(root, CARRIED_IDS_TAG)
+            for element_id in carried:
+                etree.SubElement(holder, "a", {"id": element_id})
+
+class _CarryIdsOut(Treeprocessor):
+    """After `toc`, removes the carried ids again and remembers the ids of this chunk for the next."""
+    def __init__(self, engine :ConverterEngine):
+        super().__init__(engine.markdown)
+        self.engine = engine
+
+    def run(self, root :etree.Element) -> None:
+        carried = self.engine._carried_ids
+        if carried is None:
+            return
+        holder = root.find(CARRIED_IDS_TAG)
+        if holder is not None:
+            root.remove(holder)
+        for element in root.iter():
+            element_id = element.get("id")
+            if element_id is not None:
+                carried.add(element_id)
+
 def convert_markdown_to_html(
         text_md                 :str,
         file_index              :defaultdict,
@@ -13,22 +270,11 @@ def convert_markdown_to_html(
         tags_use_links          :bool = False,
         embed_mathjax_scripting :bool = False,
         verbose                 :bool = False,
+        engine                  :ConverterEngine | None = None,
 ):
-    text_md = replace_comments(text_md, verbose=verbose)
-    text_md = smart_insert_spacing(text_md)
-    text_md = smart_single_newlines(text_md, verbose=verbose)
-    text_md = replace_math(text_md, verbose=verbose)
-    text_md = replace_highlight(text_md, verbose=verbose)
-    text_md = replace_strikethrough(text_md, verbose=verbose)
-    text_md = replace_code(text_md, verbose=verbose)
-    text_md = replace_callouts(text_md, verbose=verbose)
-    text_md = replace_embeds(text_md, file_index, root, verbose=verbose)
-    text_md = replace_wikilinks(text_md, file_index, root, verbose=verbose)
-    text_md = replace_tags(text_md, use_links=tags_use_links, verbose=verbose)
-    text_html = md.markdown(text_md, extensions=["toc", "pymdownx.tasklist", "tables", "footnotes"])
-    text_html = mark_link_types(text_html, verbose=verbose)
-    if embed_mathjax_scripting and is_mathjax_necessary(text_md):
-        text_html += embed_MathJax_scripting()
-    if verbose:
-        print(f"------TO HTML------\n{text_html[:min(len(text_html), PREVIEW_LENGTH)]}{"..." if len(text_html) > PREVIEW_LENGTH else ""}\n-----END OF HTML-----")
-    return text_html
\ No newline at end of file
+    """
+    Converts one note. Pass a shared `engine` when converting many notes; its own options then take precedence.
+    """
+    if engine is None:
+        engine = ConverterEngine(tags_use_links, embed_mathjax_scripting, verbose)
+    return engine.convert(text_md, file_index, root)
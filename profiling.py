@@ -0,0 +1,136 @@
+# First-party
+import json
+import os
+import time
+# Local
+from constants import PROFILE_SLOWEST_NOTES
+
+#########
+# HOOKS #
+#########
+
+class StageHook:
+    """
+    Receives a call for every conversion stage run on every note.
+    \nPass hooks to `pipeline.ConverterEngine(hooks=[...])`; the engine reports its own stages and `main` reports reading, templating and writing each note.
+    Sizes are in characters (bytes for reads and writes).
+    """
+    def on_stage(
+            self,
+            note        :str,
+            stage       :str,
+            seconds     :float,
+            size_in     :int,
+            size_out    :int,
+    ) -> None:
+        pass
+
+def run_stage(
+        hooks   :list,
+        note    :str,
+        stage   :str,
+        fn,
+        text    :str,
+) -> str:
+    """Returns `fn(text)`, timing it for `hooks` when there are any."""
+    if not hooks:
+        return fn(text)
+    start = time.perf_counter()
+    result = fn(text)
+    notify(hooks, note, stage, time.perf_counter() - start, len(text), len(result))
+    return result
+
+def notify(
+        hooks       :list,
+        note        :str,
+        stage       :str,
+        seconds     :float,
+        size_in     :int,
+        size_out    :int,
+) -> None:
+    for hook in hooks:
+        hook.on_stage(note, stage, seconds, size_in, size_out)
+
+############
+# PROFILER #
+############
+
+class StageProfiler(StageHook):
+    """
+    Collects the stage timings of every note, for `--profile`.
+    \nKeeps one [stage, seconds, size_in, size_out] record per stage run, grouped by note.
+    """
+    def __init__(self):
+        self.notes = {}
+
+    def on_stage(
+            self,
+            note        :str,
+            stage       :str,
+            seconds     :float,
+            size_in     :int,
+            size_out    :int,
+    ) -> None:
+        self.notes.setdefault(note, []).append([stage, seconds, size_in, size_out])
+
+    def pop_note(self, note :str) -> list:
+        """Removes and returns the records of one note (used to send a worker's records back to the main process)."""
+        return self.notes.pop(note, [])
+
+    def add_note(
+            self,
+            note    :str,
+            records :list,
+    ) -> None:
+        self.notes.setdefault(note, []).extend(records)
+
+    def report(self, slowest :int = PROFILE_SLOWEST_NOTES) -> dict:
+        """Per-stage totals over all notes, plus the `slowest` notes with their own stage breakdown."""
+        totals = {}
+        note_totals = []
+        for note, records in self.notes.items():
+            stages = _sum_stages(records)
+            for stage, entry in stages.items():
+                total = totals.setdefault(stage, {"seconds": 0.0, "calls": 0, "size_in": 0, "size_out": 0})
+                for key in total:
+                    total[key] += entry[key]
+            note_totals.append((sum(entry["seconds"] for entry in stages.values()), note, stages))
+        note_totals.sort(key=lambda item: item[0], reverse=True)
+        return {
+            "notes"         : len(self.notes),
+            "total_seconds" : sum(item[0] for item in note_totals),
+            "stages"        : dict(sorted(totals.items(), key=lambda item: item[1]["seconds"], reverse=True)),
+            "slowest_notes" : [
+                {"note": note, "seconds": seconds, "stages": stages}
+                for seconds, note, stages in note_totals[:slowest]
+            ],
+        }
+
+    def write(
+            self,
+            path    :str,
+            slowest :int = PROFILE_SLOWEST_NOTES,
+    ) -> dict:
+        report = self.report(slowest)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+def _sum_stages(records :list) -> dict:
+    stages = {}
+    for stage, seconds, size_in, size_out in records:
+        entry = stages.setdefault(stage, {"seconds": 0.0, "calls": 0, "size_in": 0, "size_out": 0})
+        entry["seconds"]    += seconds
+        entry["calls"]      += 1
+        entry["size_in"]    += size_in
+        entry["size_out"]   += size_out
+    return stages
+
+def print_summary(report :dict) -> None:
+    """Prints the per-stage totals of a `StageProfiler.report`."""
+    total = report["total_seconds"] or 1.0
+    print(f"Profiled {report['notes']} notes in {report['total_seconds']:.3f}s:")
+    for stage, entry in report["stages"].items():
+        print(f"    {stage:<24}{entry['seconds']:10.3f}s {entry['seconds'] / total * 100:6.1f}%")
@@ -0,0 +1,236 @@
+# First-party
+from collections import defaultdict
+import html
+import re
+# Local
+from constants import TAG_PAGES_DIR
+from convert import (
+    render_wikilink, render_embed, render_tag, render_callout, callout_content_lines,
+    render_code_inline, render_code_block, render_math_block, render_math_inline,
+    smart_insert_spacing, smart_single_newlines,
+)
+
+###########
+# SCANNER #
+###########
+
+# Every construct handled before the Markdown pass, as one alternation. Earlier alternatives win at the same position.
+# The leading lookahead lets the regex engine skip plain text quickly instead of trying every alternative at each character.
+TOKEN_PATTERN = re.compile(
+    r'(?=[`~%>$!\[=\#\n])(?:'
+    r'(?P<fence>^(?P<fence_mark>```|~~~)[ \t]*(?P<fence_lang>[\w+-]*)[ \t]*\n(?:(?P<fence_code>.*?)\n)?(?P=fence_mark)[ \t]*(?=\n|$))'
+    r'|(?P<comment>%%.*?%%)'
+    r'|(?P<callout>^> \[!(?P<callout_type>\w+)\](?:[ \t]+(?P<callout_title>[^\n]*))?(?=\n))'
+    r'|(?P<math_block>\$\$(?P<math_block_body>.+?)\$\$)'
+    r'|(?P<code>`(?<!``)(?P<code_body>[^\n`]+?)`(?!`))'
+    r'|(?P<math>\$(?P<math_body>[^\$\n]+?)\$)'
+    r'|(?P<embed>!\[\[(?P<embed_body>[^\[\]]+)\]\])'
+    r'|(?P<wikilink>\[\[(?P<wikilink_body>[^\[\]]+)\]\])'
+    r'|(?P<highlight>==(?P<highlight_body>[^\n]+?)==)'
+    r'|(?P<strike>~~(?P<strike_body>[^\n]*?)~~)'
+    r'|(?P<tag>\#(?<![\w\[\(\{]\#)(?P<tag_name>[\w/-]+))'
+    r'|(?P<newline>\n))',
+    re.MULTILINE | re.DOTALL
+)
+
+# Line-start forms of the `convert.smart_insert_spacing` patterns, checked at each newline
+LIST_START_PATTERN = re.compile(r"\s*(?:\d+\.\s+|\-\s+|\*\s+|\-\s*\[.\]\s+|\*\s*\[.\]\s+)")
+HEADING_START_PATTERN = re.compile(r"\s*#{1,6}\s+")
+FENCE_START_PATTERN = re.compile(r"[ \t]*(?:```|~~~)")
+
+class ObsidianScanner:
+    """
+    Single-pass replacement for the regex stages of `pipeline.ConverterEngine` which run before Markdown.
+    \nRecognises comments, smart spacing/newlines, math, highlight, strikethrough, code, callouts, embeds, wikilinks and tags in one left-to-right scan, writing into one output buffer.
+    Fenced code blocks and inline code are emitted verbatim (escaped), so nothing inside them is treated as Obsidian syntax.
+    \nAfter a scan, `tags` lists the names of the tags found, in order. Tag links point into `tag_href_prefix`.
+    Markdown embeds are passed to `transclude` when it is set (see `convert.render_embed`).
+    """
+    def __init__(
+            self,
+            tags_use_links  :bool = False,
+            verbose         :bool = False,
+    ):
+        self.tags_use_links = tags_use_links
+        self.verbose        = verbose
+        self.has_math       = False
+        self.tags           = []
+        self.tag_href_prefix = f"{TAG_PAGES_DIR}/"
+        self.transclude     = None
+
+    def scan(
+            self,
+            text_md     :str,
+            file_index  :defaultdict,
+            root        :str,
+    ) -> str:
+        self.has_math = False
+        self.tags = []
+        out = []
+        self._scan_into(out, text_md, file_index, root, escape=False, block=True)
+        if self.verbose:
+            print("Obsidian syntax scanned in a single pass.")
+        return "".join(out)
+
+    def _scan_into(
+            self,
+            out         :list,
+            text        :str,
+            file_index  :defaultdict,
+            root        :str,
+            escape      :bool,
+            block       :bool,
+    ) -> None:
+        """
+        Scans `text`, appending to `out`. Plain text is escaped when `escape` is set (callout content), and so is the HTML of
+        math, highlight, strikethrough and inline code, which `replace_callouts` escapes along with the text it runs after.
+        Newlines are only rewritten when `block` is set; nested spans are always single-line.
+        """
+        verbose = self.verbose
+        rendered = html.escape if escape else str
+        search = TOKEN_PATTERN.search
+        pos = 0
+        end = len(text)
+        while pos < end:
+            m = search(text, pos)
+            if m is None:
+                break
+            start = m.start()
+            if start > pos:
+                out.append(html.escape(text[pos:start]) if escape else text[pos:start])
+            # Nested groups close before their token's group, so `lastgroup` is always the token kind
+            kind = m.lastgroup
+            pos = m.end()
+            if kind == "newline":
+                out.append(self._newline(out, text, start) if block else "\n")
+            elif kind == "fence":
+                # Laid out as the `convert.py` stages leave it: the fence takes the newline before and after it,
+                # and the code keeps the line break `smart_insert_spacing` puts before the closing fence
+                if start > 0:
+                    _drop_newline(out)
+                if text.startswith("\n", pos):
+                    pos += 1
+                code = m.group("fence_code") or ""
+                if code and not code.endswith("\n"):
+                    code += "\n"
+                out.append(render_code_block(m.group("fence_lang"), code, verbose=verbose))
+            elif kind == "comment":
+                pass
+            elif kind == "callout":
+                pos = self._callout(out, text, m, file_index, root)
+            elif kind == "math_block":
+                self.has_math = True
+                body = m.group("math_block_body")
+                if "\n" in body:
+                    body = smart_single_newlines(smart_insert_spacing(body), verbose=False)
+                out.append(render_math_block(body))
+            elif kind == "code":
+                out.append(rendered(render_code_inline(m.group("code_body"), verbose=verbose)))
+            elif kind == "math":
+                self.has_math = True
+                out.append(rendered(render_math_inline(m.group("math_body"))))
+            elif kind == "embed":
+                out.append(render_embed(m.group("embed_body"), file_index, root, verbose=verbose, transclude=self.transclude))
+            elif kind == "wikilink":
+                out.append(render_wikilink(m.group("wikilink_body"), file_index, root, verbose=verbose))
+            elif kind == "highlight":
+                out.append(rendered("<mark>"))
+                self._scan_into(out, m.group("highlight_body"), file_index, root, escape, block=False)
+                out.append(rendered("</mark>"))
+            elif kind == "strike":
+                out.append(rendered("<del>"))
+                self._scan_into(out, m.group("strike_body"), file_index, root, escape, block=False)
+                out.append(rendered("</del>"))
+            elif kind == "tag":
+                self.tags.append(m.group("tag_name"))
+                out.append(render_tag(m.group(0), m.group("tag_name"), use_links=self.tags_use_links, verbose=verbose, href_prefix=self.tag_href_prefix))
+        if pos < end:
+            out.append(html.escape(text[pos:]) if escape else text[pos:])
+
+    def _newline(
+            self,
+            out     :list,
+            text    :str,
+            pos     :int,
+    ) -> str:
+        """
+        Rewrites the newline at `pos` the way `smart_insert_spacing` followed by `smart_single_newlines` would:
+        a blank line before list items, headings and code fences, and a hard line break ("  ") before any other non-blank line.
+        """
+        if _ends_line(out):
+            return "\n"
+        nxt = _skip_comments(text, pos + 1)
+        if (LIST_START_PATTERN.match(text, nxt)
+            or HEADING_START_PATTERN.match(text, nxt)
+            or FENCE_START_PATTERN.match(text, nxt)):
+            return "\n\n"
+        if text.startswith("\n", nxt):
+            return "\n"
+        return "  \n"
+
+    def _callout(
+            self,
+            out         :list,
+            text        :str,
+            m           :re.Match,
+            file_index  :defaultdict,
+            root        :str,
+    ) -> int:
+        """
+        Consumes the quoted lines following a callout header and renders the whole callout.
+        \nReturns the position to resume scanning from.
+        """
+        lines = []
+        line_end = m.end()
+        while text.startswith("\n>", line_end):
+            next_end = text.find("\n", line_end + 1)
+            next_end = len(text) if next_end < 0 else next_end
+            lines.append(text[line_end + 1:next_end])
+            line_end = next_end
+        # Quoted lines keep the hard line breaks `smart_single_newlines` gives them
+        last_newline = self._newline([lines[-1] if lines else m.group(0)], text, line_end) if text.startswith("\n", line_end) else ""
+        if lines and last_newline == "  \n":
+            lines[-1] += "  "
+        raw = "  \n".join(lines)
+        content_lines = []
+        for line in callout_content_lines(raw):
+            line_out = []
+            self._scan_into(line_out, line, file_index, root, escape=True, block=False)
+            content_lines.append("".join(line_out))
+        title_out = []
+        self._scan_into(title_out, (m.group("callout_title") or "").strip(), file_index, root, escape=True, block=False)
+        out.append(render_callout(m.group("callout_type"), "".join(title_out), content_lines, verbose=self.verbose))
+        pos = line_end
+        # Like `replace_callouts`, swallow the newline ending the callout (keeping any blank line spacing added after it)
+        if last_newline:
+            pos += 1
+            if last_newline == "\n\n":
+                out.append("\n")
+            if text.startswith("\n", pos):
+                out.append("\n")
+                pos += 1
+        return pos
+
+def _ends_line(out :list) -> bool:
+    """True if nothing has been written yet or the output so far ends with a newline."""
+    for piece in reversed(out):
+        if piece:
+            return piece[-1] == "\n"
+    return True
+
+def _drop_newline(out :list) -> None:
+    """Removes the newline the output so far ends with, if any."""
+    for i in range(len(out) - 1, -1, -1):
+        if out[i]:
+            if out[i][-1] == "\n":
+                out[i] = out[i][:-1]
+            return
+
+def _skip_comments(text :str, pos :int) -> int:
+    """Position of the first character at or after `pos` which is not part of a %% comment."""
+    while text.startswith("%%", pos):
+        close = text.find("%%", pos + 2)
+        if close < 0:
+            break
+        pos = close + 2
+    return pos
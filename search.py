@@ -0,0 +1,178 @@
+# First-party
+import html
+import json
+import os
+import re
+# Local
+from constants import (
+    SEARCH_DIR,
+    SEARCH_INDEX_FILE,
+    SEARCH_PREFIX_LENGTH,
+    SEARCH_MIN_TERM_LENGTH,
+    SEARCH_MAX_TERM_LENGTH,
+    SEARCH_TITLE_WEIGHT,
+    SEARCH_HEADING_WEIGHT,
+    SEARCH_TAG_WEIGHT)
+
+##############
+# NOTE TERMS #
+##############
+
+TERM_PATTERN = re.compile(r"\w+")
+HTML_SKIP_PATTERN = re.compile(r"<(script|style)\b.*?</\1>", re.DOTALL | re.IGNORECASE)
+HTML_HEADING_PATTERN = re.compile(r"<h([1-6])\b[^>]*>(.*?)</h\1>", re.DOTALL | re.IGNORECASE)
+HTML_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+def tokenize(text :str) -> list:
+    """Lowercased words of `text`, skipping words shorter than `SEARCH_MIN_TERM_LENGTH` or longer than `SEARCH_MAX_TERM_LENGTH`."""
+    return [
+        word for word in TERM_PATTERN.findall(text.lower())
+        if SEARCH_MIN_TERM_LENGTH <= len(word) <= SEARCH_MAX_TERM_LENGTH
+    ]
+
+def html_text(text_html :str) -> str:
+    """Plain text of converted HTML, without scripts and styles."""
+    return html.unescape(HTML_TAG_PATTERN.sub(" ", HTML_SKIP_PATTERN.sub(" ", text_html)))
+
+def note_terms(
+        title       :str,
+        text_html   :str,
+        tags        :list = (),
+) -> dict:
+    """
+    {term: weight} of a converted note: each occurrence in the text counts 1, plus `SEARCH_HEADING_WEIGHT` for occurrences in a heading,
+    `SEARCH_TAG_WEIGHT` per tag and `SEARCH_TITLE_WEIGHT` for words of the title.
+    """
+    terms = {}
+    def add(words, weight):
+        for word in words:
+            terms[word] = terms.get(word, 0) + weight
+    add(tokenize(html_text(text_html)), 1)
+    for m in HTML_HEADING_PATTERN.finditer(text_html):
+        add(tokenize(html_text(m.group(2))), SEARCH_HEADING_WEIGHT)
+    for tag in tags:
+        add(tokenize(tag), SEARCH_TAG_WEIGHT)
+    add(tokenize(title), SEARCH_TITLE_WEIGHT)
+    return terms
+
+def manifest_terms(manifest) -> dict:
+    """{note: {term: weight}} of every note in a `manifest.BuildManifest`, as recorded while converting."""
+    return {rel_path: entry.get("terms", {}) for rel_path, entry in manifest.notes.items()}
+
+def shard_key(term :str) -> str:
+    return term[:SEARCH_PREFIX_LENGTH]
+
+def shard_file(key :str) -> str:
+    """File name of the shard holding terms starting with `key`; keys which aren't plain ASCII are hex-encoded."""
+    if key.isascii() and key.isalnum():
+        return f"{key}.json"
+    return f"_{key.encode('utf-8').hex()}.json"
+
+################
+# SEARCH INDEX #
+################
+
+class SearchIndex:
+    """
+    Writes a prebuilt inverted index of the vault's notes under `SEARCH_DIR` of the vault root, from the terms the build manifest recorded for each note.
+    \nThe index is sharded by the first `SEARCH_PREFIX_LENGTH` characters of each term, so a search page only fetches the shards of the words typed.
+    `index.json` lists the notes as [title, output path] by document id and maps each shard key to its file; a shard maps each term to
+    [document id, weight] pairs, highest weight first.
+    \nDocument ids are kept in the manifest (`search_docs`) and reused across builds, so only the shards of terms whose notes changed are rewritten.
+    """
+    def __init__(
+            self,
+            site_root   :str,
+            writer,
+    ):
+        self.site_root  = site_root
+        self.writer     = writer
+        self.search_dir = os.path.join(site_root, SEARCH_DIR)
+        self.index_path = os.path.join(self.search_dir, SEARCH_INDEX_FILE)
+
+    def update(
+            self,
+            manifest,
+            previous    :dict,
+            full        :bool = False,
+    ) -> int:
+        """
+        Brings the index in line with `manifest`, given the {note: terms} `previous` held before this build.
+        \nWith `full`, document ids are reassigned and every shard is rewritten. Returns the number of shards written.
+        """
+        current = manifest_terms(manifest)
+        emitted = set(manifest.search_shards)
+        docs = self._assign_ids([] if full else manifest.search_docs, current)
+        keys = {shard_key(term) for terms in current.values() for term in terms}
+        if full:
+            dirty = keys | emitted
+        else:
+            dirty = set()
+            for rel_path in current.keys() | previous.keys():
+                old, new = previous.get(rel_path, {}), current.get(rel_path, {})
+                if old != new:
+                    dirty.update(shard_key(term) for term in old.keys() | new.keys() if old.get(term) != new.get(term))
+            # Shards which were never written, e.g. on the first build with --search
+            dirty.update(key for key in keys if key not in emitted)
+        ids = {rel_path: doc_id for doc_id, rel_path in enumerate(docs) if rel_path is not None}
+        postings = {key: {} for key in dirty & keys}
+        for rel_path, terms in current.items():
+            doc_id = ids[rel_path]
+            for term, weight in terms.items():
+                shard = postings.get(shard_key(term))
+                if shard is not None:
+                    shard.setdefault(term, []).append([doc_id, weight])
+        for key in sorted(dirty):
+            shard_path = self.shard_path(key)
+            if key in postings:
+                self.writer.write(shard_path, self._shard_json(postings[key]))
+            else:
+                self.writer.remove(shard_path)
+        manifest.search_docs = docs
+        manifest.search_shards = sorted(keys)
+        self.writer.write(self.index_path, self._index_json(docs, keys, manifest))
+        return len(postings)
+
+    def _assign_ids(
+            self,
+            docs        :list,
+            current     :dict,
+    ) -> list:
+        """The note of each document id: notes keep their id, removed notes free theirs and new notes take the free ids first."""
+        docs = [rel_path if rel_path in current else None for rel_path in docs]
+        known = set(docs)
+        free = [doc_id for doc_id, rel_path in enumerate(docs) if rel_path is None]
+        free.reverse()
+        for rel_path in sorted(current):
+            if rel_path in known:
+                continue
+            if free:
+                docs[free.pop()] = rel_path
+            else:
+                docs.append(rel_path)
+        while docs and docs[-1] is None:
+            docs.pop()
+        return docs
+
+    def shard_path(self, key :str) -> str:
+        return os.path.join(self.search_dir, shard_file(key))
+
+    def _shard_json(self, postings :dict) -> str:
+        shard = {term: sorted(pairs, key=lambda pair: (-pair[1], pair[0])) for term, pairs in sorted(postings.items())}
+        return json.dumps(shard, separators=(",", ":"), ensure_ascii=False)
+
+    def _index_json(
+            self,
+            docs        :list,
+            keys        :set,
+            manifest,
+    ) -> str:
+        index = {
+            "prefix_length" : SEARCH_PREFIX_LENGTH,
+            "docs"          : [
+                [os.path.splitext(os.path.basename(rel_path))[0], manifest.notes[rel_path]["output"]] if rel_path is not None else None
+                for rel_path in docs
+            ],
+            "shards"        : {key: shard_file(key) for key in sorted(keys)},
+        }
+        return json.dumps(index, separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,202 @@
+# First-party
+from collections import OrderedDict
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+import time
+# Local
+from main import _build_engine, _build_page
+from graph import LinkGraph
+from manifest import BuildManifest, hash_file
+from util import VaultScanner
+from constants import (
+    BUILD_MANIFEST_FILE,
+    BUILT_HTML_EXTENSION,
+    SERVE_HOST,
+    SERVE_PORT,
+    SERVE_CACHE_SIZE,
+    SERVE_RESCAN_INTERVAL)
+
+###########
+# PREVIEW #
+###########
+
+class PreviewServer:
+    """
+    Renders the pages of a vault on demand for a local preview, without building the vault first or writing anything to disk.
+    \nThe Markdown engine, the compiled template and the vault's link index stay in memory. Rendered pages are kept in an LRU of `cache_size` pages
+    keyed by (note, mtime, template hash, index generation); a cached page is also dropped once a note it embeds changed.
+    \nThe link index comes from the cached directory listings (see `util.DirectoryCache`) and is scanned again at most every `SERVE_RESCAN_INTERVAL` seconds;
+    when files were added or removed its generation changes, so pages whose links may now resolve differently are converted again.
+    \nBacklinks come from the links the last directory build recorded, if any.
+    """
+    def __init__(
+            self,
+            input_dir       :str,
+            use_links       :bool,
+            use_mathjax     :bool,
+            verbose         :bool,
+            template_path   :str,
+            cache_size      :int = SERVE_CACHE_SIZE,
+    ):
+        self.input_dir      = os.path.abspath(input_dir)
+        self.options        = (use_links, use_mathjax, self.input_dir, verbose, template_path, False)
+        self.cache_size     = cache_size
+        self.engine         = _build_engine(self.options)
+        self.page           = _build_page(self.options)
+        self.template_hash  = self._template_hash()
+        manifest            = BuildManifest.load(os.path.join(self.input_dir, BUILD_MANIFEST_FILE))
+        self.backlinks      = LinkGraph.from_manifest(manifest).backlinks() if self.page.uses_backlinks else None
+        self.hits           = 0
+        self.misses         = 0
+        self._cache         = OrderedDict()   # (note, mtime_ns, template hash, generation) -> (page html, {embedded note: (mtime_ns, size)})
+        self._lock          = threading.Lock()
+        self._generation    = 0
+        self._scanned_at    = None
+        self._scanner       = None
+
+    def _template_hash(self) -> str | None:
+        template_path = self.options[4]
+        return hash_file(template_path) if template_path and os.path.isfile(template_path) else hash_file("template.html")
+
+    def _refresh(self) -> None:
+        """Scans the vault again if `SERVE_RESCAN_INTERVAL` passed, and reloads the template if it changed."""
+        now = time.monotonic()
+        if self._scanned_at is None or now - self._scanned_at >= SERVE_RESCAN_INTERVAL:
+            scanner = VaultScanner(self.input_dir, cache=True).scan()
+            if self._scanner is None or scanner.file_index != self._scanner.file_index:
+                self._generation += 1
+                self._scanner = scanner
+            else:
+                # Same files, but `.convertignore` may have changed
+                self._scanner.ignore = scanner.ignore
+            self._scanned_at = now
+        template_hash = self._template_hash()
+        if template_hash != self.template_hash:
+            self.template_hash = template_hash
+            self.page = _build_page(self.options)
+
+    def source_note(self, path :str) -> str | None:
+        """The note which converts to the page at filesystem `path` (a directory stands for its `index.html`), or None if there is none."""
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.html")
+        if path.endswith(BUILT_HTML_EXTENSION):
+            source = path[:-len(BUILT_HTML_EXTENSION)] + ".md"
+        elif os.path.basename(path) == "index.html":
+            source = os.path.join(os.path.dirname(path), "index.md")
+        else:
+            return None
+        source = os.path.abspath(source)
+        if not os.path.isfile(source) or os.path.commonpath([source, self.input_dir]) != self.input_dir:
+            return None
+        return source
+
+    def render(self, source :str) -> str | None:
+        """The page of the note at `source`, from the cache if it is still current. Returns None for notes `.convertignore` excludes."""
+        with self._lock:
+            self._refresh()
+            rel_path = os.path.relpath(source, self.input_dir).replace("\\", "/")
+            if self._scanner.ignore.is_ignored(rel_path):
+                return None
+            try:
+                mtime_ns = os.stat(source).st_mtime_ns
+            except OSError:
+                return None
+            key = (source, mtime_ns, self.template_hash, self._generation)
+            cached = self._cache.get(key)
+            if cached is not None and all(_stat(path) == stat for path, stat in cached[1].items()):
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+            page_html = self._convert(source, rel_path)
+            self._cache[key] = (page_html, {path: _stat(path) for path in self.engine.embeds})
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return page_html
+
+    def _convert(
+            self,
+            source      :str,
+            rel_path    :str,
+    ) -> str:
+        with open(source, "r", encoding="utf-8") as f:
+            text_md = f.read()
+        root = os.path.dirname(source)
+        content = self.engine.convert(text_md, file_index=self._scanner.file_index, root=root, note=source)
+        title = os.path.splitext(os.path.basename(source))[0]
+        sources = self.backlinks.get(rel_path, []) if self.backlinks is not None else None
+        return self.page.render(content, title=title, root=root, backlinks=sources)
+
+def _stat(path :str) -> tuple | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+class _PreviewHandler(SimpleHTTPRequestHandler):
+    """Answers requests for note pages from the `PreviewServer` and every other request with the vault's files."""
+    def __init__(
+            self,
+            *args,
+            preview :PreviewServer,
+            **kwargs,
+    ):
+        self.preview = preview
+        super().__init__(*args, directory=preview.input_dir, **kwargs)
+
+    def do_GET(self):
+        if not self._send_page(head=False):
+            super().do_GET()
+
+    def do_HEAD(self):
+        if not self._send_page(head=True):
+            super().do_HEAD()
+
+    def _send_page(self, head :bool) -> bool:
+        """Sends the page of the requested note. Returns False when the request isn't for a note's page."""
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and not self.path.split("?", 1)[0].split("#", 1)[0].endswith("/"):
+            # Let the static handler redirect to the trailing slash, so relative links resolve
+            return False
+        source = self.preview.source_note(path)
+        if source is None:
+            return False
+        try:
+            page_html = self.preview.render(source)
+        except Exception as e:
+            self.send_error(500, f"Failed to convert {os.path.relpath(source, self.preview.input_dir)}", f"{type(e).__name__}: {e}")
+            return True
+        if page_html is None:
+            return False
+        body = page_html.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+        return True
+
+def serve_directory(
+        input_dir       :str,
+        use_links       :bool,
+        use_mathjax     :bool,
+        verbose         :bool,
+        template_path   :str,
+        host            :str = SERVE_HOST,
+        port            :int = SERVE_PORT,
+) -> None:
+    preview = PreviewServer(input_dir, use_links, use_mathjax, verbose, template_path)
+    server = ThreadingHTTPServer((host, port), partial(_PreviewHandler, preview=preview))
+    print(f"Serving {input_dir} at http://{host}:{server.server_address[1]}/ (Ctrl+C to stop)...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Stopped serving; rendered {preview.misses} pages, {preview.hits} served from the cache.")
+    finally:
+        server.server_close()
@@ -0,0 +1,158 @@
+# First-party
+import io
+import re
+# Local
+from constants import STREAM_CHUNK_SIZE
+from manifest import new_hasher
+
+#############
+# STREAMING #
+#############
+
+FENCE_OPEN_PATTERN = re.compile(r'(```|~~~)[ \t]*[\w+-]*[ \t]*$')
+INLINE_CODE_PATTERN = re.compile(r'`[^`\n]+?`')
+SPAN_DELIMITER_PATTERN = re.compile(r'%%|\$\$')
+HTML_OPEN_PATTERN = re.compile(r'<([A-Za-z][\w-]*)')
+HTML_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# Footnote and reference link definitions, and the table of contents marker, which Markdown resolves across the whole note
+WHOLE_NOTE_PATTERN = re.compile(r' {0,3}\[[^\]\n]+\]:|\[TOC\]')
+# Lines no chunk may start with: those which may continue the block before a blank line (indented or list content, quotes, raw HTML, comments)
+# and code fences, which change the spacing the scanner gives the end of the block before
+UNSPLITTABLE_PATTERN = re.compile(r'[ \t<>%]|(?:[-*+]|\d+[.)])(?:[ \t]|$)|```|~~~')
+
+class NoteChunker:
+    """
+    Splits a note into chunks of about `chunk_size` characters, reading it line by line, so a huge note is never held whole.
+    \nChunks only end at a blank line outside fenced code, `$$` math blocks, `%%` comments, callouts and raw HTML blocks,
+    and only before a line which starts a new top-level block (not indented, a list item, a quote, raw HTML, a comment or a code fence);
+    converting the chunks one by one then gives the same HTML as converting the whole note.
+    Notes with footnotes, reference link definitions or a `[TOC]` are resolved across the whole note by Markdown, so they come out as a single chunk.
+    \nOnce every chunk was read, `digest` is the content hash of the bytes they were read from (see `manifest.hash_bytes`).
+    """
+    def __init__(
+            self,
+            path        :str,
+            chunk_size  :int = STREAM_CHUNK_SIZE,
+    ):
+        self.path       = path
+        self.chunk_size = chunk_size
+        self.digest     = None
+
+    def __iter__(self):
+        self.digest = None
+        hasher = new_hasher()
+        if self._needs_whole_note():
+            with self._open(hasher) as f:
+                yield f.read()
+            self.digest = hasher.hexdigest()
+            return
+        state = _BlockState()
+        chunk, size = [], 0
+        blank_run = False
+        with self._open(hasher) as f:
+            for line in f:
+                body = line.rstrip("\n")
+                if not body:
+                    blank_run = bool(chunk)
+                elif blank_run:
+                    blank_run = False
+                    if size >= self.chunk_size and state.is_closed() and not UNSPLITTABLE_PATTERN.match(body):
+                        yield "".join(chunk)
+                        chunk, size = [], 0
+                if body:
+                    state.feed(body)
+                chunk.append(line)
+                size += len(line)
+        self.digest = hasher.hexdigest()
+        if chunk:
+            yield "".join(chunk)
+
+    def _open(self, hasher) -> io.TextIOWrapper:
+        """Opens the note like `open(path, "r", encoding="utf-8")`, feeding `hasher` every byte read."""
+        return io.TextIOWrapper(io.BufferedReader(_HashingReader(open(self.path, "rb", buffering=0), hasher)), encoding="utf-8")
+
+    def _needs_whole_note(self) -> bool:
+        fence = None
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                fence = _next_fence(fence, line.rstrip("\n"))
+                if fence is None and WHOLE_NOTE_PATTERN.match(line):
+                    return True
+        return False
+
+class _HashingReader(io.RawIOBase):
+    """Raw reader passing the bytes read from `raw` to `hasher` on their way."""
+    def __init__(
+            self,
+            raw,
+            hasher,
+    ):
+        self.raw    = raw
+        self.hasher = hasher
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        n = self.raw.readinto(buffer)
+        if n:
+            self.hasher.update(memoryview(buffer)[:n])
+        return n
+
+    def close(self) -> None:
+        self.raw.close()
+        super().close()
+
+class _BlockState:
+    """Tracks, line by line, whether the note so far ends inside a construct which may span blank lines."""
+    def __init__(self):
+        self.fence      = None  # Fence mark of the open code fence
+        self.span       = None  # "%%" or "$$" while a comment or math block is open
+        self.raw_span   = None  # The same, also counting delimiters in inline code as the `convert.py` stages do
+        self.html_tag   = None  # Name of the open raw HTML block's tag
+        self.html_depth = 0
+
+    def is_closed(self) -> bool:
+        return self.fence is None and self.span is None and self.raw_span is None and self.html_tag is None
+
+    def feed(self, line :str) -> None:
+        if self.fence is not None or (self.span is None and self.raw_span is None and self.html_tag is None and FENCE_OPEN_PATTERN.match(line)):
+            self.fence = _next_fence(self.fence, line)
+            return
+        self.span = _next_span(self.span, INLINE_CODE_PATTERN.sub("", line))
+        self.raw_span = _next_span(self.raw_span, line)
+        if self.span is not None or self.raw_span is not None:
+            return
+        if self.html_tag is None:
+            m = HTML_OPEN_PATTERN.match(line)
+            if m is None or m.group(1).lower() in HTML_VOID_TAGS:
+                return
+            self.html_tag, self.html_depth = m.group(1).lower(), 0
+        lower = line.lower()
+        self.html_depth += lower.count(f"<{self.html_tag}") - lower.count(f"</{self.html_tag}")
+        if self.html_depth <= 0:
+            self.html_tag = None
+
+def _next_span(
+        span    :str | None,
+        line    :str,
+) -> str | None:
+    """The open comment or math delimiter after `line`, given the one open before it."""
+    for m in SPAN_DELIMITER_PATTERN.finditer(line):
+        if span is None:
+            span = m.group(0)
+        elif span == m.group(0):
+            span = None
+    return span
+
+def _next_fence(
+        fence   :str | None,
+        line    :str,
+) -> str | None:
+    """The open fence mark after `line`, given the one open before it."""
+    if fence is None:
+        m = FENCE_OPEN_PATTERN.match(line)
+        return m.group(1) if m else None
+    if line.startswith(fence) and not line[len(fence):].strip():
+        return None
+    return fence
@@ -0,0 +1,132 @@
+# First-party
+import html
+import json
+import os
+from urllib.parse import quote
+# Local
+from constants import TAG_PAGES_DIR, TAG_INDEX_FILE, TAG_PAGE_NOTES_CLASS, TAG_PAGE_CHILDREN_CLASS, INTERNAL_LINK_CLASS, TAGS_CLASS, TAGS_DATA
+
+#############
+# TAG PAGES #
+#############
+
+def note_tags(manifest) -> dict:
+    """{note: tags} of every note in a `manifest.BuildManifest`, as recorded while converting."""
+    return {rel_path: entry.get("tags", []) for rel_path, entry in manifest.notes.items()}
+
+def expand_tag(tag :str) -> list:
+    """A nested tag and its parents: "a/b/c" -> ["a", "a/b", "a/b/c"]."""
+    parts = tag.split("/")
+    return ["/".join(parts[:i]) for i in range(1, len(parts) + 1) if parts[i - 1]]
+
+class TagPages:
+    """
+    Writes a page per tag under `TAG_PAGES_DIR` of the vault root, plus a JSON index of every tag, from the tags the build manifest recorded for each note.
+    \nA tag page lists the notes tagged with it or with any tag nested below it, and links to the nested tags' pages.
+    Only the pages of tags whose notes changed are rewritten; pages of tags which disappeared are removed.
+    """
+    def __init__(
+            self,
+            site_root   :str,
+            page,
+            writer,
+    ):
+        self.site_root  = site_root
+        self.page       = page
+        self.writer     = writer
+        self.tags_dir   = os.path.join(site_root, TAG_PAGES_DIR)
+        self.index_path = os.path.join(self.tags_dir, TAG_INDEX_FILE)
+
+    def update(
+            self,
+            manifest,
+            previous    :dict,
+            full        :bool = False,
+    ) -> int:
+        """
+        Brings the tag pages in line with `manifest`, given the {note: tags} `previous` held before this build.
+        \nWith `full`, every page is rewritten (e.g. after the template changed). Returns the number of pages rendered.
+        """
+        current = note_tags(manifest)
+        members = {}
+        for rel_path, tags in current.items():
+            for tag in tags:
+                for name in expand_tag(tag):
+                    members.setdefault(name, set()).add(rel_path)
+        emitted = set(manifest.tag_pages)
+        if full:
+            dirty = set(members) | emitted
+        else:
+            dirty = set()
+            for rel_path in current.keys() | previous.keys():
+                old, new = previous.get(rel_path, []), current.get(rel_path, [])
+                if old != new:
+                    for tag in set(old).symmetric_difference(new):
+                        dirty.update(expand_tag(tag))
+            # Tags without a page yet, e.g. on the first build with --taglinks
+            dirty.update(name for name in members if name not in emitted)
+        children = {}
+        for name in members:
+            parent = name.rpartition("/")[0]
+            if parent:
+                children.setdefault(parent, set()).add(name)
+        for name in sorted(dirty):
+            page_path = self.page_path(name)
+            if name in members:
+                content = self._render(name, sorted(members[name]), sorted(children.get(name, ())), manifest)
+                self.writer.write(page_path, self.page.render(content, title=f"#{name}", root=os.path.dirname(page_path)))
+            elif self.writer.remove(page_path):
+                self._remove_empty_dirs(os.path.dirname(page_path))
+        if dirty or not self.writer.exists(self.index_path):
+            self.writer.write(self.index_path, self._index_json(members, manifest))
+        manifest.tag_pages = sorted(members)
+        return sum(1 for name in dirty if name in members)
+
+    def page_path(self, name :str) -> str:
+        return os.path.join(self.tags_dir, *name.split("/")) + ".html"
+
+    def _remove_empty_dirs(self, directory :str) -> None:
+        """Removes `directory` and its parents up to (not including) the tag pages folder while they are empty."""
+        directory, tags_dir = self.writer.target(directory), self.writer.target(self.tags_dir)
+        while os.path.normpath(directory) != os.path.normpath(tags_dir) and not os.listdir(directory):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
+
+    def _render(
+            self,
+            name        :str,
+            notes       :list,
+            child_tags  :list,
+            manifest,
+    ) -> str:
+        page_dir = os.path.dirname(self.page_path(name))
+        lines = [f'<h1><span class="{TAGS_CLASS}" {TAGS_DATA}="{html.escape(name)}">#{html.escape(name)}</span></h1>']
+        if child_tags:
+            lines.append(f'<ul class="{TAG_PAGE_CHILDREN_CLASS}">')
+            for child in child_tags:
+                href = quote(os.path.relpath(self.page_path(child), page_dir).replace("\\", "/"), safe="/")
+                lines.append(f'<li><a class="{TAGS_CLASS}" {TAGS_DATA}="{html.escape(child)}" href="{href}">#{html.escape(child)}</a></li>')
+            lines.append("</ul>")
+        lines.append(f'<ul class="{TAG_PAGE_NOTES_CLASS}">')
+        for rel_path in notes:
+            output = manifest.notes[rel_path]["output"]
+            href = quote(os.path.relpath(os.path.join(self.site_root, output), page_dir).replace("\\", "/"), safe="/")
+            title = os.path.splitext(os.path.basename(rel_path))[0]
+            lines.append(f'<li><a class="{INTERNAL_LINK_CLASS}" href="{href}">{html.escape(title)}</a></li>')
+        lines.append("</ul>")
+        return "\n".join(lines)
+
+    def _index_json(
+            self,
+            members     :dict,
+            manifest,
+    ) -> str:
+        """{tag: {"page": page path, "notes": [output paths]}}, all relative to the vault root."""
+        index = {
+            name: {
+                "page"  : f"{TAG_PAGES_DIR}/{name}.html",
+                "notes" : [manifest.notes[rel_path]["output"] for rel_path in sorted(members[name])],
+            }
+            for name in sorted(members)
+        }
+        return json.dumps(index, indent=2, ensure_ascii=False)
@@ -0,0 +1,73 @@
+# First-party
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from main import convert_directory
+from profiling import StageProfiler
+
+TEMPLATE = "<html><body><h1>{title}</h1>\n{content}\n<footer>{backlinks}</footer></body></html>\n"
+
+class BacklinksBuildTest(unittest.TestCase):
+    """Directory builds with a `{backlinks}` template convert every note once, and re-render only the template when backlinks change."""
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(self.work_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.vault = os.path.join(self.work_dir.name, "vault")
+        os.makedirs(os.path.join(self.vault, "sub"))
+        self.template = os.path.join(self.work_dir.name, "template.html")
+        self._write(self.template, TEMPLATE)
+        self._write(os.path.join(self.vault, "Alpha.md"), "Alpha links [[Beta]] and [[Gamma]].\n")
+        self._write(os.path.join(self.vault, "Beta.md"), "Beta links [[Gamma]].\n\n![[Gamma]]\n")
+        self._write(os.path.join(self.vault, "sub", "Gamma.md"), "# Gamma\n\nGamma links back to [[Alpha]].\n")
+
+    def _write(
+            self,
+            path    :str,
+            text    :str,
+    ) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _read(self, rel_path :str) -> str:
+        with open(os.path.join(self.vault, rel_path), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _build(self, incremental :bool = True) -> dict:
+        """Builds the vault, returning the number of times each note was read for conversion."""
+        profiler = StageProfiler()
+        with contextlib.redirect_stdout(io.StringIO()):
+            failures = convert_directory(self.vault, False, False, False, self.template, incremental=incremental, profiler=profiler)
+        self.assertEqual(failures, [])
+        return {os.path.relpath(note, self.vault).replace("\\", "/"): sum(1 for record in records if record[0] == "read") for note, records in profiler.notes.items()}
+
+    def test_cold_build_converts_each_note_once(self):
+        reads = self._build(incremental=False)
+        self.assertEqual(reads, {"Alpha.md": 1, "Beta.md": 1, "sub/Gamma.md": 1})
+        self.assertIn('href="../Beta.md.html">Beta</a>', self._read("sub/Gamma.md.html"))
+        self.assertIn('href="sub/Gamma.md.html">Gamma</a>', self._read("Alpha.md.html"))
+        self.assertIn('href="Alpha.md.html">Alpha</a>', self._read("Beta.md.html"))
+
+    def test_relinked_pages_match_a_rebuild(self):
+        self._build(incremental=False)
+        self._write(os.path.join(self.vault, "Delta.md"), "Delta links [[Beta]].\n")
+        reads = self._build()
+        # Beta's backlinks changed, but only Delta itself is converted
+        self.assertEqual(reads, {"Delta.md": 1})
+        pages = {rel_path: self._read(rel_path) for rel_path in ("Alpha.md.html", "Beta.md.html", "Delta.md.html", "sub/Gamma.md.html")}
+        self.assertIn('href="Delta.md.html">Delta</a>', pages["Beta.md.html"])
+        self._build(incremental=False)
+        for rel_path, page_html in pages.items():
+            self.assertEqual(self._read(rel_path), page_html, rel_path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+# First-party
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+import main
+from constants import BUILD_MANIFEST_FILE
+from main import convert_directory
+from manifest import BuildCheckpoint, BuildManifest
+from profiling import StageProfiler
+
+NOTES = ["A.md", "B.md", "C.md", "D.md", "E.md"]
+
+class BuildCheckpointTest(unittest.TestCase):
+    """Interrupted builds resume with the notes not recorded yet, and failing notes keep their old page without stopping the others."""
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(self.work_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.vault = os.path.join(self.work_dir.name, "vault")
+        os.makedirs(self.vault)
+        self.template = os.path.join(self.work_dir.name, "template.html")
+        self._write(self.template, "<html><body>{content}</body></html>\n")
+        for name in NOTES:
+            self._write(os.path.join(self.vault, name), f"Note {name} #topic with searchable words.\n")
+
+    def _write(
+            self,
+            path    :str,
+            text    :str,
+    ) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _read(self, rel_path :str) -> str:
+        with open(os.path.join(self.vault, rel_path), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _manifest(self) -> BuildManifest:
+        return BuildManifest.load(os.path.join(self.vault, BUILD_MANIFEST_FILE))
+
+    def _build(
+            self,
+            fail_on     :str | None = None,
+            error       :type = KeyboardInterrupt,
+            keep_going  :bool = False,
+            error_report :str | None = None,
+    ) -> tuple:
+        """Builds the vault, raising `error` when the note named `fail_on` is converted. Returns (notes converted, failures)."""
+        profiler = StageProfiler()
+        convert_job = main._convert_job
+        def failing_convert_job(input_path, *args, **kwargs):
+            if os.path.basename(input_path) == fail_on:
+                raise error("conversion failed")
+            return convert_job(input_path, *args, **kwargs)
+        with mock.patch.object(main, "_convert_job", failing_convert_job), contextlib.redirect_stdout(io.StringIO()):
+            failures = convert_directory(self.vault, True, False, False, self.template, use_search=True, keep_going=keep_going, error_report=error_report, profiler=profiler)
+        converted = {os.path.basename(note) for note, records in profiler.notes.items() if any(record[0] == "read" for record in records)}
+        return converted, failures
+
+    def test_interrupted_build_resumes(self):
+        with self.assertRaises(KeyboardInterrupt):
+            self._build(fail_on="C.md")
+        manifest = self._manifest()
+        self.assertFalse(manifest.complete)
+        recorded = set(manifest.notes)
+        self.assertTrue(recorded and "C.md" not in recorded, recorded)
+        for rel_path in recorded:
+            self.assertTrue(os.path.isfile(os.path.join(self.vault, manifest.notes[rel_path]["output"])))
+        self.assertFalse(os.path.exists(os.path.join(self.vault, "tags", "topic.html")))
+        converted, failures = self._build()
+        self.assertEqual(failures, [])
+        self.assertEqual(converted, set(NOTES) - recorded)
+        manifest = self._manifest()
+        self.assertTrue(manifest.complete)
+        # The tag page and search index cover the notes of both runs
+        tag_page = self._read(os.path.join("tags", "topic.html"))
+        for name in NOTES:
+            self.assertIn(f"{name}.html", tag_page)
+        self.assertEqual(sorted(doc for doc in manifest.search_docs if doc), NOTES)
+
+    def test_failing_note_keeps_its_page(self):
+        self._build()
+        old_page = self._read("B.md.html")
+        for name in ("A.md", "B.md"):
+            self._write(os.path.join(self.vault, name), f"Note {name} edited #topic.\n")
+        report_path = os.path.join(self.work_dir.name, "report.json")
+        converted, failures = self._build(fail_on="B.md", error=ValueError, keep_going=True, error_report=report_path)
+        self.assertEqual(converted, {"A.md"})
+        self.assertEqual(failures, [(os.path.join(self.vault, "B.md"), "ValueError: conversion failed")])
+        self.assertEqual(self._read("B.md.html"), old_page)
+        self.assertIn("edited", self._read("A.md.html"))
+        for name in ("C.md", "D.md", "E.md"):
+            self.assertIn(f"Note {name}", self._read(f"{name}.html"))
+        with open(report_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        self.assertTrue(report["complete"])
+        self.assertEqual(report["failed"], [{"note": "B.md", "error": "ValueError: conversion failed"}])
+        # Still stale, so the next build tries it again
+        converted, failures = self._build()
+        self.assertEqual((converted, failures), ({"B.md"}, []))
+        self.assertIn("edited", self._read("B.md.html"))
+
+    def test_checkpoint_flushes_before_saving(self):
+        manifest = BuildManifest(os.path.join(self.vault, BUILD_MANIFEST_FILE))
+        events = []
+        checkpoint = BuildCheckpoint(manifest, lambda: events.append("flush"), interval=0)
+        with mock.patch.object(manifest, "save", lambda: events.append("save")):
+            checkpoint.recorded("A.md")
+            checkpoint.recorded("B.md")
+        self.assertEqual(events, ["flush", "save", "flush", "save"])
+        self.assertEqual(checkpoint.converted, {"A.md", "B.md"})
+
+if __name__ == "__main__":
+    unittest.main()
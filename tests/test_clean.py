@@ -0,0 +1,114 @@
+# First-party
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from constants import BUILD_MANIFEST_FILE
+from main import clean_md_html_files, convert_directory
+from manifest import BuildManifest
+
+TEMPLATE = "<html><body>{content}</body></html>\n"
+
+class CleanTest(unittest.TestCase):
+    """`--clean` removes exactly the files the build manifest records, and `--dry-run` only lists them."""
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(self.work_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.vault = os.path.join(self.work_dir.name, "vault")
+        os.makedirs(os.path.join(self.vault, "sub"))
+        self.template = os.path.join(self.work_dir.name, "template.html")
+        self._write(self.template, TEMPLATE)
+        self._write(os.path.join(self.vault, "Alpha.md"), "Alpha #topic links [[Beta]].\n\n![[image.png]]\n")
+        self._write(os.path.join(self.vault, "sub", "Beta.md"), "Beta #topic #other searchable words.\n")
+        self._write(os.path.join(self.vault, "image.png"), "png")
+        # Not built by the converter, even those named like its pages
+        self._write(os.path.join(self.vault, "page.html"), "<p>Hand-written</p>")
+        self._write(os.path.join(self.vault, "sub", "Stray.md.html"), "<p>Not recorded</p>")
+
+    def _write(
+            self,
+            path    :str,
+            text    :str,
+    ) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _files(self, root :str) -> set:
+        """Paths of every file under `root`, relative to it."""
+        return {
+            os.path.relpath(os.path.join(dir_path, name), root).replace("\\", "/")
+            for dir_path, _dirs, files in os.walk(root) for name in files
+        }
+
+    def _build(self, out_dir :str | None = None) -> None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            failures = convert_directory(self.vault, True, False, False, self.template, use_search=True, out_dir=out_dir)
+        self.assertEqual(failures, [])
+
+    def _clean(self, dry_run :bool = False) -> str:
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            clean_md_html_files(root=self.vault, force=True, dry_run=dry_run)
+        return stdout.getvalue()
+
+    def _built(self, root :str) -> set:
+        """The files the manifest says the build wrote under `root`, relative to it."""
+        manifest = BuildManifest.load(os.path.join(self.vault, BUILD_MANIFEST_FILE))
+        built = {entry["output"] for entry in manifest.notes.values()}
+        built |= set(manifest.dropped_outputs.values()) | set(manifest.mirrored)
+        built |= {path for path in self._files(root) if path.startswith(("tags/", "search/"))}
+        return built
+
+    def test_dry_run_removes_nothing(self):
+        self._build()
+        before = self._files(self.vault)
+        output = self._clean(dry_run=True)
+        self.assertEqual(self._files(self.vault), before)
+        self.assertIn("Would delete", output)
+        self.assertIn(os.path.join(self.vault, "Alpha.md.html"), output)
+        self.assertNotIn("page.html", output)
+
+    def test_clean_removes_exactly_the_recorded_outputs(self):
+        self._build()
+        before = self._files(self.vault)
+        built = self._built(self.vault)
+        self.assertTrue({"Alpha.md.html", "sub/Beta.md.html", "tags/topic.html", "tags/tags.json"} <= built, built)
+        self.assertTrue(any(path.startswith("search/") for path in built), built)
+        self._clean()
+        self.assertEqual(before - self._files(self.vault), built | {BUILD_MANIFEST_FILE})
+        self.assertTrue({"page.html", "sub/Stray.md.html", "Alpha.md", "image.png"} <= self._files(self.vault))
+        self.assertFalse(os.path.exists(os.path.join(self.vault, "tags")))
+        self.assertFalse(os.path.exists(os.path.join(self.vault, "search")))
+
+    def test_clean_removes_dropped_outputs(self):
+        self._build()
+        manifest_path = os.path.join(self.vault, BUILD_MANIFEST_FILE)
+        manifest = BuildManifest.load(manifest_path)
+        manifest.dropped_outputs["Gone.md"] = "Gone.md.html"
+        manifest.save()
+        self._write(os.path.join(self.vault, "Gone.md.html"), "<p>Page of a removed note</p>")
+        self._clean()
+        self.assertFalse(os.path.exists(os.path.join(self.vault, "Gone.md.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.vault, "sub", "Stray.md.html")))
+
+    def test_clean_of_out_dir_removes_mirrored_assets(self):
+        out_dir = os.path.join(self.work_dir.name, "site")
+        self._build(out_dir=out_dir)
+        self.assertIn("image.png", self._files(out_dir))
+        vault_before = self._files(self.vault)
+        self._write(os.path.join(out_dir, "unrelated.html"), "<p>Kept</p>")
+        self._clean()
+        self.assertEqual(self._files(out_dir), {"unrelated.html"})
+        self.assertEqual(self._files(self.vault), vault_before - {BUILD_MANIFEST_FILE})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# First-party
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+import util
+from util import DirectoryCache, build_file_index
+
+class DirectoryCacheTest(unittest.TestCase):
+    """Cached listings are reused while their directory's mtime is unchanged, and listed again once it changed."""
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(work_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.vault = os.path.join(work_dir.name, "vault")
+        for rel_dir in ("a", "a/b", "c"):
+            os.makedirs(os.path.join(self.vault, rel_dir))
+        for rel_path in ("Root.md", "a/Note.md", "a/b/Deep.md", "c/Other.md"):
+            self._write(rel_path)
+        self._age("", "a", "a/b", "c")
+
+    def _write(self, rel_path :str) -> None:
+        with open(os.path.join(self.vault, rel_path), "w", encoding="utf-8") as f:
+            f.write("")
+
+    def _age(self, *rel_dirs :str, seconds :float = 60) -> None:
+        """Sets the mtime of the directories at `rel_dirs` to `seconds` ago, out of `FILE_INDEX_RACY_WINDOW`."""
+        past = time.time() - seconds
+        for rel_dir in rel_dirs:
+            os.utime(os.path.join(self.vault, rel_dir), (past, past))
+
+    def _scan(self) -> tuple:
+        """Lists every directory through a fresh cache, returning (the listings, the directories actually listed)."""
+        listed = []
+        list_directory = util.list_directory
+        def counting_list_directory(path):
+            listed.append(os.path.relpath(path, self.vault).replace("\\", "/"))
+            return list_directory(path)
+        with mock.patch.object(util, "list_directory", counting_list_directory):
+            cache = DirectoryCache(self.vault)
+            listings = {rel_dir: cache.listdir(rel_dir) for rel_dir in ("", "a", "a/b", "c")}
+            cache.save()
+        return listings, sorted(listed)
+
+    def test_unchanged_directories_are_not_listed_again(self):
+        listings, listed = self._scan()
+        self.assertEqual(listed, [".", "a", "a/b", "c"])
+        self.assertEqual(self._scan(), (listings, []))
+
+    def test_changed_mtime_lists_the_directory_again(self):
+        self._scan()
+        self._write("a/b/New.md")
+        self._age("a/b", seconds=30)
+        listings, listed = self._scan()
+        self.assertEqual(listed, ["a/b"])
+        self.assertIn("New.md", listings["a/b"][0])
+        self.assertEqual(self._scan()[1], [])
+
+    def test_same_contents_with_new_mtime_is_listed_again(self):
+        self._scan()
+        self._age("c", seconds=30)
+        self.assertEqual(self._scan()[1], ["c"])
+
+    def test_recently_modified_directory_is_not_trusted(self):
+        self._scan()
+        self._write("c/Fresh.md")
+        # Within the racy window, the same mtime might still hide a later change
+        self.assertEqual(self._scan()[1], ["c"])
+        self.assertEqual(self._scan()[1], ["c"])
+        self._age("c")
+        self.assertEqual(self._scan()[1], ["c"])
+        self.assertEqual(self._scan()[1], [])
+
+    def test_cached_index_matches_walk(self):
+        build_file_index(self.vault, cache=True)
+        self._write("c/Added.md")
+        os.remove(os.path.join(self.vault, "a", "Note.md"))
+        self._age("a", "c", seconds=30)
+        self.assertEqual(dict(build_file_index(self.vault, cache=True)), dict(build_file_index(self.vault)))
+
+if __name__ == "__main__":
+    unittest.main()
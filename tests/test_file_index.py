@@ -0,0 +1,112 @@
+# First-party
+import os
+import sys
+import tempfile
+import unittest
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from util import FileIndex, build_file_index, resolve_obsidian_path
+
+# Ambiguous names in nested and sibling directories, including directories whose names share a prefix
+FILES = [
+    "Note.md",
+    "a/Note.md",
+    "a/b/Note.md",
+    "a/b/c/Other.md",
+    "a/bb/Note.md",
+    "a/bb/Other.md",
+    "ab/Note.md",
+    "ab/image.png",
+    "x/y/image.png",
+    "x/z/image.png",
+    "x/z/w/Deep.md",
+    "q/Other.md",
+]
+
+class FileIndexTest(unittest.TestCase):
+    """`FileIndex.resolve` picks the file the longest-commonpath heuristic does, and its memo follows `add` and `remove`."""
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        self.vault = work_dir.name
+        for rel_path in FILES:
+            self._create(rel_path)
+        self.dirs = sorted({os.path.dirname(os.path.join(self.vault, rel_path)) for rel_path in FILES} | {os.path.join(self.vault, "x"), os.path.join(self.vault, "nowhere")})
+
+    def _create(self, rel_path :str) -> str:
+        path = os.path.join(self.vault, *rel_path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("")
+        return path
+
+    def _baseline(
+            self,
+            index       :FileIndex,
+            link_text   :str,
+            current_dir :str,
+    ) -> str | None:
+        """Resolution of the commonpath loop `resolve_obsidian_path` runs on a plain index."""
+        plain = defaultdict(list, {name: list(candidates) for name, candidates in index.items()})
+        try:
+            return resolve_obsidian_path(link_text, plain, current_dir)
+        except FileNotFoundError:
+            return None
+
+    def _resolve(
+            self,
+            index       :FileIndex,
+            link_text   :str,
+            current_dir :str,
+    ) -> str | None:
+        try:
+            return index.resolve(link_text, current_dir)
+        except FileNotFoundError:
+            return None
+
+    def _assert_matches_baseline(self, index :FileIndex) -> None:
+        for link_text in ("Note", "note.md", "Other", "image.png", "Deep", "Missing", "missing.png"):
+            for current_dir in self.dirs:
+                with self.subTest(link=link_text, current_dir=os.path.relpath(current_dir, self.vault)):
+                    expected = self._baseline(index, link_text, current_dir)
+                    # Twice, the second time from the memo
+                    self.assertEqual(self._resolve(index, link_text, current_dir), expected)
+                    self.assertEqual(self._resolve(index, link_text, current_dir), expected)
+
+    def test_resolve_matches_commonpath_baseline(self):
+        self._assert_matches_baseline(build_file_index(self.vault))
+
+    def test_ties_go_to_the_first_listed_candidate(self):
+        index = build_file_index(self.vault)
+        first = os.path.relpath(index["image.png"][0], os.path.join(self.vault, "x")).replace("\\", "/")
+        self.assertEqual(index.resolve("image.png", os.path.join(self.vault, "x")), first)
+
+    def test_memo_follows_add_and_remove(self):
+        index = build_file_index(self.vault)
+        q = os.path.join(self.vault, "q")
+        self.assertEqual(index.resolve("Note", q), "../Note.md")
+        self.assertIsNone(self._resolve(index, "New", q))
+        note = self._create("q/Note.md")
+        index.add(note)
+        index.add(self._create("q/New.md"))
+        self.assertEqual(index.resolve("Note", q), "Note.md")
+        self.assertEqual(index.resolve("New", q), "New.md")
+        self._assert_matches_baseline(index)
+        index.remove(note)
+        index.remove(os.path.join(q, "New.md"))
+        self.assertEqual(index.resolve("Note", q), "../Note.md")
+        self.assertIsNone(self._resolve(index, "New", q))
+        self.assertNotIn("new.md", index)
+        self._assert_matches_baseline(index)
+
+    def test_remove_of_unindexed_path_is_ignored(self):
+        index = build_file_index(self.vault)
+        before = {name: list(candidates) for name, candidates in index.items()}
+        index.remove(os.path.join(self.vault, "q", "Note.md"))
+        index.remove(os.path.join(self.vault, "Unknown.md"))
+        self.assertEqual(dict(index), before)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,154 @@
+# First-party
+import fnmatch
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from util import IgnoreMatcher, VaultScanner, parse_ignore_file
+
+def baseline_should_ignore(
+        rel_path    :str,
+        patterns    :list,
+        is_dir      :bool = False,
+) -> bool:
+    """The fnmatch based matching `.convertignore` used before it followed .gitignore rules."""
+    rel_path_norm = rel_path.replace("\\", "/").rstrip("/")
+    for pat in patterns:
+        pat = pat.strip()
+        if not pat:
+            continue
+        if pat.endswith("/"):
+            pat_dir = pat.rstrip("/")
+            if is_dir and fnmatch.fnmatch(rel_path_norm, pat_dir):
+                return True
+            if rel_path_norm.startswith(pat_dir + "/"):
+                return True
+        else:
+            if fnmatch.fnmatch(rel_path_norm, pat):
+                return True
+            if is_dir and fnmatch.fnmatch(rel_path_norm + "/", pat + "/"):
+                return True
+    return False
+
+def baseline_is_ignored(
+        rel_path    :str,
+        patterns    :list,
+        is_dir      :bool = False,
+) -> bool:
+    """Whether the baseline walk skipped `rel_path`, itself or by pruning one of its parents."""
+    parts = rel_path.split("/")
+    for i in range(1, len(parts)):
+        if baseline_should_ignore("/".join(parts[:i]), patterns, is_dir=True):
+            return True
+    return baseline_should_ignore(rel_path, patterns, is_dir=is_dir)
+
+class IgnoreMatcherTest(unittest.TestCase):
+    """`.convertignore` patterns follow .gitignore rules."""
+    def assertIgnored(
+            self,
+            patterns    :list,
+            rel_path    :str,
+            is_dir      :bool = False,
+    ) -> None:
+        self.assertTrue(IgnoreMatcher(patterns).is_ignored(rel_path, is_dir=is_dir), f"{patterns} should ignore {rel_path}")
+
+    def assertKept(
+            self,
+            patterns    :list,
+            rel_path    :str,
+            is_dir      :bool = False,
+    ) -> None:
+        self.assertFalse(IgnoreMatcher(patterns).is_ignored(rel_path, is_dir=is_dir), f"{patterns} should keep {rel_path}")
+
+    def test_unanchored_pattern_matches_at_any_depth(self):
+        self.assertIgnored(["drafts"], "drafts", is_dir=True)
+        self.assertIgnored(["drafts"], "a/b/drafts", is_dir=True)
+        self.assertIgnored(["drafts"], "a/drafts/note.md")
+        self.assertIgnored(["*.txt"], "a/b/c.txt")
+        self.assertKept(["drafts"], "drafts.md")
+
+    def test_slash_anchors_to_the_vault_root(self):
+        self.assertIgnored(["private/secret.md"], "private/secret.md")
+        self.assertKept(["private/secret.md"], "a/private/secret.md")
+        self.assertIgnored(["/drafts"], "drafts/note.md")
+        self.assertKept(["/drafts"], "a/drafts/note.md")
+
+    def test_trailing_slash_only_matches_directories(self):
+        self.assertIgnored(["build/"], "build", is_dir=True)
+        self.assertIgnored(["build/"], "build/page.md")
+        self.assertKept(["build/"], "build")
+        self.assertKept(["build/"], "a/build.md")
+
+    def test_wildcards_stop_at_slashes(self):
+        self.assertIgnored(["notes/*.md"], "notes/a.md")
+        self.assertKept(["notes/*.md"], "notes/sub/a.md")
+        self.assertIgnored(["a?c.md"], "abc.md")
+        self.assertKept(["a?c.md"], "a/c.md")
+        self.assertIgnored(["[Tt]mp/"], "Tmp/a.md")
+        self.assertKept(["[!T]mp/"], "Tmp/a.md")
+
+    def test_double_star_spans_directories(self):
+        self.assertIgnored(["**/cache"], "cache", is_dir=True)
+        self.assertIgnored(["**/cache"], "a/b/cache", is_dir=True)
+        self.assertIgnored(["notes/**/*.md"], "notes/a.md")
+        self.assertIgnored(["notes/**/*.md"], "notes/sub/deeper/a.md")
+        self.assertKept(["notes/**/*.md"], "other/notes/a.md")
+        self.assertIgnored(["export/**"], "export/a/b.png")
+        self.assertKept(["export/**"], "export", is_dir=True)
+
+    def test_negation_reincludes_and_last_match_wins(self):
+        self.assertKept(["*.md", "!keep.md"], "keep.md")
+        self.assertIgnored(["*.md", "!keep.md"], "drop.md")
+        self.assertIgnored(["!keep.md", "*.md"], "keep.md")
+        # As in git, nothing below an ignored directory can be re-included
+        self.assertIgnored(["drafts/", "!drafts/keep.md"], "drafts/keep.md")
+
+    def test_comments_escapes_and_blank_lines(self):
+        self.assertKept(["# drafts", "", "   "], "# drafts")
+        self.assertIgnored(["\\#hash.md"], "#hash.md")
+        self.assertIgnored(["\\!bang.md"], "!bang.md")
+
+    def test_old_style_patterns_still_match(self):
+        patterns = [
+            "drafts/", "templates", "*.txt", "private/secret.md", "archive/2020/", "*.excalidraw.md",
+            "Daily*", "attachments/*", "_*", "a?c.md", "[Tt]mp/", "notes/**/*.md",
+        ]
+        paths = [
+            ("drafts", True), ("drafts/a.md", False), ("x/drafts/a.md", False), ("templates", True), ("templates/t.md", False),
+            ("templates.md", False), ("a.txt", False), ("x/y/a.txt", False), ("private/secret.md", False), ("x/private/secret.md", False),
+            ("notes/a.md", False), ("archive/2020/a.md", False), ("archive/2021/a.md", False), ("x/d.excalidraw.md", False),
+            ("Daily 1.md", False), ("attachments/a.png", False), ("attachments/sub/b.png", False), ("_hidden.md", False),
+            ("abc.md", False), ("tmp/a.md", False), ("Tmp/a.md", False), ("ok.md", False), ("x/ok.md", False),
+        ]
+        for pattern in patterns:
+            matcher = IgnoreMatcher([pattern])
+            for rel_path, is_dir in paths:
+                if baseline_is_ignored(rel_path, [pattern], is_dir=is_dir):
+                    self.assertTrue(matcher.is_ignored(rel_path, is_dir=is_dir), f"{pattern!r} no longer ignores {rel_path}")
+
+    def test_star_no_longer_spans_directories(self):
+        # The one pattern kind whose matches shrank; "notes/**/*.md" keeps the old meaning
+        self.assertTrue(baseline_is_ignored("notes/sub/a.md", ["notes/*.md"]))
+        self.assertKept(["notes/*.md"], "notes/sub/a.md")
+        self.assertIgnored(["notes/**/*.md"], "notes/sub/a.md")
+
+class VaultScannerIgnoreTest(unittest.TestCase):
+    """Directory builds leave out exactly what `.convertignore` ignores."""
+    def test_scan_skips_ignored_notes(self):
+        with tempfile.TemporaryDirectory() as vault:
+            for rel_path in ("a.md", "drafts/b.md", "notes/c.md", "notes/keep.md", "notes/sub/d.md"):
+                os.makedirs(os.path.join(vault, os.path.dirname(rel_path)), exist_ok=True)
+                with open(os.path.join(vault, rel_path), "w", encoding="utf-8") as f:
+                    f.write("Note.\n")
+            with open(os.path.join(vault, ".convertignore"), "w", encoding="utf-8") as f:
+                f.write("# Work in progress\ndrafts/\nnotes/*.md\n!notes/keep.md\n")
+            self.assertEqual(parse_ignore_file(os.path.join(vault, ".convertignore")), ["drafts/", "notes/*.md", "!notes/keep.md"])
+            scanner = VaultScanner(vault).scan()
+            self.assertEqual(sorted(rel_path for _input_path, _root, rel_path in scanner.notes), ["a.md", "notes/keep.md", "notes/sub/d.md"])
+            self.assertNotIn("b.md", scanner.file_index)
+
+if __name__ == "__main__":
+    unittest.main()
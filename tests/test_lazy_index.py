@@ -0,0 +1,115 @@
+# First-party
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+import util
+from main import iter_convert
+from util import LazyFileIndex, build_file_index
+
+# Directories of the test vault besides its root
+FOLDERS = 33
+
+class LazyFileIndexTest(unittest.TestCase):
+    """Single-file link resolution lists only the directories it needs and picks the file a full index would."""
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(work_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.vault = os.path.join(work_dir.name, "vault")
+        os.makedirs(self.vault)
+        for i in range(FOLDERS):
+            folder = os.path.join(self.vault, f"folder_{i % 3}", f"sub_{i}")
+            os.makedirs(folder)
+            self._write(os.path.join(folder, f"other_{i}.md"), "Other.\n")
+        self._write(os.path.join(self.vault, "target.md"), "Target.\n")
+        self._write(os.path.join(self.vault, "image.png"), "")
+        self.note = os.path.join(self.vault, "note.md")
+        self._write(self.note, "Links [[target]] and ![[image.png]].\n")
+        self._age_directories()
+
+    def _write(
+            self,
+            path    :str,
+            text    :str,
+    ) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _age_directories(self) -> None:
+        """Moves the directory mtimes out of `FILE_INDEX_RACY_WINDOW`, so their cached listings are trusted."""
+        past = time.time() - 60
+        for dir_path, _dirs, _files in os.walk(self.vault):
+            os.utime(dir_path, (past, past))
+
+    def _warm_cache(self) -> None:
+        index = LazyFileIndex(self.vault)
+        index.get("anything")
+        index.save()
+
+    def _counting(self, listed :list):
+        """Patches the directory listing to append every directory listed (from the cache or not) to `listed`."""
+        listdir = util.DirectoryCache.listdir
+        def counting_listdir(cache, rel_dir):
+            listed.append(rel_dir)
+            return listdir(cache, rel_dir)
+        return mock.patch.object(util.DirectoryCache, "listdir", counting_listdir)
+
+    def _resolve(self, link_text :str) -> tuple:
+        """(resolved path, number of directories listed) of `link_text` resolved from the vault root."""
+        listed = []
+        with self._counting(listed):
+            index = LazyFileIndex(self.vault)
+            resolved = index.resolve(link_text, self.vault)
+            index.save()
+        return resolved, len(listed)
+
+    def test_extensionless_link_stops_with_warm_cache(self):
+        self._warm_cache()
+        self.assertEqual(self._resolve("target"), ("target.md", 1))
+
+    def test_extensionless_link_without_cache_matches_full_index(self):
+        resolved, listed = self._resolve("target")
+        self.assertEqual(resolved, build_file_index(self.vault).resolve("target", self.vault))
+        # Nothing rules out a file named exactly "target" further down
+        self.assertEqual(listed, FOLDERS + 3 + 1)
+
+    def test_link_with_extension_stops_at_first_match(self):
+        self.assertEqual(self._resolve("image.png"), ("image.png", 1))
+
+    def test_bare_name_still_wins(self):
+        deep = os.path.join(self.vault, "folder_2", "sub_32")
+        self._write(os.path.join(deep, "target"), "")
+        self._age_directories()
+        self._warm_cache()
+        resolved, _listed = self._resolve("target")
+        self.assertEqual(resolved, "folder_2/sub_32/target")
+        self.assertEqual(resolved, build_file_index(self.vault).resolve("target", self.vault))
+
+    def test_changed_directory_is_listed_again(self):
+        self._warm_cache()
+        self._write(os.path.join(self.vault, "folder_1", "sub_4", "target"), "")
+        resolved, _listed = self._resolve("target")
+        # The cache can't vouch for the changed directory, so the walk goes on until it finds the bare name there
+        self.assertEqual(resolved, "folder_1/sub_4/target")
+        self.assertEqual(resolved, build_file_index(self.vault).resolve("target", self.vault))
+
+    def test_iter_convert_single_file_lists_only_its_directory(self):
+        self._warm_cache()
+        listed = []
+        with self._counting(listed), contextlib.redirect_stdout(io.StringIO()):
+            results = list(iter_convert(self.note))
+        self.assertIn('href="target.md.html"', results[0].html)
+        self.assertEqual(listed, [""])
+
+if __name__ == "__main__":
+    unittest.main()
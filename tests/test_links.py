@@ -0,0 +1,41 @@
+# First-party
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from main import iter_convert
+
+class NoteLinksTest(unittest.TestCase):
+    """`NoteResult.links` holds one entry per link or embed resolved, whether or not the embed is transcluded."""
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(work_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.vault = os.path.join(work_dir.name, "vault")
+        os.makedirs(self.vault)
+        notes = {
+            "Alpha.md": "Alpha embeds ![[Beta]] and ![[Gamma#^block]], and links [[Gamma]].\n",
+            "Beta.md": "Beta.\n",
+            "Gamma.md": "Gamma. ^block\n",
+        }
+        for name, text in notes.items():
+            with open(os.path.join(self.vault, name), "w", encoding="utf-8") as f:
+                f.write(text)
+
+    def test_embeds_are_recorded_once(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = {os.path.basename(result.source): result for result in iter_convert(self.vault)}
+        links = sorted(os.path.basename(link) for link in results["Alpha.md"].links)
+        self.assertEqual(links, ["Beta.md", "Gamma.md", "Gamma.md"])
+        self.assertIn("data-embed-src=\"Beta.md\"", results["Alpha.md"].html)
+
+if __name__ == "__main__":
+    unittest.main()
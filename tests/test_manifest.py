@@ -0,0 +1,126 @@
+# First-party
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from main import convert_directory
+from profiling import StageProfiler
+
+class EditingProfiler(StageProfiler):
+    """Edits a note right after it was read for conversion, as a user saving it mid-build would."""
+    def __init__(
+            self,
+            path    :str,
+            text    :str,
+    ):
+        super().__init__()
+        self.path = path
+        self.text = text
+
+    def on_stage(
+            self,
+            note        :str,
+            stage       :str,
+            seconds     :float,
+            size_in     :int,
+            size_out    :int,
+    ) -> None:
+        super().on_stage(note, stage, seconds, size_in, size_out)
+        if stage == "read" and os.path.abspath(note) == os.path.abspath(self.path) and self.text is not None:
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(self.text)
+            self.text = None
+
+class BuildManifestTest(unittest.TestCase):
+    """The manifest records a note as it was converted, not as it is once the conversion is done."""
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(work_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.vault = os.path.join(work_dir.name, "vault")
+        os.makedirs(self.vault)
+        self.note = os.path.join(self.vault, "Alpha.md")
+        with open(self.note, "w", encoding="utf-8") as f:
+            f.write("Before the edit.\n")
+
+    def _build(self, profiler :StageProfiler | None = None) -> str:
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            failures = convert_directory(self.vault, False, False, False, profiler=profiler)
+        self.assertEqual(failures, [])
+        return stdout.getvalue()
+
+    def test_edit_during_conversion_is_rebuilt(self):
+        self._build(EditingProfiler(self.note, "After the edit, which is longer.\n"))
+        self.assertIn("Converted", self._build())
+        with open(os.path.join(self.vault, "Alpha.md.html"), "r", encoding="utf-8") as f:
+            self.assertIn("After the edit", f.read())
+        self.assertNotIn("Converted", self._build())
+
+class IncrementalBuildTest(unittest.TestCase):
+    """Rebuilds only convert the notes whose source, link targets or build options changed."""
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(work_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.vault = os.path.join(work_dir.name, "vault")
+        os.makedirs(os.path.join(self.vault, "sub"))
+        self.template = os.path.join(work_dir.name, "template.html")
+        self._write(self.template, "<html><body>{content}</body></html>\n")
+        self._write(os.path.join(self.vault, "Alpha.md"), "Alpha links [[Beta]] and [[Missing]].\n")
+        self._write(os.path.join(self.vault, "Beta.md"), "Beta.\n")
+        self._write(os.path.join(self.vault, "sub", "Gamma.md"), "Gamma links [[Alpha]].\n")
+
+    def _write(
+            self,
+            path    :str,
+            text    :str,
+    ) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _build(self, incremental :bool = True) -> set:
+        """Builds the vault, returning the notes (relative to it) read for conversion."""
+        profiler = StageProfiler()
+        with contextlib.redirect_stdout(io.StringIO()):
+            failures = convert_directory(self.vault, False, False, False, self.template, incremental=incremental, profiler=profiler)
+        self.assertEqual(failures, [])
+        return {os.path.relpath(note, self.vault).replace("\\", "/") for note, records in profiler.notes.items() if any(record[0] == "read" for record in records)}
+
+    def test_noop_rebuild_skips_every_note(self):
+        self.assertEqual(self._build(), {"Alpha.md", "Beta.md", "sub/Gamma.md"})
+        self.assertEqual(self._build(), set())
+
+    def test_edited_note_alone_is_converted(self):
+        self._build()
+        self._write(os.path.join(self.vault, "Beta.md"), "Beta, edited.\n")
+        self.assertEqual(self._build(), {"Beta.md"})
+
+    def test_new_link_target_converts_the_notes_linking_to_it(self):
+        self._build()
+        self._write(os.path.join(self.vault, "sub", "Missing.md"), "Now here.\n")
+        self.assertEqual(self._build(), {"Alpha.md", "sub/Missing.md"})
+        with open(os.path.join(self.vault, "Alpha.md.html"), "r", encoding="utf-8") as f:
+            self.assertIn('href="sub/Missing.md.html"', f.read())
+
+    def test_changed_template_converts_every_note(self):
+        self._build()
+        self._write(self.template, "<html><body><main>{content}</main></body></html>\n")
+        self.assertEqual(self._build(), {"Alpha.md", "Beta.md", "sub/Gamma.md"})
+        self.assertEqual(self._build(), set())
+
+    def test_full_build_converts_every_note(self):
+        self._build()
+        self.assertEqual(self._build(incremental=False), {"Alpha.md", "Beta.md", "sub/Gamma.md"})
+
+if __name__ == "__main__":
+    unittest.main()
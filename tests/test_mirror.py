@@ -0,0 +1,113 @@
+# First-party
+import errno
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+import mirror
+from manifest import BuildManifest
+from mirror import AssetMirror
+from writer import OutputWriter
+
+class AssetMirrorTest(unittest.TestCase):
+    """Assets are mirrored once, removed with the directories they leave empty, and hardlinked, else reflinked, else copied."""
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        self.vault = os.path.join(work_dir.name, "vault")
+        self.out_dir = os.path.join(work_dir.name, "site")
+        os.makedirs(os.path.join(self.vault, "img", "deep"))
+        self._write(os.path.join(self.vault, "top.png"), "top")
+        self._write(os.path.join(self.vault, "img", "deep", "nested.png"), "nested")
+        self.manifest = BuildManifest(os.path.join(self.vault, "manifest.json"))
+        self._reference("top.png", "img/deep/nested.png")
+        self.mirror = AssetMirror(self.vault, self.out_dir, threads=2)
+
+    def _write(
+            self,
+            path    :str,
+            text    :str,
+    ) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _read(self, path :str) -> str:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _reference(self, *assets :str) -> None:
+        """Makes the only note of the manifest reference `assets`."""
+        self.manifest.notes = {"Note.md": {"output": "Note.md.html", "assets": list(assets)}}
+
+    def _out(self, rel_path :str) -> str:
+        return os.path.join(self.out_dir, *rel_path.split("/"))
+
+    def test_unchanged_asset_is_not_mirrored_again(self):
+        self.assertEqual(self.mirror.update(self.manifest), 2)
+        self.assertEqual(self._read(self._out("img/deep/nested.png")), "nested")
+        self.assertEqual(self.mirror.update(self.manifest), 0)
+        # A changed source is mirrored again, alone
+        self._write(os.path.join(self.vault, "top.png"), "top, edited")
+        self.assertEqual(self.mirror.update(self.manifest), 1)
+        self.assertEqual(self._read(self._out("top.png")), "top, edited")
+
+    def test_unreferenced_asset_is_removed_with_empty_directories(self):
+        self.mirror.update(self.manifest)
+        self._reference("top.png")
+        self.assertEqual(self.mirror.update(self.manifest), 0)
+        self.assertFalse(os.path.exists(self._out("img")))
+        self.assertTrue(os.path.isfile(self._out("top.png")))
+        self.assertEqual(set(self.manifest.mirrored), {"top.png"})
+
+    def test_hardlink_is_preferred(self):
+        self.mirror.update(self.manifest)
+        self.assertEqual(self.mirror.counts["linked"], 2)
+        self.assertTrue(os.path.samefile(self._out("top.png"), os.path.join(self.vault, "top.png")))
+
+    @unittest.skipIf(mirror.fcntl is None, "reflinks need fcntl")
+    def test_reflink_when_hardlinks_are_unsupported(self):
+        def fake_clone(dst_fd, _request, src_fd):
+            os.write(dst_fd, os.read(src_fd, 1 << 16))
+        with mock.patch.object(mirror.os, "link", side_effect=OSError(errno.EXDEV, "Cross-device link")), \
+             mock.patch.object(mirror.fcntl, "ioctl", side_effect=fake_clone):
+            self.mirror.update(self.manifest)
+        self.assertEqual(self.mirror.counts, {"linked": 0, "reflinked": 2, "copied": 0})
+        self.assertEqual(self._read(self._out("img/deep/nested.png")), "nested")
+
+    def test_copy_when_links_are_unsupported(self):
+        unsupported = OSError(errno.EOPNOTSUPP, "Operation not supported")
+        with mock.patch.object(mirror.os, "link", side_effect=unsupported) as link, \
+             mock.patch.object(mirror, "fcntl", mock.Mock(ioctl=mock.Mock(side_effect=unsupported))) as fcntl:
+            self.mirror.threads = 1
+            self.mirror.update(self.manifest)
+        self.assertEqual(self.mirror.counts, {"linked": 0, "reflinked": 0, "copied": 2})
+        # Neither is tried again once the filesystem turned it down
+        self.assertEqual((link.call_count, fcntl.ioctl.call_count), (1, 1))
+        self.assertFalse(os.path.samefile(self._out("top.png"), os.path.join(self.vault, "top.png")))
+        self.assertEqual(self._read(self._out("top.png")), "top")
+
+class OutOfTreeWriterTest(unittest.TestCase):
+    """Writing out of tree replaces a file hardlinked from the vault instead of writing through it."""
+    def test_hardlinked_target_is_replaced(self):
+        with tempfile.TemporaryDirectory() as work_dir:
+            vault, out_dir = os.path.join(work_dir, "vault"), os.path.join(work_dir, "site")
+            os.makedirs(vault)
+            os.makedirs(out_dir)
+            source = os.path.join(vault, "page.html")
+            with open(source, "w", encoding="utf-8") as f:
+                f.write("vault file")
+            os.link(source, os.path.join(out_dir, "page.html"))
+            writer = OutputWriter(threads=0, site_root=vault, out_dir=out_dir)
+            self.assertTrue(writer.write(source, "built page"))
+            writer.close()
+            with open(os.path.join(out_dir, "page.html"), "r", encoding="utf-8") as f:
+                self.assertEqual(f.read(), "built page")
+            with open(source, "r", encoding="utf-8") as f:
+                self.assertEqual(f.read(), "vault file")
+
+if __name__ == "__main__":
+    unittest.main()
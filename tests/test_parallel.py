@@ -0,0 +1,59 @@
+# First-party
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from benchmarks.vault_generator import VaultSpec, generate_vault
+from constants import BUILD_MANIFEST_FILE
+from main import convert_directory
+
+class ParallelBuildTest(unittest.TestCase):
+    """`--jobs N` writes the same files, byte for byte, as a serial build."""
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(self.work_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.template = os.path.join(self.work_dir.name, "template.html")
+        with open(self.template, "w", encoding="utf-8") as f:
+            f.write("<html><head><title>{title}</title></head><body>{content}\n<footer>{backlinks}</footer></body></html>\n")
+
+    def _build(self, jobs :int) -> dict:
+        """Builds a copy of the same generated vault with `jobs` workers, returning {path: bytes} of every file the build wrote."""
+        vault = os.path.join(self.work_dir.name, f"vault_{jobs}")
+        generate_vault(vault, VaultSpec(notes=30, seed=3))
+        sources = self._files(vault)
+        with contextlib.redirect_stdout(io.StringIO()):
+            failures = convert_directory(vault, True, True, False, self.template, jobs=jobs, use_search=True)
+        self.assertEqual(failures, [])
+        built = self._files(vault)
+        self.assertIn(BUILD_MANIFEST_FILE, built)
+        return {rel_path: data for rel_path, data in built.items() if rel_path not in sources and rel_path != BUILD_MANIFEST_FILE}
+
+    def _files(self, root :str) -> dict:
+        files = {}
+        for dir_path, _dirs, names in os.walk(root):
+            for name in names:
+                path = os.path.join(dir_path, name)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, root).replace("\\", "/")] = f.read()
+        return files
+
+    def test_parallel_build_matches_serial(self):
+        serial = self._build(jobs=1)
+        parallel = self._build(jobs=3)
+        self.assertTrue(any(rel_path.startswith("tags/") for rel_path in serial))
+        self.assertTrue(any(rel_path.startswith("search/") for rel_path in serial))
+        self.assertEqual(sorted(parallel), sorted(serial))
+        for rel_path, data in serial.items():
+            self.assertEqual(parallel[rel_path], data, rel_path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+# First-party
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from benchmarks.vault_generator import VaultSpec, generate_vault
+from pipeline import ConverterEngine
+from util import build_file_index
+
+# Notes whose state would leak into the next conversion if the engine weren't reset: footnotes, the heading ids toc assigned,
+# math, tags, embeds and their warnings
+NOTES = {
+    "Footnotes.md": "# Same\n\nA claim[^1].\n\n# Same\n\n[^1]: The source.\n",
+    "Headings.md": "# Same\n\n## Same\n\n[TOC]\n\nMath $x^2$ and #tagged.\n",
+    "Embeds.md": "![[Footnotes]]\n\n![[Headings#Missing]]\n\n![[Embeds]]\n",
+    "Plain.md": "# Same\n\nNo math, no tags.\n",
+}
+
+class EngineReuseTest(unittest.TestCase):
+    """A reused engine converts every note as a fresh engine would."""
+    def _assert_reuse_matches_fresh(
+            self,
+            vault   :str,
+            **options,
+    ) -> None:
+        file_index = build_file_index(vault)
+        notes = sorted(os.path.join(dir_path, name) for dir_path, _dirs, names in os.walk(vault) for name in names if name.endswith(".md"))
+        reused = ConverterEngine(**options)
+        # Twice over, so every note also follows every other one
+        for note in notes + notes:
+            with open(note, "r", encoding="utf-8") as f:
+                text = f.read()
+            root = os.path.dirname(note)
+            fresh = ConverterEngine(**options)
+            with self.subTest(note=os.path.relpath(note, vault)):
+                self.assertEqual(reused.convert(text, file_index, root, note=note), fresh.convert(text, file_index, root, note=note))
+                self.assertEqual(reused.tags, fresh.tags)
+                self.assertEqual(reused.embeds, fresh.embeds)
+                self.assertEqual(reused.warnings, fresh.warnings)
+                self.assertEqual(reused.terms, fresh.terms)
+
+    def test_handwritten_notes(self):
+        with tempfile.TemporaryDirectory() as vault:
+            for name, text in NOTES.items():
+                with open(os.path.join(vault, name), "w", encoding="utf-8") as f:
+                    f.write(text)
+            for single_pass in (True, False):
+                with self.subTest(single_pass=single_pass):
+                    self._assert_reuse_matches_fresh(vault, tags_use_links=True, embed_mathjax_scripting=True, single_pass=single_pass, site_root=vault, index_terms=True)
+
+    def test_generated_vault(self):
+        with tempfile.TemporaryDirectory() as vault:
+            generate_vault(vault, VaultSpec(notes=25, seed=11))
+            self._assert_reuse_matches_fresh(vault, tags_use_links=True, embed_mathjax_scripting=True, site_root=vault)
+
+if __name__ == "__main__":
+    unittest.main()
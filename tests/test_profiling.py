@@ -0,0 +1,74 @@
+# First-party
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from main import convert_directory
+from profiling import StageProfiler, print_summary
+
+class StageProfilerReportTest(unittest.TestCase):
+    """The profiler report sums each stage over every note and ranks the slowest notes."""
+    def _profiler(self) -> StageProfiler:
+        profiler = StageProfiler()
+        profiler.on_stage("a.md", "read", 0.5, 10, 10)
+        profiler.on_stage("a.md", "replace_math", 0.25, 10, 12)
+        profiler.on_stage("a.md", "replace_math", 0.25, 12, 14)
+        profiler.on_stage("b.md", "read", 2.0, 100, 100)
+        profiler.add_note("c.md", [["read", 0.125, 1, 1], ["markdown", 1.0, 1, 3]])
+        return profiler
+
+    def test_report_totals(self):
+        report = self._profiler().report(slowest=2)
+        self.assertEqual(report["notes"], 3)
+        self.assertEqual(report["total_seconds"], 4.125)
+        self.assertEqual(report["stages"]["replace_math"], {"seconds": 0.5, "calls": 2, "size_in": 22, "size_out": 26})
+        self.assertEqual(report["stages"]["read"], {"seconds": 2.625, "calls": 3, "size_in": 111, "size_out": 111})
+        # Slowest stage first
+        self.assertEqual(list(report["stages"]), ["read", "markdown", "replace_math"])
+        self.assertEqual([entry["note"] for entry in report["slowest_notes"]], ["b.md", "c.md"])
+        self.assertEqual(report["slowest_notes"][1]["seconds"], 1.125)
+        self.assertEqual(report["slowest_notes"][1]["stages"]["markdown"]["calls"], 1)
+
+    def test_pop_note(self):
+        profiler = self._profiler()
+        self.assertEqual(len(profiler.pop_note("a.md")), 3)
+        self.assertEqual(profiler.pop_note("a.md"), [])
+        self.assertEqual(profiler.report()["notes"], 2)
+
+    def test_write_and_summary(self):
+        with tempfile.TemporaryDirectory() as work_dir:
+            path = os.path.join(work_dir, "reports", "profile.json")
+            report = self._profiler().write(path)
+            with open(path, "r", encoding="utf-8") as f:
+                self.assertEqual(json.load(f), report)
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            print_summary(report)
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(lines[0], "Profiled 3 notes in 4.125s:")
+        self.assertEqual(lines[1].split(), ["read", "2.625s", "63.6%"])
+
+    def test_build_reports_every_stage(self):
+        with tempfile.TemporaryDirectory() as work_dir, mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(work_dir, "cache")}):
+            vault = os.path.join(work_dir, "vault")
+            os.makedirs(vault)
+            for name in ("Alpha.md", "Beta.md"):
+                with open(os.path.join(vault, name), "w", encoding="utf-8") as f:
+                    f.write(f"{name} links [[Alpha]] with $x$.\n")
+            profiler = StageProfiler()
+            with contextlib.redirect_stdout(io.StringIO()):
+                convert_directory(vault, False, False, False, incremental=False, profiler=profiler)
+        report = profiler.report()
+        self.assertEqual(report["notes"], 2)
+        for stage in ("read", "scan", "markdown", "write"):
+            self.assertEqual(report["stages"][stage]["calls"], 2, stage)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+# First-party
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from constants import BUILD_MANIFEST_FILE, SEARCH_DIR, SEARCH_INDEX_FILE
+from main import convert_directory
+from manifest import BuildManifest
+
+class SearchIndexBuildTest(unittest.TestCase):
+    """After edits, incremental builds leave a search index which finds what the index of a full rebuild finds."""
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(work_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.vault = os.path.join(work_dir.name, "vault")
+        os.makedirs(os.path.join(self.vault, "sub"))
+        self._write("Alpha.md", "# Alpha\n\nAstronomy and zebras.\n")
+        self._write("Beta.md", "Botany and astronomy #plants\n")
+        self._write("sub/Gamma.md", "Geology, quartz and quasars.\n")
+
+    def _write(
+            self,
+            rel_path    :str,
+            text        :str,
+    ) -> None:
+        with open(os.path.join(self.vault, rel_path), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _build(self, incremental :bool = True) -> dict:
+        """
+        Builds the vault with a search index, returning what the index finds: {term: {(page, weight), ...}}.
+        \nAlso checks that every shard the index names exists, and that no other shard is left.
+        """
+        with contextlib.redirect_stdout(io.StringIO()):
+            failures = convert_directory(self.vault, False, False, False, incremental=incremental, use_search=True)
+        self.assertEqual(failures, [])
+        search_dir = os.path.join(self.vault, SEARCH_DIR)
+        with open(os.path.join(search_dir, SEARCH_INDEX_FILE), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        self.assertEqual(set(os.listdir(search_dir)), set(index["shards"].values()) | {SEARCH_INDEX_FILE})
+        found = {}
+        for shard_file in index["shards"].values():
+            with open(os.path.join(search_dir, shard_file), "r", encoding="utf-8") as f:
+                for term, postings in json.load(f).items():
+                    found[term] = {(index["docs"][doc_id][1], weight) for doc_id, weight in postings}
+        manifest = BuildManifest.load(os.path.join(self.vault, BUILD_MANIFEST_FILE))
+        self.assertEqual(len([doc for doc in index["docs"] if doc is not None]), len(manifest.notes))
+        return found
+
+    def _pages(
+            self,
+            found   :dict,
+            term    :str,
+    ) -> set:
+        return {page for page, _weight in found.get(term, ())}
+
+    def test_edits_keep_search_index_in_step(self):
+        found = self._build()
+        self.assertEqual(self._pages(found, "astronomy"), {"Alpha.md.html", "Beta.md.html"})
+        self._write("Beta.md", "Botany only now #plants\n")
+        os.remove(os.path.join(self.vault, "Alpha.md"))
+        self._write("sub/Delta.md", "Zebras and quasars.\n")
+        found = self._build()
+        self.assertEqual(self._pages(found, "astronomy"), set())
+        self.assertEqual(self._pages(found, "zebras"), {"sub/Delta.md.html"})
+        self.assertEqual(self._pages(found, "quasars"), {"sub/Gamma.md.html", "sub/Delta.md.html"})
+        self.assertEqual(self._pages(found, "botany"), {"Beta.md.html"})
+        self.assertEqual(found, self._build(incremental=False))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+# First-party
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+import serve
+from constants import CONVERT_IGNORE_LIST_FILE
+from serve import PreviewServer
+
+class PreviewServerTest(unittest.TestCase):
+    """Cached pages are served until their note, a note they embed, the template or the vault's files change."""
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(work_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Scan the vault again on every request
+        patcher = mock.patch.object(serve, "SERVE_RESCAN_INTERVAL", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.vault = os.path.join(work_dir.name, "vault")
+        os.makedirs(os.path.join(self.vault, "sub"))
+        self.template = os.path.join(work_dir.name, "template.html")
+        self._write(self.template, "<html><body>{content}</body></html>\n")
+        self._write(os.path.join(self.vault, "Alpha.md"), "Alpha embeds Beta.\n\n![[Beta]]\n\nAnd links [[Missing]].\n")
+        self._write(os.path.join(self.vault, "sub", "Beta.md"), "Beta, first version.\n")
+        self.preview = PreviewServer(self.vault, False, False, False, self.template)
+        self.alpha = os.path.join(self.vault, "Alpha.md")
+
+    def _write(
+            self,
+            path    :str,
+            text    :str,
+    ) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _render(self, source :str) -> tuple:
+        """(page html, whether it came from the cache)."""
+        hits = self.preview.hits
+        page_html = self.preview.render(source)
+        return page_html, self.preview.hits > hits
+
+    def test_unchanged_page_is_cached(self):
+        page_html, cached = self._render(self.alpha)
+        self.assertFalse(cached)
+        self.assertIn("Beta, first version.", page_html)
+        self.assertEqual(self._render(self.alpha), (page_html, True))
+
+    def test_changed_embed_drops_the_page(self):
+        self._render(self.alpha)
+        self._write(os.path.join(self.vault, "sub", "Beta.md"), "Beta, second and longer version.\n")
+        page_html, cached = self._render(self.alpha)
+        self.assertFalse(cached)
+        self.assertIn("Beta, second and longer version.", page_html)
+        self.assertTrue(self._render(self.alpha)[1])
+
+    def test_changed_note_drops_the_page(self):
+        self._render(self.alpha)
+        self._write(self.alpha, "Alpha, rewritten without embeds.\n")
+        page_html, cached = self._render(self.alpha)
+        self.assertFalse(cached)
+        self.assertIn("rewritten", page_html)
+
+    def test_changed_template_drops_the_page(self):
+        self._render(self.alpha)
+        self._write(self.template, "<html><body><main>{content}</main></body></html>\n")
+        page_html, cached = self._render(self.alpha)
+        self.assertFalse(cached)
+        self.assertIn("<main>", page_html)
+
+    def test_added_file_drops_the_page(self):
+        page_html, _cached = self._render(self.alpha)
+        self.assertNotIn('href="sub/Missing.md.html"', page_html)
+        self._write(os.path.join(self.vault, "sub", "Missing.md"), "Now here.\n")
+        page_html, cached = self._render(self.alpha)
+        self.assertFalse(cached)
+        self.assertIn('href="sub/Missing.md.html"', page_html)
+
+    def test_source_note_and_ignored_notes(self):
+        self.assertEqual(self.preview.source_note(os.path.join(self.vault, "Alpha.md.html")), self.alpha)
+        self.assertIsNone(self.preview.source_note(os.path.join(self.vault, "Nothing.md.html")))
+        self.assertIsNone(self.preview.source_note(os.path.join(self.vault, "sub", "Beta.md")))
+        self._write(os.path.join(self.vault, CONVERT_IGNORE_LIST_FILE), "sub/\n")
+        self.assertIsNone(self.preview.render(os.path.join(self.vault, "sub", "Beta.md")))
+
+if __name__ == "__main__":
+    unittest.main()
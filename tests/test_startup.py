@@ -0,0 +1,40 @@
+# First-party
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from benchmarks.bench_startup import LAZY_MODULES, REPO_DIR
+
+class LazyImportTest(unittest.TestCase):
+    """`import main` and the commands which convert nothing leave the conversion modules unimported."""
+    def _imported(self, code :str) -> list:
+        """The `LAZY_MODULES` imported after running `code` in a fresh interpreter, in the repository directory."""
+        probe = f"{code}\nimport json, sys\nprint(json.dumps([name for name in {LAZY_MODULES!r} if name in sys.modules]))"
+        with tempfile.TemporaryDirectory() as cache_dir:
+            result = subprocess.run(
+                [sys.executable, "-c", probe],
+                cwd=REPO_DIR, env={**os.environ, "XDG_CACHE_HOME": cache_dir}, capture_output=True, text=True, check=True,
+            )
+        return json.loads(result.stdout.splitlines()[-1])
+
+    def test_import_main_is_lazy(self):
+        self.assertEqual(self._imported("import main"), [])
+
+    def test_help_is_lazy(self):
+        self.assertEqual(self._imported("import main\nmain.print_help()"), [])
+
+    def test_clean_dry_run_is_lazy(self):
+        with tempfile.TemporaryDirectory() as vault:
+            code = f"import contextlib, io, sys, main\nsys.argv = ['main.py', {vault!r}, '--clean', '--dry-run']\nwith contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(SystemExit):\n    main.main()"
+            self.assertEqual(self._imported(code), [])
+
+    def test_probe_sees_conversion_imports(self):
+        self.assertIn("markdown", self._imported("import main\nmain._build_engine((False, False, '.', False, None, False))"))
+
+if __name__ == "__main__":
+    unittest.main()
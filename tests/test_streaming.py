@@ -0,0 +1,102 @@
+# First-party
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from manifest import hash_file
+from pipeline import ConverterEngine
+from streaming import NoteChunker
+from util import build_file_index
+
+# Small enough for nearly every blank line outside an open block to end a chunk
+CHUNK_SIZE = 10
+
+PARAGRAPHS = "".join(f"Paragraph {i} with ==marks== and a [[Other]] link.\nIts second line.\n\n" for i in range(6))
+
+class NoteChunkerTest(unittest.TestCase):
+    """Notes split into small chunks convert to the HTML of the whole note, and never split inside a block spanning blank lines."""
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        self.vault = work_dir.name
+        self._write("Other.md", "# Other\n")
+
+    def _write(
+            self,
+            rel_path    :str,
+            text        :str,
+    ) -> str:
+        path = os.path.join(self.vault, rel_path)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def _assert_chunked_like_whole(self, text :str) -> list:
+        """Checks that `text` converts the same chunk by chunk as whole, with both the scanner and the stages, and returns its chunks."""
+        path = self._write("Note.md", text)
+        chunks = list(NoteChunker(path, chunk_size=CHUNK_SIZE))
+        self.assertEqual("".join(chunks), text)
+        file_index = build_file_index(self.vault)
+        for single_pass in (True, False):
+            with self.subTest(single_pass=single_pass):
+                whole = ConverterEngine(single_pass=single_pass).convert(text, file_index, self.vault, note=path)
+                engine = ConverterEngine(single_pass=single_pass)
+                chunked = "".join(engine.convert_stream(NoteChunker(path, chunk_size=CHUNK_SIZE), file_index, self.vault, note=path))
+                self.assertEqual(chunked, whole)
+        return chunks
+
+    def test_paragraphs_split_between_blocks(self):
+        chunks = self._assert_chunked_like_whole(f"# Title\n\n{PARAGRAPHS}## Same\n\n## Same\n\nEnd.\n")
+        # One chunk per paragraph, the short heading blocks going with the paragraph after them
+        self.assertEqual(len(chunks), 8)
+
+    def test_fence_with_blank_lines_is_kept_whole(self):
+        chunks = self._assert_chunked_like_whole(f"{PARAGRAPHS}```python\nx = 1\n\n\ny = 2\n\n```\n\n{PARAGRAPHS}~~~\n```\n\nstill code\n~~~\n\nAfter.\n")
+        self.assertTrue(any("```python\nx = 1\n\n\ny = 2\n\n```" in chunk for chunk in chunks))
+        self.assertTrue(any("~~~\n```\n\nstill code\n~~~" in chunk for chunk in chunks))
+
+    def test_math_and_comment_spans_are_kept_whole(self):
+        text = f"{PARAGRAPHS}$$\na = b\n\nc = d\n$$\n\n{PARAGRAPHS}%%\nHidden\n\nstill hidden\n%%\n\nText with `$$` in code.\n\nAfter.\n"
+        chunks = self._assert_chunked_like_whole(text)
+        self.assertTrue(any("a = b\n\nc = d" in chunk for chunk in chunks))
+        self.assertTrue(any("Hidden\n\nstill hidden" in chunk for chunk in chunks))
+
+    def test_raw_html_is_kept_whole_to_its_depth(self):
+        text = f"{PARAGRAPHS}<div>\n<div>\n\nInner\n</div>\n\nOuter\n</div>\n\n<br>\n\n{PARAGRAPHS}"
+        chunks = self._assert_chunked_like_whole(text)
+        self.assertTrue(any("<div>\n<div>\n\nInner\n</div>\n\nOuter\n</div>" in chunk for chunk in chunks))
+
+    def test_list_and_quote_continuations_are_not_split(self):
+        text = (
+            f"{PARAGRAPHS}- first\n\n- second\n\n    continued\n\n1. one\n\n2. two\n\n"
+            f"> quoted\n\n> still quoted\n\n> [!note] Callout\n> Body\n\n{PARAGRAPHS}"
+        )
+        chunks = self._assert_chunked_like_whole(text)
+        self.assertTrue(any("- first\n\n- second\n\n    continued\n\n1. one\n\n2. two\n\n> quoted" in chunk for chunk in chunks))
+        for chunk in chunks:
+            self.assertFalse(chunk.startswith(("- second", "    ", "2.", "> still")), chunk)
+
+    def test_whole_note_constructs_give_one_chunk(self):
+        for tail in ("A footnote[^1].\n\n[^1]: The note.\n", "A [reference][ref].\n\n[ref]: https://example.com\n", "[TOC]\n"):
+            with self.subTest(tail=tail):
+                chunks = self._assert_chunked_like_whole(f"# Title\n\n{PARAGRAPHS}{tail}")
+                self.assertEqual(len(chunks), 1)
+
+    def test_whole_note_constructs_inside_code_still_split(self):
+        chunks = self._assert_chunked_like_whole(f"{PARAGRAPHS}```\n[TOC]\n[ref]: https://example.com\n```\n\n{PARAGRAPHS}")
+        self.assertGreater(len(chunks), 1)
+
+    def test_digest_is_file_hash(self):
+        for text in (f"{PARAGRAPHS}Ünïcode ✓\n", "[TOC]\n\nWhole.\n", ""):
+            with self.subTest(text=text[:10]):
+                path = self._write("Note.md", text)
+                chunker = NoteChunker(path, chunk_size=CHUNK_SIZE)
+                self.assertIsNone(chunker.digest)
+                list(chunker)
+                self.assertEqual(chunker.digest, hash_file(path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+# First-party
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from constants import TAG_PAGES_DIR
+from convert import replace_tags
+from main import convert_directory
+
+class ReplaceTagsTest(unittest.TestCase):
+    """`replace_tags` renders every tag and records its name for the tag index."""
+    def test_tags_are_recorded_and_rendered(self):
+        for use_links in (True, False):
+            found = []
+            text_html = replace_tags("Tagged #alpha and #beta/gamma.\n", use_links=use_links, found=found)
+            self.assertEqual(found, ["alpha", "beta/gamma"])
+            self.assertNotIn("#alpha ", text_html)
+            self.assertIn("alpha", text_html)
+            self.assertIn(">#beta/gamma<", text_html)
+
+    def test_tags_render_without_recording(self):
+        self.assertEqual(replace_tags("#alpha", use_links=True), replace_tags("#alpha", use_links=True, found=[]))
+
+class TagPagesBuildTest(unittest.TestCase):
+    """After edits, incremental builds leave the tag pages and tag index as a full rebuild writes them."""
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(work_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.vault = os.path.join(work_dir.name, "vault")
+        os.makedirs(os.path.join(self.vault, "sub"))
+        self.template = os.path.join(work_dir.name, "template.html")
+        self._write(self.template, "<html><body>{content}</body></html>\n")
+        self._write(os.path.join(self.vault, "Alpha.md"), "Alpha #shared #project/one\n")
+        self._write(os.path.join(self.vault, "Beta.md"), "Beta #shared #only-beta\n")
+        self._write(os.path.join(self.vault, "sub", "Gamma.md"), "Gamma #project/two/deep\n")
+
+    def _write(
+            self,
+            path    :str,
+            text    :str,
+    ) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _build(self, incremental :bool = True) -> dict:
+        """Builds the vault with tag links, returning {path: text} of every file under the tag pages folder."""
+        with contextlib.redirect_stdout(io.StringIO()):
+            failures = convert_directory(self.vault, True, False, False, self.template, incremental=incremental)
+        self.assertEqual(failures, [])
+        tags_dir = os.path.join(self.vault, TAG_PAGES_DIR)
+        pages = {}
+        for dir_path, _dirs, files in os.walk(tags_dir):
+            for name in files:
+                path = os.path.join(dir_path, name)
+                with open(path, "r", encoding="utf-8") as f:
+                    pages[os.path.relpath(path, tags_dir).replace("\\", "/")] = f.read()
+        return pages
+
+    def test_edits_keep_tag_pages_in_step(self):
+        pages = self._build()
+        self.assertIn("project/two/deep.html", pages)
+        self.assertIn("only-beta.html", pages)
+        self._write(os.path.join(self.vault, "Beta.md"), "Beta #shared #project/three\n")
+        os.remove(os.path.join(self.vault, "sub", "Gamma.md"))
+        self._write(os.path.join(self.vault, "sub", "Delta.md"), "Delta #shared\n")
+        pages = self._build()
+        self.assertNotIn("only-beta.html", pages)
+        self.assertNotIn("project/two/deep.html", pages)
+        self.assertFalse(os.path.exists(os.path.join(self.vault, TAG_PAGES_DIR, "project", "two")))
+        self.assertIn("Delta", pages["shared.html"])
+        self.assertIn("Beta", pages["project/three.html"])
+        self.assertEqual(pages, self._build(incremental=False))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+# First-party
+import html
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from main import CompiledTemplate
+
+def baseline_apply_template(
+        template    :str,
+        content     :str,
+        title       :str = "",
+        css_path    :str | None = None,
+        js_path     :str | None = None,
+) -> str:
+    """`apply_template` as it was before templates were compiled: placeholder replacements followed by `str.format`."""
+    if "{global_css}" in template:
+        if not css_path:
+            raise ValueError(f"Could not get css path \"{css_path}\"")
+        template = template.replace("{global_css}", f'<link rel="stylesheet" href="{css_path}">')
+    if "{global_js_module}" in template:
+        if not js_path:
+            raise ValueError(f"Could not get js path \"{js_path}\"")
+        template = template.replace("{global_js_module}", f'<script type="module" src="{js_path}"></script>')
+    elif "{global_js}" in template:
+        if not js_path:
+            raise ValueError(f"Could not get js path \"{js_path}\"")
+        template = template.replace("{global_js}", f'<script src="{js_path}"></script>')
+    return template.format(title=html.escape(title), content=content)
+
+TEMPLATES = [
+    "<html><head><title>{title}</title></head><body>{content}</body></html>\n",
+    "{content}",
+    "<style>body {{ margin: 0 }}</style>{{title}} {title} {{{content}}}",
+    "<head>{global_css}{global_js}</head><h1>{title!r}</h1><p>{title:>30}</p><i>{content[0]}</i>{content}",
+    "<head>{global_css}{global_js_module}</head>{content}{global_js_module}",
+    "No placeholders at all",
+]
+
+class CompiledTemplateTest(unittest.TestCase):
+    """A compiled template renders what `str.format` on the template did, and rejects the templates it rejected."""
+    def test_render_matches_format(self):
+        for template in TEMPLATES:
+            for title, content in (("Plain", "<p>Body</p>"), ('<Quotes & "amps">', "<p>{braces} stay {0}</p>"), ("", "x")):
+                with self.subTest(template=template, title=title):
+                    expected = baseline_apply_template(template, content, title, css_path="../global.css", js_path="../global.js")
+                    self.assertEqual(CompiledTemplate(template).render(content, title=title, css_path="../global.css", js_path="../global.js"), expected)
+
+    def test_unknown_placeholder_is_rejected(self):
+        for template in ("{content}{unknown}", "{content}{global_js}{global_js_module}", "{0}{content}"):
+            with self.subTest(template=template):
+                with self.assertRaises((KeyError, IndexError)):
+                    baseline_apply_template(template, "", css_path="a", js_path="b")
+                with self.assertRaises(KeyError):
+                    CompiledTemplate(template)
+
+    def test_missing_asset_path_is_rejected(self):
+        for template in ("{global_css}{content}", "{global_js}{content}", "{global_js_module}{content}"):
+            with self.subTest(template=template):
+                with self.assertRaises(ValueError):
+                    baseline_apply_template(template, "")
+                with self.assertRaises(ValueError):
+                    CompiledTemplate(template).render("")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+# First-party
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from main import convert_directory, iter_convert
+
+class TranscludeWarningsTest(unittest.TestCase):
+    """Messages about embeds left as links are printed by builds and kept on `NoteResult.warnings` by `iter_convert`, which prints nothing."""
+    def setUp(self):
+        self.work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.work_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(self.work_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.vault = os.path.join(self.work_dir.name, "vault")
+        os.makedirs(self.vault)
+        self._write("Alpha.md", "Alpha embeds Beta.\n\n![[Beta]]\n")
+        self._write("Beta.md", "Beta embeds Alpha back.\n\n![[Alpha]]\n\n![[Gamma#Missing]]\n")
+        self._write("Gamma.md", "# Present\n\nGamma.\n")
+
+    def _write(
+            self,
+            rel_path    :str,
+            text        :str,
+    ) -> None:
+        with open(os.path.join(self.vault, rel_path), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_iter_convert_prints_nothing(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            results = {os.path.basename(result.source): result for result in iter_convert(self.vault)}
+        self.assertEqual(stdout.getvalue(), "")
+        alpha_warnings = results["Alpha.md"].warnings
+        self.assertEqual(len(alpha_warnings), 2)
+        self.assertIn("is recursive", alpha_warnings[0])
+        self.assertIn('Heading "Missing" not found', alpha_warnings[1])
+        self.assertEqual(results["Gamma.md"].warnings, [])
+
+    def test_build_prints_warnings(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            failures = convert_directory(self.vault, False, False, False, incremental=False)
+        self.assertEqual(failures, [])
+        lines = stdout.getvalue().splitlines()
+        # Reported just before the note they belong to
+        converted = lines.index(next(line for line in lines if line.startswith("Converted") and "Alpha.md" in line))
+        self.assertIn("is recursive", lines[converted - 2])
+        self.assertIn('Heading "Missing" not found', lines[converted - 1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+# First-party
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from benchmarks.vault_generator import VaultSpec, generate_vault
+
+class VaultGeneratorTest(unittest.TestCase):
+    """The same spec and seed always generate the same vault."""
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        self.work_dir = work_dir.name
+
+    def _generate(
+            self,
+            name    :str,
+            spec    :VaultSpec,
+    ) -> tuple:
+        """Generates a vault, returning (the note paths returned, relative to it, and {path: bytes} of every file in it)."""
+        vault = os.path.join(self.work_dir, name)
+        notes = [os.path.relpath(path, vault) for path in generate_vault(vault, spec)]
+        files = {}
+        for dir_path, _dirs, names in os.walk(vault):
+            for file_name in names:
+                path = os.path.join(dir_path, file_name)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, vault)] = f.read()
+        return notes, files
+
+    def test_same_seed_gives_same_vault(self):
+        spec = VaultSpec(notes=40, seed=7)
+        first = self._generate("first", spec)
+        second = self._generate("second", VaultSpec(**spec.as_dict()))
+        self.assertEqual(first, second)
+
+    def test_other_seed_gives_other_vault(self):
+        _notes, first = self._generate("first", VaultSpec(notes=40, seed=7))
+        _notes, second = self._generate("second", VaultSpec(notes=40, seed=8))
+        self.assertNotEqual(first, second)
+
+    def test_vault_follows_spec(self):
+        spec = VaultSpec(notes=40, duplicate_ratio=0.25, folders=4, seed=1)
+        notes, files = self._generate("vault", spec)
+        self.assertEqual(len(notes), spec.notes)
+        self.assertEqual(len(set(notes)), spec.notes)
+        self.assertTrue(set(notes) <= set(files))
+        # Some names exist in more than one folder, to make ambiguous links
+        names = [os.path.basename(note) for note in notes]
+        self.assertLess(len(set(names)), len(names))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+# First-party
+import os
+import sys
+import tempfile
+import time
+import unittest
+from collections import defaultdict
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from constants import BUILT_HTML_EXTENSION, CONVERT_IGNORE_LIST_FILE
+from util import IgnoreMatcher, VaultScanner, parse_ignore_file
+
+FILES = [
+    "Root.md",
+    "Root.md.html",
+    "index.html",
+    "image.PNG",
+    "a/Note.md",
+    "a/Note.md.html",
+    "a/b/Deep.MD",
+    "a/b/c/Deeper.md",
+    "a/b/c/index.html",
+    "a/drafts/Draft.md",
+    "sibling/Note.md",
+    "sibling/image.png",
+    "private/Secret.md",
+    "private/keep/Kept.md",
+    "empty/.keep",
+]
+IGNORE = "private/\ndrafts\n*.tmp\n"
+
+def baseline_walk(base_dir :str) -> tuple:
+    """(file index, notes, outputs) collected with `os.walk`, the way directory builds did before `VaultScanner`."""
+    ignore = IgnoreMatcher(parse_ignore_file(os.path.join(base_dir, CONVERT_IGNORE_LIST_FILE)))
+    file_index, notes, outputs = defaultdict(list), [], []
+    for root, dirs, files in os.walk(base_dir):
+        rel_dir = os.path.relpath(root, base_dir).replace("\\", "/")
+        rel_dir = "" if rel_dir == "." else f"{rel_dir}/"
+        dirs[:] = [name for name in dirs if not ignore.match(rel_dir + name, is_dir=True)]
+        for name in files:
+            if ignore.match(rel_dir + name):
+                continue
+            file_index[name.lower()].append(os.path.join(os.path.abspath(root), name))
+            if name.lower().endswith(".md"):
+                notes.append((os.path.join(root, name), root, rel_dir + name))
+            elif name.endswith(BUILT_HTML_EXTENSION) or name.endswith("index.html"):
+                outputs.append(os.path.join(root, name))
+    return dict(file_index), notes, outputs
+
+class VaultScannerWalkTest(unittest.TestCase):
+    """`VaultScanner` finds the same files, in the same order, as walking the vault with `os.walk`, with or without the listing cache."""
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(work_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.vault = os.path.join(work_dir.name, "vault")
+        for rel_path in FILES:
+            self._write(rel_path)
+        self._write(CONVERT_IGNORE_LIST_FILE, IGNORE)
+
+    def _write(
+            self,
+            rel_path    :str,
+            text        :str = "",
+    ) -> None:
+        path = os.path.join(self.vault, *rel_path.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _age_directories(self) -> None:
+        """Moves the directory mtimes out of `FILE_INDEX_RACY_WINDOW`, so their cached listings are trusted."""
+        past = time.time() - 60
+        for dir_path, _dirs, _files in os.walk(self.vault):
+            os.utime(dir_path, (past, past))
+
+    def _assert_matches_walk(self, cache :bool) -> None:
+        scanner = VaultScanner(self.vault, cache=cache).scan()
+        file_index, notes, outputs = baseline_walk(self.vault)
+        self.assertEqual(dict(scanner.file_index), file_index)
+        # Same order too, which decides ties between ambiguous links
+        self.assertEqual(scanner.notes, notes)
+        self.assertEqual(scanner.outputs, outputs)
+
+    def test_scan_matches_walk(self):
+        self._assert_matches_walk(cache=False)
+        scanner = VaultScanner(self.vault).scan()
+        self.assertEqual(sorted(rel_path for _path, _root, rel_path in scanner.notes), ["Root.md", "a/Note.md", "a/b/Deep.MD", "a/b/c/Deeper.md", "sibling/Note.md"])
+        for name in ("secret.md", "kept.md", "draft.md"):
+            self.assertNotIn(name, scanner.file_index)
+
+    def test_cached_scan_matches_walk(self):
+        self._age_directories()
+        self._assert_matches_walk(cache=True)
+        # From the cache this time
+        self._assert_matches_walk(cache=True)
+
+    def test_cached_scan_sees_changes(self):
+        self._age_directories()
+        self._assert_matches_walk(cache=True)
+        self._write("a/b/New.md")
+        os.remove(os.path.join(self.vault, "sibling", "Note.md"))
+        self._write("new_dir/Other.md")
+        self._assert_matches_walk(cache=True)
+        self.assertIn("new.md", VaultScanner(self.vault, cache=True).scan().file_index)
+
+if __name__ == "__main__":
+    unittest.main()
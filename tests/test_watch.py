@@ -0,0 +1,87 @@
+# First-party
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+from main import convert_directory
+from watch import VaultWatcher
+
+TEMPLATE = "<html><body>{content}\n<footer>{backlinks}</footer></body></html>\n"
+
+class VaultWatcherTest(unittest.TestCase):
+    """Each poll reconverts only the changed notes and the notes whose links they affect."""
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": os.path.join(work_dir.name, "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.vault = os.path.join(work_dir.name, "vault")
+        os.makedirs(os.path.join(self.vault, "sub"))
+        self.template = os.path.join(work_dir.name, "template.html")
+        self._write(self.template, TEMPLATE)
+        self._write("Alpha.md", "Alpha links [[Missing]].\n")
+        self._write("Beta.md", "Beta.\n")
+        self._write("sub/Gamma.md", "Gamma links [[Beta]].\n")
+        with contextlib.redirect_stdout(io.StringIO()):
+            convert_directory(self.vault, False, False, False, self.template)
+        self.watcher = VaultWatcher(self.vault, False, False, False, self.template)
+
+    def _write(
+            self,
+            rel_path    :str,
+            text        :str,
+    ) -> None:
+        with open(os.path.join(self.vault, rel_path), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def _read(self, rel_path :str) -> str:
+        with open(os.path.join(self.vault, rel_path), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _poll(self) -> tuple:
+        """Polls once, returning (the count `poll` returned, the notes it printed as converted, relative to the vault)."""
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            count = self.watcher.poll()
+        converted = {
+            os.path.relpath(line.split(" -> ")[0][len("Converted "):], self.vault).replace("\\", "/")
+            for line in stdout.getvalue().splitlines() if line.startswith("Converted ")
+        }
+        return count, converted
+
+    def test_unchanged_vault_converts_nothing(self):
+        self.assertEqual(self._poll(), (0, set()))
+
+    def test_edited_note_alone_is_converted(self):
+        self._write("sub/Gamma.md", "Gamma, edited, links [[Beta]].\n")
+        self.assertEqual(self._poll(), (1, {"sub/Gamma.md"}))
+        self.assertIn("edited", self._read("sub/Gamma.md.html"))
+        # Our own outputs don't trigger another round
+        self.assertEqual(self._poll(), (0, set()))
+
+    def test_added_note_converts_the_notes_linking_to_it(self):
+        self._write("sub/Missing.md", "Now here.\n")
+        self.assertEqual(self._poll(), (2, {"Alpha.md", "sub/Missing.md"}))
+        self.assertIn('href="sub/Missing.md.html"', self._read("Alpha.md.html"))
+
+    def test_removed_note_converts_the_notes_linking_to_it(self):
+        os.remove(os.path.join(self.vault, "Beta.md"))
+        self.assertEqual(self._poll(), (1, {"sub/Gamma.md"}))
+        self.assertFalse(os.path.exists(os.path.join(self.vault, "Beta.md.html")))
+
+    def test_relinked_pages_are_not_counted_as_converted(self):
+        self._write("Alpha.md", "Alpha links [[Beta]] now.\n")
+        count, converted = self._poll()
+        self.assertEqual((count, converted), (1, {"Alpha.md"}))
+        # Beta's page only got its backlinks updated
+        self.assertIn('href="Alpha.md.html"', self._read("Beta.md.html"))
+
+if __name__ == "__main__":
+    unittest.main()
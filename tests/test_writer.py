@@ -0,0 +1,63 @@
+# First-party
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Local
+import writer
+from writer import OutputWriter
+
+class OutputWriterTest(unittest.TestCase):
+    """Background writes to the same file land in the order they were made."""
+    def setUp(self):
+        work_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(work_dir.cleanup)
+        self.path = os.path.join(work_dir.name, "page.html")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("first")
+        # Holds background writes back until released, as a slow disk would
+        self.release = threading.Event()
+        write_bytes = writer._write_bytes
+        def slow_write_bytes(*args, **kwargs):
+            self.release.wait(5)
+            write_bytes(*args, **kwargs)
+        patcher = mock.patch.object(writer, "_write_bytes", slow_write_bytes)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.writer = OutputWriter(threads=2)
+        self.addCleanup(self.writer.close)
+
+    def _read(self) -> str:
+        with open(self.path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def test_rewrite_of_queued_path_is_not_skipped(self):
+        self.assertTrue(self.writer.write(self.path, "second"))
+        threading.Timer(0.05, self.release.set).start()
+        # The file still holds "first" on disk, but the queued write replaces it
+        self.assertTrue(self.writer.write(self.path, "first"))
+        self.writer.flush()
+        self.assertEqual(self._read(), "first")
+        self.assertEqual((self.writer.written, self.writer.unchanged), (2, 0))
+
+    def test_repeated_write_of_queued_path_is_skipped(self):
+        self.assertTrue(self.writer.write(self.path, "second"))
+        threading.Timer(0.05, self.release.set).start()
+        self.assertFalse(self.writer.write(self.path, "second"))
+        self.writer.flush()
+        self.assertEqual(self._read(), "second")
+
+    def test_remove_waits_for_queued_write(self):
+        self.assertTrue(self.writer.write(self.path, "second"))
+        self.assertTrue(self.writer.exists(self.path))
+        threading.Timer(0.05, self.release.set).start()
+        self.assertTrue(self.writer.remove(self.path))
+        self.writer.flush()
+        self.assertFalse(os.path.exists(self.path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,236 @@
+# First-party
+from collections import OrderedDict
+import html
+import os
+import re
+# Local
+from constants import EMBED_MARKDOWN_CLASS, TRANSCLUDE_MAX_DEPTH, TRANSCLUDE_CACHE_SIZE
+from convert import _slugify_heading, mark_link_types
+from manifest import hash_bytes
+from util import RecordingIndex
+
+################
+# TRANSCLUSION #
+################
+
+# Stands in for an embed until the embedding note's own Markdown pass is done. It is raw HTML like the embed link it replaces, so Markdown lays the page out the same and leaves it untouched.
+PLACEHOLDER_PATTERN = re.compile(f'<div class="{EMBED_MARKDOWN_CLASS}">\x1aembed:(\\d+)\x1a</div>')
+HEADING_LINE_PATTERN = re.compile(r'(#{1,6})[ \t]+(.*?)[ \t#]*$')
+FENCE_LINE_PATTERN = re.compile(r'[ \t]*(```|~~~)')
+
+class Transcluder:
+    """
+    Renders `![[note]]` and `![[note#heading]]` embeds as the embedded note (or heading section) itself, converted by `engine`.
+    \nEmbeds are collected while a note is scanned and rendered once its own Markdown pass is done, so the engine is never re-entered mid-note.
+    Rendered fragments are cached by (note, section, content hash, output directory), so a note embedded by many pages is converted once per run.
+    Embeds which would recurse into a note already being rendered, or nest deeper than `max_depth`, are left as links;
+    fragments holding such a link depend on where they were embedded from and are not cached, so the output never depends on conversion order.
+    \nAfter each top-level note, `embeds` maps every note it transcluded (directly or not) to that note's content hash,
+    and `warnings` holds the messages about its embeds left as links; nothing is printed.
+    """
+    def __init__(
+            self,
+            engine,
+            max_depth   :int = TRANSCLUDE_MAX_DEPTH,
+            cache_size  :int = TRANSCLUDE_CACHE_SIZE,
+    ):
+        self.engine     = engine
+        self.max_depth  = max_depth
+        self.cache_size = cache_size
+        self.embeds     = {}
+        self.warnings   = []
+        self._cache     = OrderedDict()
+        self._cache_index = None    # File index the cached fragments were resolved with
+        self._digests   = {}    # path -> (mtime_ns, size, content hash)
+        self._stack     = []    # (path, section) of each note being rendered, outermost first
+        self._frames    = []    # Each note being rendered, as [[(path, section, fallback) requested], {embedded path: hash}, whether output depends on the stack]
+        self._warnings  = []    # Messages of the top-level note being rendered
+
+    def reset(self) -> None:
+        """Forgets the notes being rendered, e.g. after a conversion failed halfway. The fragment cache is kept."""
+        self._stack.clear()
+        self._frames.clear()
+        self._warnings = []
+
+    def begin(
+            self,
+            path        :str | None,
+            section     :str | None = None,
+    ) -> None:
+        """Starts rendering a note (`path` may be None for text which is no file)."""
+        self._stack.append((os.path.abspath(path) if path else None, section))
+        self._frames.append([[], {}, False])
+
+    def embed(
+            self,
+            path        :str,
+            section     :str | None,
+            fallback    :str,
+    ) -> str:
+        """
+        Requests the transclusion of the note at `path` (its `section` heading only, if given), returning the placeholder to put into the markdown.
+        \n`fallback` is the HTML used when the note cannot be transcluded.
+        """
+        requests = self._frames[-1][0]
+        requests.append((os.path.abspath(path), section, fallback))
+        return f'<div class="{EMBED_MARKDOWN_CLASS}">\x1aembed:{len(requests) - 1}\x1a</div>'
+
+    def finish(
+            self,
+            text_html   :str,
+            file_index,
+            root        :str,
+    ) -> tuple:
+        """Ends the current note, replacing its placeholders in `text_html`. Returns (html, whether any fragment has math)."""
+        requests, embedded, _ = self._frames[-1]
+        has_math = False
+        try:
+            fragments = []
+            for path, section, fallback in requests:
+                fragment = self._fragment(path, section, file_index, root, embedded)
+                if fragment is None:
+                    fragments.append(mark_link_types(fallback))
+                    continue
+                fragment_html, fragment_math = fragment
+                has_math = has_math or fragment_math
+                fragments.append(fragment_html)
+        finally:
+            self._stack.pop()
+            frame = self._frames.pop()
+        if not self._frames:
+            self.embeds = embedded
+            self.warnings, self._warnings = self._warnings, []
+        else:
+            self._frames[-1][1].update(embedded)
+            self._frames[-1][2] = self._frames[-1][2] or frame[2]
+        if not requests:
+            return text_html, has_math
+        return PLACEHOLDER_PATTERN.sub(lambda m: fragments[int(m.group(1))], text_html), has_math
+
+    def _fragment(
+            self,
+            path        :str,
+            section     :str | None,
+            file_index,
+            root        :str,
+            embedded    :dict,
+    ) -> tuple | None:
+        """(html, has_math) of one embed, or None when it must stay a link."""
+        if (path, section) in self._stack or (path, None) in self._stack:
+            self._warnings.append(f"Embed of {path}{f'#{section}' if section else ''} is recursive; left as a link.")
+            self._frames[-1][2] = True
+            return None
+        if len(self._stack) > self.max_depth:
+            self._warnings.append(f"Embed of {path} nests deeper than {self.max_depth} notes; left as a link.")
+            self._frames[-1][2] = True
+            return None
+        digest = self._digest(path)
+        if digest is None:
+            return None
+        file_map = file_index.file_map if isinstance(file_index, RecordingIndex) else file_index
+        if file_map is not self._cache_index:
+            # Links inside cached fragments were resolved against another index
+            self._cache.clear()
+            self._cache_index = file_map
+        key = (path, section, digest, root)
+        cached = self._cache.get(key)
+        if cached is None:
+            cached, stack_dependent = self._render(path, section, file_index, root)
+            if cached is None:
+                return None
+            if not stack_dependent:
+                self._cache[key] = cached
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(key)
+        fragment_html, has_math, lookups, nested, assets = cached
+        # The embedding note depends on everything the fragment looked up and embedded, and shows the files it references
+        if isinstance(file_index, RecordingIndex):
+            file_index.lookups.update(lookups)
+            file_index.assets.extend(assets)
+        embedded[path] = digest
+        embedded.update(nested)
+        return fragment_html, has_math
+
+    def _render(
+            self,
+            path        :str,
+            section     :str | None,
+            file_index,
+            root        :str,
+    ) -> tuple:
+        """Returns ((html, has_math, lookups, {embedded path: hash}, assets) or None, whether the fragment depends on the embedding stack)."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text_md = f.read()
+        except OSError:
+            return None, False
+        if section is not None:
+            text_md = extract_section(text_md, section)
+            if text_md is None:
+                self._warnings.append(f"Heading \"{section}\" not found in {path}; embed left as a link.")
+                return None, False
+        # A separate recorder, so the fragment's own links don't count as links of the embedding note
+        index = RecordingIndex(file_index.file_map) if isinstance(file_index, RecordingIndex) else file_index
+        self.begin(path, section)
+        frame = self._frames[-1]
+        body, has_math = self.engine.render_fragment(text_md, index, root)
+        body, nested_math = self.finish(body, index, root)
+        src = os.path.relpath(path, os.path.abspath(root)).replace("\\", "/")
+        fragment_html = f'<div class="{EMBED_MARKDOWN_CLASS}" data-embed-src="{html.escape(src)}">\n{body}\n</div>'
+        lookups = index.lookups if isinstance(index, RecordingIndex) else {}
+        assets = index.assets if isinstance(index, RecordingIndex) else []
+        return (fragment_html, has_math or nested_math, lookups, frame[1], assets), frame[2]
+
+    def _digest(self, path :str) -> str | None:
+        """Content hash of the note at `path`, re-read only when its stat changed."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        known = self._digests.get(path)
+        if known is not None and known[:2] == (st.st_mtime_ns, st.st_size):
+            return known[2]
+        try:
+            with open(path, "rb") as f:
+                digest = hash_bytes(f.read())
+        except OSError:
+            return None
+        self._digests[path] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+def extract_section(
+        text_md     :str,
+        heading     :str,
+) -> str | None:
+    """
+    The lines of `text_md` from the heading matching `heading` up to the next heading of the same or a higher level, or None if there is no such heading.
+    \nHeadings are matched by their slug, like anchors; for nested "A#B" references only the last heading is matched. Headings inside fenced code are skipped.
+    """
+    wanted = _slugify_heading(heading.rsplit("#", 1)[-1])
+    lines = text_md.split("\n")
+    start = None
+    level = 0
+    fence = None
+    for i, line in enumerate(lines):
+        fence_match = FENCE_LINE_PATTERN.match(line)
+        if fence_match:
+            if fence is None:
+                fence = fence_match.group(1)
+            elif fence_match.group(1) == fence:
+                fence = None
+            continue
+        if fence is not None:
+            continue
+        m = HEADING_LINE_PATTERN.match(line)
+        if m is None:
+            continue
+        if start is None:
+            if _slugify_heading(m.group(2)) == wanted:
+                start, level = i, len(m.group(1))
+        elif len(m.group(1)) <= level:
+            return "\n".join(lines[start:i])
+    if start is None:
+        return None
+    return "\n".join(lines[start:])
@@ -1,7 +1,14 @@
 # First-party
-import fnmatch
+import hashlib
+import marshal
 import os
-from collections import defaultdict
+import re
+import sys
+import time
+from collections import defaultdict, OrderedDict
+from functools import lru_cache
+# Local
+from constants import RESOLVE_MEMO_SIZE, CONVERT_IGNORE_LIST_FILE, BUILT_HTML_EXTENSION, FILE_INDEX_CACHE_DIR, FILE_INDEX_CACHE_VERSION, FILE_INDEX_RACY_WINDOW
 
 def parse_ignore_file(ignore_path):
     patterns = []
@@ -16,36 +23,603 @@ def parse_ignore_file(ignore_path):
     return patterns
 
 def should_ignore_files(rel_path, patterns, is_dir=False):
-    # Normalize path (always use forward slashes for matching)
-    rel_path_norm = rel_path.replace("\\", "/").rstrip("/")
-    for pat in patterns:
-        pat = pat.strip()
-        if not pat:
+    return _compile_ignore_patterns(tuple(patterns)).is_ignored(rel_path, is_dir=is_dir)
+
+@lru_cache(maxsize=8)
+def _compile_ignore_patterns(patterns :tuple) -> "IgnoreMatcher":
+    return IgnoreMatcher(patterns)
+
+class IgnoreMatcher:
+    """
+    `.convertignore` patterns compiled into one regex, with .gitignore semantics:
+    \n- a pattern containing a "/" (other than a trailing one) is anchored to the vault root, otherwise it matches at any depth;
+    \n- a trailing "/" only matches directories; `*`, `?` and `[...]` never match "/", while `**/`, `/**/` and `/**` span directories;
+    \n- "!" re-includes what an earlier pattern excluded, and the last matching pattern wins;
+    \n- everything below an ignored directory is ignored, without testing it.
+    """
+    def __init__(self, patterns :list | tuple):
+        dir_rules, file_rules = [], []
+        for pat in patterns:
+            rule = _translate_ignore_pattern(pat.strip())
+            if rule is None:
+                continue
+            regex, negated, dir_only = rule
+            dir_rules.append((regex, negated))
+            if not dir_only:
+                file_rules.append((regex, negated))
+        self._dir_pattern, self._dir_negated    = _combine_ignore_rules(dir_rules)
+        self._file_pattern, self._file_negated  = _combine_ignore_rules(file_rules)
+        self._dir_cache                         = {}
+
+    def match(
+            self,
+            rel_path    :str,
+            is_dir      :bool = False,
+    ) -> bool:
+        """Whether the patterns themselves exclude `rel_path` (a "/" separated path relative to the vault root), regardless of its parents."""
+        pattern, negated = (self._dir_pattern, self._dir_negated) if is_dir else (self._file_pattern, self._file_negated)
+        if pattern is None:
+            return False
+        m = pattern.fullmatch(rel_path)
+        return m is not None and not negated[m.lastindex]
+
+    def is_ignored(
+            self,
+            rel_path    :str,
+            is_dir      :bool = False,
+    ) -> bool:
+        rel_path = rel_path.replace("\\", "/").strip("/")
+        parent = rel_path.rpartition("/")[0]
+        if parent and self._dir_ignored(parent):
+            return True
+        if is_dir:
+            return self._dir_ignored(rel_path)
+        return self.match(rel_path)
+
+    def _dir_ignored(self, rel_dir :str) -> bool:
+        ignored = self._dir_cache.get(rel_dir)
+        if ignored is None:
+            parent = rel_dir.rpartition("/")[0]
+            ignored = self._dir_cache[rel_dir] = (bool(parent) and self._dir_ignored(parent)) or self.match(rel_dir, is_dir=True)
+        return ignored
+
+def _combine_ignore_rules(rules :list) -> tuple:
+    """
+    Joins (regex, negated) rules into one alternation, last rule first so the first match is the rule which wins.
+    \nReturns the compiled pattern (None without rules) and a list mapping each group number to whether its rule is negated.
+    """
+    if not rules:
+        return None, []
+    rules = rules[::-1]
+    return re.compile("|".join(f"({regex})" for regex, _ in rules)), [False] + [negated for _, negated in rules]
+
+def _translate_ignore_pattern(pat :str) -> tuple | None:
+    """Translates one .gitignore style pattern into (regex, negated, dir_only), or None for blank lines and comments."""
+    if not pat or pat.startswith("#"):
+        return None
+    negated = pat.startswith("!")
+    if negated:
+        pat = pat[1:]
+    elif pat.startswith("\\#") or pat.startswith("\\!"):
+        pat = pat[1:]
+    dir_only = pat.endswith("/")
+    pat = pat.rstrip("/")
+    if not pat:
+        return None
+    anchored = "/" in pat
+    segments = pat.lstrip("/").split("/")
+    parts = []
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == "**":
+            # Any number of directories, or everything inside when trailing
+            parts.append(".*" if last else "(?:.*/)?")
             continue
-        if pat.endswith("/"):
-            pat_dir = pat.rstrip("/")
-            if is_dir and fnmatch.fnmatch(rel_path_norm, pat_dir):
-                return True
-            if rel_path_norm.startswith(pat_dir + "/"):
-                return True
+        parts.append(_translate_glob_segment(segment) + ("" if last else "/"))
+    regex = "".join(parts)
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    return regex, negated, dir_only
+
+def _translate_glob_segment(segment :str) -> str:
+    """Regex for one path segment of a glob, where wildcards never match "/"."""
+    out = []
+    i, n = 0, len(segment)
+    while i < n:
+        c = segment[i]
+        i += 1
+        if c == "*":
+            while i < n and segment[i] == "*":
+                i += 1
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "\\" and i < n:
+            out.append(re.escape(segment[i]))
+            i += 1
+        elif c == "[":
+            close = segment.find("]", i + 1 if i < n and segment[i] in "!^" else i)
+            if close < 0:
+                out.append(re.escape(c))
+                continue
+            body = segment[i:close]
+            i = close + 1
+            if body[:1] in ("!", "^"):
+                body = "^" + body[1:]
+            out.append("[" + body.replace("\\", "\\\\") + "]")
         else:
-            if fnmatch.fnmatch(rel_path_norm, pat):
-                return True
-            if is_dir and fnmatch.fnmatch(rel_path_norm + "/", pat + "/"):
-                return True
-    return False
+            out.append(re.escape(c))
+    return "".join(out)
 
-def build_file_index(base_dir: str) -> defaultdict:
+def build_file_index(
+        base_dir    :str,
+        cache       :bool = False,
+) -> defaultdict:
     """
     Scans base_dir and returns {lowercase filename: [relative_path, ...]}
+    \nWith `cache`, directory listings come from the persisted `DirectoryCache` and only directories whose mtime changed are listed again.
     """
-    file_map = defaultdict(list)
+    file_map = FileIndex()
     base_dir_abs = os.path.abspath(base_dir)
-    for root, _dirs, files in os.walk(base_dir_abs):
+    if not cache:
+        for root, _dirs, files in os.walk(base_dir_abs):
+            for name in files:
+                file_map[name.lower()].append(os.path.join(root, name))
+        return file_map
+    listings = DirectoryCache(base_dir_abs)
+    # Depth-first and top-down, in the same order as `os.walk`
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        listing = listings.listdir(rel_dir)
+        if listing is None:
+            continue
+        files, subdirs = listing
+        root = os.path.join(base_dir_abs, rel_dir) if rel_dir else base_dir_abs
         for name in files:
             file_map[name.lower()].append(os.path.join(root, name))
+        stack.extend(f"{rel_dir}/{name}" if rel_dir else name for name in reversed(subdirs))
+    listings.save()
     return file_map
 
+def list_directory(path :str) -> tuple | None:
+    """
+    ([file names], [subdirectory names]) of the directory at `path` in `os.scandir` order, or None if it can't be read.
+    \nSymlinked directories are in neither list, as `os.walk` doesn't descend into them either.
+    """
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return None
+    files, subdirs = [], []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if not is_dir:
+            files.append(entry.name)
+        elif not entry.is_symlink():
+            subdirs.append(entry.name)
+    return files, subdirs
+
+class DirectoryCache:
+    """
+    Directory listings of a vault, persisted between runs in a marshal file under `FILE_INDEX_CACHE_DIR` (outside the vault, so saving it doesn't touch the vault's mtimes).
+    \nA cached listing is reused while its directory's mtime is unchanged; adding, removing or renaming entries changes the mtime, so only those directories are listed again.
+    A directory modified within `FILE_INDEX_RACY_WINDOW` seconds of the scan might change again within the same mtime tick, so it is stored as unverified and listed again next time.
+    \nDirectories which are not listed in a run (e.g. removed or ignored ones) are dropped from the cache when it is saved, unless the run only walked part of the vault.
+    """
+    def __init__(
+            self,
+            base_dir    :str,
+            cache_path  :str | None = None,
+    ):
+        self.base_dir   = os.path.abspath(base_dir)
+        self.cache_path = cache_path if cache_path is not None else file_index_cache_path(self.base_dir)
+        self.rescanned  = 0
+        self._cached    = self._load()
+        self._listings  = {}    # rel_dir -> (mtime_ns or -1, files, subdirs)
+        self._racy_ns   = time.time_ns() - int(FILE_INDEX_RACY_WINDOW * 1e9)
+
+    def _load(self) -> dict:
+        try:
+            with open(self.cache_path, "rb") as f:
+                version, base_dir, listings = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return {}
+        if version != FILE_INDEX_CACHE_VERSION or base_dir != self.base_dir:
+            return {}
+        return listings
+
+    def listdir(self, rel_dir :str) -> tuple | None:
+        """`list_directory` of the directory at "/" separated `rel_dir` (relative to the vault root, "" for the root)."""
+        known = self._listings.get(rel_dir)
+        if known is not None:
+            return known[1], known[2]
+        path = os.path.join(self.base_dir, rel_dir) if rel_dir else self.base_dir
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = self._cached.get(rel_dir)
+        if cached is not None and cached[0] == mtime_ns:
+            self._listings[rel_dir] = cached
+            return cached[1], cached[2]
+        listing = list_directory(path)
+        if listing is None:
+            return None
+        self.rescanned += 1
+        self._listings[rel_dir] = (mtime_ns if mtime_ns < self._racy_ns else -1, *listing)
+        return listing
+
+    def cached(self, rel_dir :str) -> tuple | None:
+        """The cached listing of `rel_dir` if its directory's mtime is unchanged, else None. Only stats the directory, never lists it."""
+        known = self._listings.get(rel_dir)
+        if known is not None:
+            return known[1], known[2]
+        cached = self._cached.get(rel_dir)
+        if cached is None:
+            return None
+        try:
+            mtime_ns = os.stat(os.path.join(self.base_dir, rel_dir) if rel_dir else self.base_dir).st_mtime_ns
+        except OSError:
+            return None
+        if cached[0] != mtime_ns:
+            return None
+        self._listings[rel_dir] = cached
+        return cached[1], cached[2]
+
+    def save(self, partial :bool = False) -> None:
+        """
+        Writes the listings of this run, unless they equal the loaded cache. A cache which can't be written is silently skipped.
+        \nWith `partial`, cached listings of directories this run didn't list are kept.
+        """
+        listings = {**self._cached, **self._listings} if partial else self._listings
+        if listings == self._cached:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                marshal.dump((FILE_INDEX_CACHE_VERSION, self.base_dir, listings), f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+
+def file_index_cache_path(base_dir :str) -> str:
+    """Cache file of the vault at `base_dir`, named by a hash of its absolute path."""
+    if os.name == "nt":
+        cache_home = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    digest = hashlib.blake2b(os.path.abspath(base_dir).encode("utf-8", "surrogateescape"), digest_size=16).hexdigest()
+    # marshal's format may change between Python versions
+    return os.path.join(cache_home, FILE_INDEX_CACHE_DIR, f"{digest}.py{sys.version_info[0]}{sys.version_info[1]}.index")
+
+class LazyFileIndex:
+    """
+    File index of a directory which lists its subdirectories only as far as the links resolved through it need, for single-file conversions.
+    \nDirectories are listed in `os.walk` order (through the `DirectoryCache`), and stop being listed as soon as the looked up name was found.
+    Links resolved from the indexed directory itself resolve to their first candidate in walk order, because every candidate lies below that directory
+    and `FileIndex` takes the first candidate on ties; so the result equals that of a full `build_file_index`, usually without walking the whole tree.
+    \nA link without an extension (`[[note]]`) is looked up as both `note` and `note.md` in the same walk. A file named exactly `note` anywhere wins,
+    so once `note.md` was found the walk only stops early if the cached listings of the directories left (still current by mtime) hold no `note`;
+    without a warm cache, the rest of the tree is listed to rule it out.
+    Links resolved from any other directory, and `get`, need every candidate and list the rest of the tree first.
+    \nCall `save` when done to keep the listings for the next run.
+    """
+    def __init__(
+            self,
+            base_dir    :str,
+            cache       :bool = True,
+    ):
+        self.base_dir   = os.path.abspath(base_dir)
+        self.listings   = DirectoryCache(self.base_dir) if cache else None
+        self.file_map   = FileIndex()   # Every file listed so far, in walk order
+        self._pending   = [""]          # Directories left to list, the next one last
+
+    def _list_until(self, name :str | None = None) -> None:
+        """Lists directories until `name` was found, or until every directory was listed when `name` is None."""
+        while self._pending and (name is None or name not in self.file_map):
+            self._list_next()
+
+    def _list_next(self) -> None:
+        rel_dir = self._pending.pop()
+        path = os.path.join(self.base_dir, rel_dir) if rel_dir else self.base_dir
+        listing = self.listings.listdir(rel_dir) if self.listings is not None else list_directory(path)
+        if listing is None:
+            return
+        files, subdirs = listing
+        for file_name in files:
+            self.file_map[file_name.lower()].append(os.path.join(path, file_name))
+        self._pending.extend(f"{rel_dir}/{sub}" if rel_dir else sub for sub in reversed(subdirs))
+
+    def get(self, name :str, default=None):
+        self._list_until()
+        return self.file_map.get(name, default)
+
+    def __getitem__(self, name :str):
+        return self.get(name, [])
+
+    def __contains__(self, name :str) -> bool:
+        return bool(self.get(name))
+
+    def resolve(
+            self,
+            link_text   :str,
+            current_dir :str,
+    ) -> str:
+        """Same result as `FileIndex.resolve` on the full index of `base_dir`."""
+        current_dir = os.path.abspath(current_dir)
+        if current_dir != self.base_dir:
+            self._list_until()
+            return self.file_map.resolve(link_text, current_dir)
+        if '.' in link_text:
+            best = self._first(link_text.lower())
+        else:
+            best = self._first_note(link_text.lower())
+        if best is None:
+            raise FileNotFoundError(f"No candidate for Obsidian link: {_markdown_link_text(link_text)}")
+        return os.path.relpath(best, current_dir).replace("\\", "/")
+
+    def _first(self, name :str) -> str | None:
+        self._list_until(name)
+        candidates = self.file_map.get(name)
+        return candidates[0] if candidates else None
+
+    def _first_note(self, name :str) -> str | None:
+        """First candidate of the extensionless link `name`: the first file named `name`, else the first `name`.md, as `FileIndex.resolve` picks them."""
+        md_name = name + '.md'
+        while self._pending and name not in self.file_map and md_name not in self.file_map:
+            self._list_next()
+        if name not in self.file_map and md_name in self.file_map and self._may_hold(name):
+            # A file named `name` further down would still win
+            self._list_until(name)
+        candidates = self.file_map.get(name) or self.file_map.get(md_name)
+        return candidates[0] if candidates else None
+
+    def _may_hold(self, name :str) -> bool:
+        """False if the cached listings prove that no directory left to list holds a file named `name`, checking their mtimes without listing them."""
+        if self.listings is None:
+            return True
+        stack = list(self._pending)
+        while stack:
+            rel_dir = stack.pop()
+            listing = self.listings.cached(rel_dir)
+            if listing is None:
+                return True
+            files, subdirs = listing
+            if any(file_name.lower() == name for file_name in files):
+                return True
+            stack.extend(f"{rel_dir}/{sub}" if rel_dir else sub for sub in subdirs)
+        return False
+
+    def save(self) -> None:
+        if self.listings is not None:
+            self.listings.save(partial=bool(self._pending))
+
+class VaultScanner:
+    """
+    Walks a vault once with `os.scandir`, never descending into directories `.convertignore` excludes, and collects:
+    the link index (`file_index`), the markdown notes to convert (`notes`) and the previously built HTML files (`outputs`).
+    \nEntries come out in the same (top-down) order as `os.walk`, so ambiguous links resolve to the same candidates as `build_file_index`.
+    Ignored files are left out of the link index too.
+    \nWith `cache`, directory listings come from the persisted `DirectoryCache`, so only directories whose mtime changed are listed again.
+    """
+    def __init__(
+            self,
+            base_dir        :str,
+            ignore_patterns :list | None = None,
+            cache           :bool = False,
+    ):
+        self.base_dir           = base_dir
+        self.listings           = DirectoryCache(base_dir) if cache else None
+        self.ignore_patterns    = ignore_patterns if ignore_patterns is not None else parse_ignore_file(os.path.join(base_dir, CONVERT_IGNORE_LIST_FILE))
+        self.ignore             = IgnoreMatcher(self.ignore_patterns)
+        self.file_index         = FileIndex()
+        self.notes              = []    # (input_path, directory, path relative to base_dir) of every markdown file
+        self.outputs            = []    # Every `BUILT_HTML_EXTENSION` and "index.html" file
+
+    def scan(self) -> "VaultScanner":
+        self._scan_dir(self.base_dir, os.path.abspath(self.base_dir), "")
+        if self.listings is not None:
+            self.listings.save()
+        return self
+
+    def _scan_dir(
+            self,
+            dir_path    :str,
+            abs_dir     :str,
+            rel_dir     :str,
+    ) -> None:
+        listing = self.listings.listdir(rel_dir) if self.listings is not None else list_directory(dir_path)
+        if listing is None:
+            # Unreadable directories are skipped, as `os.walk` does
+            return
+        files, subdirs = listing
+        for name in files:
+            rel_path = f"{rel_dir}/{name}" if rel_dir else name
+            # Parents were already tested before descending, so only the file itself is matched
+            if self.ignore.match(rel_path):
+                continue
+            lower = name.lower()
+            self.file_index[lower].append(os.path.join(abs_dir, name))
+            if lower.endswith(".md"):
+                self.notes.append((os.path.join(dir_path, name), dir_path, rel_path))
+            elif name.endswith(BUILT_HTML_EXTENSION) or name.endswith("index.html"):
+                self.outputs.append(os.path.join(dir_path, name))
+        for name in subdirs:
+            rel_path = f"{rel_dir}/{name}" if rel_dir else name
+            if not self.ignore.match(rel_path, is_dir=True):
+                self._scan_dir(os.path.join(dir_path, name), os.path.join(abs_dir, name), rel_path)
+
+class FileIndex(defaultdict):
+    """
+    {lowercase filename: [absolute path, ...]} index of a vault which also resolves Obsidian links against itself.
+    \nAmbiguous names get a trie of their candidates' path segments, so the best candidate for a directory is found by walking the directory's segments instead of comparing it against every candidate.
+    Resolutions are memoized in an LRU keyed on (link, current directory), so a note linked from many notes is resolved once per directory.
+    \nOnce links have been resolved through it, the index must only be modified through `add` and `remove`, which drop the memoized resolutions.
+    """
+    def __init__(self, memo_size :int = RESOLVE_MEMO_SIZE):
+        super().__init__(list)
+        self.memo_size  = memo_size
+        self._memo      = OrderedDict()
+        self._tries     = {}
+
+    def __reduce__(self):
+        # Pickled (e.g. for pool workers) without the memo or tries
+        return type(self), (self.memo_size,), None, None, iter(self.items())
+
+    def add(self, path :str) -> None:
+        """Adds the file at `path`, as the last candidate for its name."""
+        name = os.path.basename(path).lower()
+        self[name].append(os.path.abspath(path))
+        self._forget(name)
+
+    def remove(self, path :str) -> None:
+        """Removes the file at `path`, if indexed."""
+        name = os.path.basename(path).lower()
+        candidates = self.get(name)
+        path = os.path.abspath(path)
+        if not candidates or path not in candidates:
+            return
+        candidates.remove(path)
+        if not candidates:
+            del self[name]
+        self._forget(name)
+
+    def _forget(self, name :str) -> None:
+        # Any link may have resolved through the name, or missed it
+        self._memo.clear()
+        self._tries.pop(name, None)
+
+    def resolve(
+            self,
+            link_text   :str,
+            current_dir :str,
+    ) -> str:
+        """Same result as `resolve_obsidian_path` on a plain index, raising `FileNotFoundError` for missing links."""
+        key = (link_text, current_dir)
+        memo = self._memo
+        if key in memo:
+            memo.move_to_end(key)
+            resolved = memo[key]
+        else:
+            resolved = self._resolve(link_text, current_dir)
+            memo[key] = resolved
+            if len(memo) > self.memo_size:
+                memo.popitem(last=False)
+        if resolved is None:
+            raise FileNotFoundError(f"No candidate for Obsidian link: {_markdown_link_text(link_text)}")
+        return resolved
+
+    def _resolve(
+            self,
+            link_text   :str,
+            current_dir :str,
+    ) -> str | None:
+        name = link_text.lower()
+        candidates = self.get(name)
+        if not candidates and '.' not in link_text:
+            name += '.md'
+            candidates = self.get(name)
+        if not candidates:
+            return None
+        current_dir = os.path.abspath(current_dir)
+        if len(candidates) == 1:
+            best = candidates[0]
+        else:
+            best = candidates[self._best_candidate(name, candidates, current_dir)]
+        return os.path.relpath(best, current_dir).replace("\\", "/")
+
+    def _best_candidate(
+            self,
+            name        :str,
+            candidates  :list,
+            current_dir :str,
+    ) -> int:
+        """
+        Index of the candidate sharing the longest common path with `current_dir`, the first one listed on ties.
+        \nEach trie node is [index of the first candidate below it, {segment: child node}].
+        """
+        trie = self._tries.get(name)
+        if trie is None:
+            trie = self._tries[name] = [0, {}]
+            for i, cand in enumerate(candidates):
+                node = trie
+                for segment in cand.split(os.sep):
+                    child = node[1].get(segment)
+                    if child is None:
+                        child = node[1][segment] = [i, {}]
+                    node = child
+        node = trie
+        for segment in current_dir.split(os.sep):
+            child = node[1].get(segment)
+            if child is None:
+                break
+            node = child
+        return node[0]
+
+class RecordingIndex:
+    """
+    Read-only view over a file index which remembers every name looked up through it, along with the candidates found.
+    \nUsed to record which index entries a note's links depended on. Resolutions of markdown links are also kept,
+    as absolute note paths in `links` and the link text of missing notes in `unresolved`, for the link graph.
+    Links and embeds which resolved to any other file are kept as absolute paths in `assets`, for mirroring them (see `mirror.AssetMirror`).
+    """
+    def __init__(self, file_map :defaultdict):
+        self.file_map   = file_map
+        self.lookups    = {}
+        self.links      = []
+        self.unresolved = []
+        self.assets     = []
+
+    def get(self, name :str, default=None):
+        candidates = self.file_map.get(name)
+        self.lookups[name] = list(candidates) if candidates else []
+        return candidates if candidates else default
+
+    def __getitem__(self, name :str):
+        return self.get(name, [])
+
+    def __contains__(self, name :str) -> bool:
+        return bool(self.get(name))
+
+    def resolve(
+            self,
+            link_text   :str,
+            current_dir :str,
+    ) -> str:
+        # Record the same names a resolution looks up, even when the wrapped index answers from its memo.
+        # A lazy index would list its whole tree to answer them; it only serves single-file conversions, which keep no manifest to record them in
+        if not isinstance(self.file_map, LazyFileIndex) and not self.get(link_text.lower()) and '.' not in link_text:
+            self.get(_markdown_link_text(link_text).lower())
+        try:
+            if isinstance(self.file_map, (FileIndex, LazyFileIndex)):
+                resolved = self.file_map.resolve(link_text, current_dir)
+            else:
+                resolved = resolve_obsidian_path(link_text, self.file_map, current_dir)
+        except FileNotFoundError:
+            if link_text and _is_markdown_link(link_text):
+                self.unresolved.append(link_text)
+            raise
+        if resolved.lower().endswith(".md"):
+            if _is_markdown_link(link_text):
+                self.links.append(os.path.normpath(os.path.join(os.path.abspath(current_dir), resolved)))
+        else:
+            self.assets.append(os.path.normpath(os.path.join(os.path.abspath(current_dir), resolved)))
+        return resolved
+
+def _is_markdown_link(link_text :str) -> bool:
+    """Whether `link_text` names a note, the way `convert._resolve_markdown_file` decides it."""
+    return link_text.endswith(".md") or '.' not in link_text
+
+def _markdown_link_text(link_text :str) -> str:
+    """The link text tried when a link without an extension does not match a file, as Obsidian implies ".md"."""
+    return link_text + '.md' if '.' not in link_text else link_text
+
 def _try_resolve_markdown_path(
         link_text   :str,
         file_map    :defaultdict,
@@ -70,6 +644,8 @@ def resolve_obsidian_path(
     """
     Given 'image.png', 'some/dir', and the file_map, return best relative path for the link (to match Obsidian's similar path resolution system).
     """
+    if isinstance(file_map, (FileIndex, LazyFileIndex, RecordingIndex)):
+        return file_map.resolve(link_text, current_dir)
     current_dir = os.path.abspath(current_dir)
     candidates = file_map.get(link_text.lower())
     if not candidates:
@@ -0,0 +1,234 @@
+# First-party
+from collections import defaultdict
+import os
+import time
+# Local
+from main import convert_directory, _convert_job, _build_engine, _build_page, _stale_backlinks, _relink_pages, _remove_outputs, _convert_filename
+from graph import LinkGraph
+from writer import OutputWriter
+from mirror import AssetMirror
+from manifest import BuildManifest, build_fingerprint
+from tags import TagPages, note_tags
+from search import SearchIndex, manifest_terms
+from util import parse_ignore_file, IgnoreMatcher, FileIndex
+from constants import CONVERT_IGNORE_LIST_FILE, BUILD_MANIFEST_FILE, WATCH_POLL_INTERVAL
+
+#########
+# WATCH #
+#########
+
+class VaultWatcher:
+    """
+    Polls a vault for changes and reconverts only the affected notes.
+    \nThe file index, the compiled ignore patterns, the Markdown engine and the compiled template stay in memory between polls.
+    A change affects the changed note itself plus every note whose recorded index lookups (see `manifest.BuildManifest`) name a file which was added or removed.
+    \nWith `out_dir`, pages are written into that directory and the files they reference are mirrored into it after every change (see `mirror.AssetMirror`).
+    """
+    def __init__(
+            self,
+            input_dir       :str,
+            use_links       :bool,
+            use_mathjax     :bool,
+            verbose         :bool,
+            template_path   :str,
+            graph_path      :str | None = None,
+            use_search      :bool = False,
+            out_dir         :str | None = None,
+    ):
+        self.input_dir          = input_dir
+        self.vault_root         = os.path.abspath(input_dir)
+        self.out_dir            = out_dir
+        self.graph_path         = graph_path
+        self.options            = (use_links, use_mathjax, input_dir, verbose, template_path, use_search)
+        self.ignore_path        = os.path.join(input_dir, CONVERT_IGNORE_LIST_FILE)
+        self.ignore             = IgnoreMatcher(parse_ignore_file(self.ignore_path))
+        self.ignore_stat        = _stat(self.ignore_path)
+        self.manifest           = BuildManifest.load(os.path.join(input_dir, BUILD_MANIFEST_FILE))
+        self.engine             = _build_engine(self.options)
+        self.page               = _build_page(self.options)
+        self.writer             = OutputWriter(threads=0, site_root=input_dir, out_dir=out_dir)
+        self.mirror             = AssetMirror(input_dir, out_dir) if out_dir is not None else None
+        self.snapshot           = self._take_snapshot()
+        self.file_index         = self._index_snapshot(self.snapshot)
+
+    def _take_snapshot(self) -> dict:
+        """
+        Returns {path: (mtime_ns, size)} for every file in the vault which `.convertignore` doesn't exclude, in `os.walk` order.
+        \nIgnored directories are never walked, and the files left are those `util.VaultScanner` indexes for a directory build.
+        """
+        snapshot = {}
+        for root, dirs, files in os.walk(self.input_dir):
+            rel_dir = os.path.relpath(root, self.input_dir).replace("\\", "/")
+            rel_dir = "" if rel_dir == "." else f"{rel_dir}/"
+            # Parents were already tested before descending, so only the entry itself is matched, as `VaultScanner` does
+            dirs[:] = [name for name in dirs if not self.ignore.match(rel_dir + name, is_dir=True)]
+            for name in files:
+                if self.ignore.match(rel_dir + name):
+                    continue
+                fpath = os.path.join(root, name)
+                try:
+                    st = os.stat(fpath)
+                except OSError:
+                    continue
+                snapshot[fpath] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def _index_snapshot(self, snapshot :dict) -> defaultdict:
+        """Same mapping (and candidate order) as `util.build_file_index`, without walking the vault again."""
+        file_map = FileIndex()
+        for fpath in snapshot:
+            file_map[os.path.basename(fpath).lower()].append(os.path.abspath(fpath))
+        return file_map
+
+    def _is_ignored(self, fpath :str) -> bool:
+        return self.ignore.is_ignored(os.path.relpath(fpath, self.input_dir))
+
+    def _dependents(
+            self,
+            names       :set,
+            changed     :set = frozenset(),
+    ) -> set:
+        """Notes (relative to the vault root) whose links looked up any of `names` in the file index, or which transcluded any of the `changed` notes."""
+        dependents = set()
+        for rel_path, entry in self.manifest.notes.items():
+            if not names.isdisjoint(entry["lookups"]) or not changed.isdisjoint(entry["embeds"]):
+                dependents.add(rel_path)
+        return dependents
+
+    def poll(self) -> int:
+        """Checks the vault once and reconverts affected notes. Returns the number of notes converted."""
+        ignore_stat = _stat(self.ignore_path)
+        ignore_changed = ignore_stat != self.ignore_stat
+        if ignore_changed:
+            # Files may have become ignored or not; the snapshot below is taken with the new patterns
+            self.ignore_stat = ignore_stat
+            self.ignore = IgnoreMatcher(parse_ignore_file(self.ignore_path))
+        snapshot = self._take_snapshot()
+        if snapshot == self.snapshot and not ignore_changed:
+            return 0
+        added = snapshot.keys() - self.snapshot.keys()
+        removed = self.snapshot.keys() - snapshot.keys()
+        modified = {p for p in snapshot.keys() & self.snapshot.keys() if snapshot[p] != self.snapshot[p]}
+        self.snapshot = snapshot
+        if added or removed or ignore_changed:
+            self.file_index = self._index_snapshot(snapshot)
+        use_links, use_mathjax, site_root, _verbose, template_path, use_search = self.options
+        fingerprint = build_fingerprint(template_path, site_root, use_links, use_mathjax, use_search)
+        full_build = self.manifest.fingerprint != fingerprint
+        previous_graph = LinkGraph.from_manifest(self.manifest)
+        if full_build:
+            self.manifest.reset(fingerprint)
+            # The template or global CSS/JS changed
+            self.page = _build_page(self.options)
+        backlinks = previous_graph.backlinks() if self.page.uses_backlinks else None
+        notes = [p for p in snapshot if p.lower().endswith(".md")]
+        rel_notes = {p: self.manifest.rel_path(p) for p in notes}
+        changed = {self.manifest.rel_path(p) for p in added | removed | modified}
+        affected = self._dependents({os.path.basename(p).lower() for p in added | removed}, changed)
+        affected.update(rel_notes[p] for p in (added | modified) if p in rel_notes)
+        affected.update(rel for rel in rel_notes.values() if rel not in self.manifest.notes)
+        previous_tags = note_tags(self.manifest)
+        previous_terms = manifest_terms(self.manifest)
+        written = [self.manifest.path]
+        converted = self._convert([p for p in notes if rel_notes[p] in affected], rel_notes, backlinks, written)
+        orphans = self.manifest.prune(set(rel_notes.values()))
+        _remove_outputs(orphans, self.out_dir or site_root)
+        graph = LinkGraph.from_manifest(self.manifest)
+        if backlinks is not None:
+            backlinks = graph.backlinks()
+            relinked = _stale_backlinks([(p, os.path.dirname(p), rel_notes[p]) for p in notes], self.manifest, backlinks)
+            reconvert = _relink_pages(relinked, self.manifest, self.page, self.writer, backlinks)
+            written += [_convert_filename(input_path) for input_path, root in relinked if (input_path, root) not in reconvert]
+            converted += self._convert([input_path for input_path, _root in reconvert], rel_notes, backlinks, written)
+        written += [os.path.join(site_root, output) for output in orphans]
+        if self.graph_path:
+            graph.write(self.graph_path)
+            written.append(self.graph_path)
+        if use_links:
+            tag_pages = TagPages(site_root, self.page, self.writer)
+            stale_pages = [tag_pages.page_path(name) for name in self.manifest.tag_pages]
+            tag_pages.update(self.manifest, previous_tags, full=full_build)
+            written += stale_pages + [tag_pages.page_path(name) for name in self.manifest.tag_pages] + [tag_pages.index_path]
+        if use_search:
+            search = SearchIndex(site_root, self.writer)
+            stale_shards = [search.shard_path(key) for key in self.manifest.search_shards]
+            search.update(self.manifest, previous_terms, full=full_build)
+            written += stale_shards + [search.shard_path(key) for key in self.manifest.search_shards] + [search.index_path]
+        if self.mirror is not None and self.mirror.update(self.manifest, self.page.linked_files()):
+            print(self.mirror.summary())
+        self.manifest.save()
+        self._absorb(written)
+        return converted
+
+    def _convert(
+            self,
+            paths       :list,
+            rel_notes   :dict,
+            backlinks   :dict | None,
+            written     :list,
+    ) -> int:
+        """Converts and records the notes at `paths`, appending their outputs to `written`. Returns the number of notes converted."""
+        converted = 0
+        for input_path in paths:
+            try:
+                _, output_path, facts, _ = _convert_job(input_path, os.path.dirname(input_path), self.file_index, self.engine, self.page, self.writer, backlinks)
+            except Exception as e:
+                # Keep watching; the note is retried on its next change
+                print(f"Failed {input_path}: {type(e).__name__}: {e}")
+                self.manifest.notes.pop(rel_notes[input_path], None)
+                continue
+            for warning in facts.pop("warnings"):
+                print(warning)
+            print(f"Converted {input_path} -> {self.writer.target(output_path)}")
+            self.manifest.record(input_path, output_path, **facts)
+            written.append(output_path)
+            converted += 1
+        return converted
+
+    def _absorb(self, paths :list) -> None:
+        """Records our own outputs (and removals) in the snapshot, so writing them doesn't trigger another rebuild."""
+        new_paths = False
+        for fpath in paths:
+            abs_path = os.path.abspath(fpath)
+            if os.path.commonpath([abs_path, self.vault_root]) != self.vault_root or self._is_ignored(fpath):
+                # Not part of the snapshot, e.g. a graph written outside the vault
+                continue
+            try:
+                st = os.stat(fpath)
+            except FileNotFoundError:
+                self.snapshot.pop(fpath, None)
+                continue
+            new_paths = new_paths or fpath not in self.snapshot
+            self.snapshot[fpath] = (st.st_mtime_ns, st.st_size)
+        if new_paths:
+            self.file_index = self._index_snapshot(self.snapshot)
+
+def _stat(path :str) -> tuple | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def watch_directory(
+        input_dir       :str,
+        use_links       :bool,
+        use_mathjax     :bool,
+        verbose         :bool,
+        template_path   :str,
+        incremental     :bool = True,
+        jobs            :int = 1,
+        interval        :float = WATCH_POLL_INTERVAL,
+        graph_path      :str | None = None,
+        use_search      :bool = False,
+        out_dir         :str | None = None,
+) -> None:
+    convert_directory(input_dir, use_links, use_mathjax, verbose, template_path, incremental=incremental, jobs=jobs, graph_path=graph_path, use_search=use_search, out_dir=out_dir)
+    watcher = VaultWatcher(input_dir, use_links, use_mathjax, verbose, template_path, graph_path, use_search, out_dir)
+    print(f"Watching {input_dir} for changes (Ctrl+C to stop)...")
+    try:
+        while True:
+            time.sleep(interval)
+            watcher.poll()
+    except KeyboardInterrupt:
+        print("Stopped watching.")
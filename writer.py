@@ -0,0 +1,246 @@
+# First-party
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+# Local
+from constants import WRITER_THREADS, WRITER_MAX_PENDING
+
+##########
+# WRITER #
+##########
+
+class OutputWriter:
+    """
+    Writes converted HTML files, skipping files whose existing content is already identical so their mtimes (and deploys) are left alone.
+    \nWith `threads` > 0, changed files are written on a background thread pool; at most `max_pending` writes are queued at once, after which `write` blocks.
+    Call `flush` (or `close`) before relying on the files, which also raises the first error a background write hit.
+    A file with a write still queued is waited for before it is compared, written again or removed, so the last write to a path always wins.
+    \nWith `out_dir`, paths are given as if the files were written into the vault at `site_root` and are written to the same place under `out_dir` instead
+    (see `target`). Files there are then replaced rather than written into, so a file hardlinked from the vault (see `mirror.AssetMirror`) is never written through.
+    Missing directories are created in either case.
+    """
+    def __init__(
+            self,
+            threads     :int = WRITER_THREADS,
+            max_pending :int = WRITER_MAX_PENDING,
+            site_root   :str | None = None,
+            out_dir     :str | None = None,
+    ):
+        self.written    = 0
+        self.unchanged  = 0
+        self.site_root  = os.path.abspath(site_root) if site_root is not None else None
+        self.out_dir    = os.path.abspath(out_dir) if out_dir is not None else None
+        self._dirs      = set()     # Directories known to exist
+        self._pool      = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="writer") if threads > 0 else None
+        self._slots     = threading.BoundedSemaphore(max_pending)
+        self._futures   = []
+        self._pending   = {}    # Target path -> future of its last queued write
+
+    def write(
+            self,
+            path    :str,
+            text    :str,
+    ) -> bool:
+        """Writes `text` to `path` unless the file already holds exactly it. Returns False if the write was skipped."""
+        # Same bytes as writing `text` in text mode
+        data = (text if os.linesep == "\n" else text.replace("\n", os.linesep)).encode("utf-8")
+        path = self.target(path)
+        self._wait_for(path)
+        if _has_content(path, data):
+            self.unchanged += 1
+            return False
+        self.written += 1
+        self._make_dirs(path)
+        if self._pool is None:
+            _write_bytes(path, data, replace=self.out_dir is not None)
+            return True
+        self._slots.acquire()
+        if len(self._futures) >= WRITER_MAX_PENDING * 16:
+            # Forget finished writes, keeping failed ones for `flush` to raise
+            self._futures = [future for future in self._futures if not future.done() or future.exception() is not None]
+            self._pending = {pending_path: future for pending_path, future in self._pending.items() if not future.done()}
+        try:
+            future = self._pool.submit(self._write_job, path, data)
+        except BaseException:
+            self._slots.release()
+            raise
+        self._futures.append(future)
+        self._pending[path] = future
+        return True
+
+    def write_stream(
+            self,
+            path    :str,
+            pieces,
+    ) -> bool:
+        """
+        Writes the concatenation of the strings `pieces` to `path` without holding it whole, unless the file already holds exactly it.
+        \nPieces are written to a temporary file next to `path` while being compared against the existing file, which is only replaced if they differ.
+        The write is synchronous, so the pieces are never queued. Returns False if the write was skipped.
+        """
+        path = self.target(path)
+        self._wait_for(path)
+        self._make_dirs(path)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        identical = True
+        try:
+            existing = open(path, "rb")
+        except OSError:
+            existing = None
+            identical = False
+        try:
+            with open(tmp_path, "wb") as out:
+                for piece in pieces:
+                    data = (piece if os.linesep == "\n" else piece.replace("\n", os.linesep)).encode("utf-8")
+                    out.write(data)
+                    if identical and existing.read(len(data)) != data:
+                        identical = False
+            if identical and existing.read(1):
+                identical = False
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            if existing is not None:
+                existing.close()
+        if identical:
+            os.remove(tmp_path)
+            self.unchanged += 1
+            return False
+        os.replace(tmp_path, path)
+        self.written += 1
+        return True
+
+    def target(self, path :str) -> str:
+        """The file written for `path`: `path` itself, or the same place under `out_dir` when writing out of tree."""
+        if self.out_dir is None:
+            return path
+        return os.path.join(self.out_dir, os.path.relpath(os.path.abspath(path), self.site_root))
+
+    def exists(self, path :str) -> bool:
+        path = self.target(path)
+        return path in self._pending or os.path.isfile(path)
+
+    def remove(self, path :str) -> bool:
+        """Removes the file written for `path`. Returns False if there was none."""
+        path = self.target(path)
+        self._wait_for(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _wait_for(self, path :str) -> None:
+        """Waits for the queued write to the target `path`, if any. Its error, if it hit one, is left for `flush` to raise."""
+        future = self._pending.pop(path, None)
+        if future is not None:
+            future.exception()
+
+    def _make_dirs(self, path :str) -> None:
+        directory = os.path.dirname(path)
+        if directory and directory not in self._dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._dirs.add(directory)
+
+    def count(self, written :bool) -> None:
+        """Counts a write another writer (e.g. in a worker process) performed or skipped."""
+        if written:
+            self.written += 1
+        else:
+            self.unchanged += 1
+
+    def _write_job(
+            self,
+            path    :str,
+            data    :bytes,
+    ) -> None:
+        try:
+            _write_bytes(path, data, replace=self.out_dir is not None)
+        finally:
+            self._slots.release()
+
+    def flush(self) -> None:
+        """Waits for every queued write, raising the first error one of them hit."""
+        futures, self._futures = self._futures, []
+        self._pending.clear()
+        error = None
+        for future in futures:
+            exc = future.exception()
+            if exc is not None and error is None:
+                error = exc
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+
+    def summary(self) -> str:
+        return f"Wrote {self.written} files, {self.unchanged} unchanged."
+
+class MemoryWriter:
+    """
+    Stands in for an `OutputWriter` when the converted pages are wanted in memory rather than on disk (see `main.iter_convert`).
+    \nKeeps the last text written to each path until it is popped.
+    """
+    def __init__(self):
+        self.outputs    = {}
+        self.written    = 0
+        self.unchanged  = 0
+
+    def write(
+            self,
+            path    :str,
+            text    :str,
+    ) -> bool:
+        self.outputs[path] = text
+        self.written += 1
+        return True
+
+    def write_stream(
+            self,
+            path    :str,
+            pieces,
+    ) -> bool:
+        return self.write(path, "".join(pieces))
+
+    def pop(self, path :str) -> str:
+        return self.outputs.pop(path)
+
+def _has_content(
+        path    :str,
+        data    :bytes,
+) -> bool:
+    """True if the file at `path` holds exactly `data`. Only reads the file when its size already matches."""
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+def _write_bytes(
+        path    :str,
+        data    :bytes,
+        replace :bool = False,
+) -> None:
+    """Writes `data` to `path`; with `replace`, to a temporary file which then replaces `path`, so a hardlink at `path` is broken rather than written through."""
+    if not replace:
+        with open(path, "wb") as f:
+            f.write(data)
+        return
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise